@@ -0,0 +1,220 @@
+# Benchmark of client hot paths against local stand-in server (http, httpclient for stdlib http.client transport),
+# HTTP/2 stand-in server (h2, requires h2), stand-in api called in process without sockets (inprocess)
+# and in memory implementation (inmemory)
+#
+#   python benchmarks/client_ops.py --targets http,httpclient,inprocess,inmemory --sizes 100,1000 --concurrency 1,8
+#   python benchmarks/client_ops.py --targets httpclient,h2 --sizes 1000 --concurrency 64,256
+#   python benchmarks/client_ops.py --save benchmarks/baselines/local.json
+#   python benchmarks/client_ops.py --compare benchmarks/baselines/local.json --tolerance 0.25
+#
+# For every target, bucket size and concurrency level add/get/update/remove are run `--ops` times by
+# `concurrency` threads, followed by full scans (sequential and by `concurrency` workers) and filters.
+# Throughput and latency percentiles are reported per operation. Elements, their order and queried ids come from seeded random, so runs are comparable.
+# With --compare the run fails (exit code 1) when throughput of any operation dropped by more than tolerance.
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from easydb_client import EasydbClient  # noqa: E402
+from easydb_client import inmemory  # noqa: E402
+from easydb_client import query as Q  # noqa: E402
+from easydb_client.server import InProcessTransport  # noqa: E402
+from easydb_client.server import StandInServer  # noqa: E402
+from easydb_client.transport import HTTPClientTransport  # noqa: E402
+
+GROUPS = 10
+SCANS = 5
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarize(latencies, elapsed, items=None):
+    ordered = sorted(latencies)
+    return {
+        'ops_per_s': round((items or len(latencies)) / elapsed, 1),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+def run_concurrently(operation, args, concurrency):
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def work(part):
+        measured = []
+        try:
+            for item in part:
+                started = time.perf_counter()
+                operation(*item)
+                measured.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+        with lock:
+            latencies.extend(measured)
+
+    workers = [threading.Thread(target=work, args=(args[n::concurrency],)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return summarize(latencies, elapsed)
+
+
+def element(rng, i):
+    return {'group': str(i % GROUPS), 'index': str(i), 'payload': '%032x' % rng.getrandbits(128)}
+
+
+def benchmark(bucket, size, concurrency, ops, seed):
+    rng = random.Random(seed)
+    ids = [r.value['id'] for r in bucket.add_many(element(rng, i) for i in range(size))]
+    results = {}
+
+    added = []
+    results['add'] = run_concurrently(
+        lambda e: added.append(bucket.add(e)['id']), [(element(rng, i),) for i in range(ops)], concurrency)
+    results['get'] = run_concurrently(bucket.get, [(rng.choice(ids),) for _ in range(ops)], concurrency)
+    results['update'] = run_concurrently(
+        bucket.update, [(rng.choice(ids), element(rng, i)) for i in range(ops)], concurrency)
+    results['remove'] = run_concurrently(bucket.remove, [(element_id,) for element_id in added], concurrency)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(SCANS):
+        scan_started = time.perf_counter()
+        scanned = sum(1 for _ in bucket.all())
+        latencies.append(time.perf_counter() - scan_started)
+    assert scanned == size
+    results['scan'] = summarize(latencies, time.perf_counter() - started, items=SCANS * size)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(SCANS):
+        scan_started = time.perf_counter()
+        scanned = sum(1 for _ in bucket.scan(workers=concurrency))
+        latencies.append(time.perf_counter() - scan_started)
+    assert scanned == size
+    results['parallel_scan'] = summarize(latencies, time.perf_counter() - started, items=SCANS * size)
+
+    latencies = []
+    started = time.perf_counter()
+    for group in range(GROUPS):
+        filter_started = time.perf_counter()
+        for _ in bucket.filter(Q.where('group').eq(str(group))):
+            pass
+        latencies.append(time.perf_counter() - filter_started)
+    results['filter'] = summarize(latencies, time.perf_counter() - started, items=size)
+    return results
+
+
+def open_connections(client):
+    # connections kept open to the server after the run, for http.client and HTTP/2 transports
+    transport = getattr(client, 'transport', None)
+    if isinstance(transport, HTTPClientTransport):
+        return sum(len(connections) for connections in transport._idle.values())
+    if hasattr(transport, 'connections'):
+        return transport.connections()
+    return None
+
+
+def run(targets, sizes, concurrency_levels, ops, page_size, seed):
+    results = {}
+    with StandInServer(page_size=page_size) as server:
+        h2_server = None
+        if 'h2' in targets:
+            from easydb_client.server_h2 import H2StandInServer
+            from easydb_client.transport_h2 import H2Transport
+            h2_server = H2StandInServer(page_size=page_size, space_repository=server.space_repository).start()
+        for target in targets:
+            for size in sizes:
+                for concurrency in concurrency_levels:
+                    if target == 'http':
+                        client = EasydbClient(url=server.url, pool_maxsize=max(10, concurrency))
+                        space = client.create_space()
+                    elif target == 'httpclient':
+                        client = EasydbClient(url=server.url, transport=HTTPClientTransport(max(10, concurrency)))
+                        space = client.create_space()
+                    elif target == 'h2':
+                        client = EasydbClient(url=h2_server.url, transport=H2Transport())
+                        space = client.create_space()
+                    elif target == 'inprocess':
+                        client = EasydbClient(url=server.url, transport=InProcessTransport(page_size=page_size))
+                        space = client.create_space()
+                    else:
+                        client = None
+                        space = inmemory.create_space()
+                    measured = benchmark(space.get_bucket('benchmark'), size, concurrency, ops, seed)
+                    connections = open_connections(client)
+                    if client is not None:
+                        client.remove_space(space.name)
+                        client.close()
+                    else:
+                        inmemory.remove_space(space.name)
+                    for operation, summary in measured.items():
+                        key = '{target}/{operation}/size={size}/concurrency={concurrency}'.format(
+                            target=target, operation=operation, size=size, concurrency=concurrency)
+                        results[key] = summary
+                        print('{key:<50} {ops_per_s:>12} ops/s  p50 {p50_ms:>9} ms  p95 {p95_ms:>9} ms  '
+                              'p99 {p99_ms:>9} ms'.format(key=key, **summary))
+                    if connections is not None:
+                        print('{target}/size={size}/concurrency={concurrency} kept {connections} connections'.format(
+                            target=target, size=size, concurrency=concurrency, connections=connections))
+        if h2_server is not None:
+            h2_server.stop()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, summary in sorted(results.items()):
+        if key in baseline:
+            change = summary['ops_per_s'] / baseline[key]['ops_per_s'] - 1
+            print('{key:<50} {change:>+8.1%}'.format(key=key, change=change))
+            if change < -tolerance:
+                regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of easydb client hot paths')
+    parser.add_argument('--targets', default='http,httpclient,inprocess,inmemory')
+    parser.add_argument('--sizes', default='100,1000')
+    parser.add_argument('--concurrency', default='1,8')
+    parser.add_argument('--ops', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='file to save results to, used as baseline of later runs')
+    parser.add_argument('--compare', help='baseline file to compare results with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args.targets.split(','), [int(s) for s in args.sizes.split(',')],
+                  [int(c) for c in args.concurrency.split(',')], args.ops, args.page_size, args.seed)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('Throughput regressions:', ', '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
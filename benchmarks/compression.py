@@ -0,0 +1,95 @@
+# Benchmark of body compression: bytes on wire and cpu per element of writes and page fetches against local
+# stand-in server
+#
+#   python benchmarks/compression.py --levels 0,1,6,9 --elements 5000 --fields 8 --threshold 1024
+#
+# Level 0 runs client and stand-in without compression. Every element is added and updated once, then the bucket
+# is read in pages (all) and streamed (all with stream=True). Bytes on wire are bodies of requests and responses
+# reported to the observer (compressed size when compressed). Client cpu is cpu time of the thread making requests
+# (encoding, compressing, decompressing and decoding), total cpu includes the stand-in serving them in the same process.
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from easydb_client import EasydbClient  # noqa: E402
+from easydb_client.compression import Compression  # noqa: E402
+from easydb_client.metrics import Observer  # noqa: E402
+from easydb_client.server import StandInServer  # noqa: E402
+from easydb_client.transport import HTTPClientTransport  # noqa: E402
+
+WORDS = ['easydb', 'bucket', 'space', 'element', 'active', 'pending', 'John', 'Smith', 'Warsaw', 'Berlin',
+         'premium', 'basic', 'true', 'false', 'red', 'green', 'blue']
+
+
+class WireBytes(Observer):
+    def __init__(self):
+        self.bytes = Counter()
+
+    def observe(self, measurement):
+        self.bytes[measurement.operation] += (measurement.request_bytes or 0) + (measurement.response_bytes or 0)
+
+
+def element(rng, i, fields):
+    body = {'index': str(i), 'id': '%032x' % rng.getrandbits(128)}
+    for n in range(fields):
+        body['field{n}'.format(n=n)] = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+    return body
+
+
+def measure(action, wire, count):
+    wire.bytes.clear()
+    thread_cpu, process_cpu, started = time.thread_time(), time.process_time(), time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - started
+    return {
+        'bytes_per_element': round(sum(wire.bytes.values()) / count, 1),
+        'client_cpu_us_per_element': round((time.thread_time() - thread_cpu) / count * 1e6, 1),
+        'total_cpu_us_per_element': round((time.process_time() - process_cpu) / count * 1e6, 1),
+        'elements_per_s': round(count / elapsed, 1),
+    }
+
+
+def benchmark(level, count, fields, threshold, page_size, seed):
+    compression = Compression(level, threshold) if level else None
+    rng = random.Random(seed)
+    elements = [element(rng, i, fields) for i in range(count)]
+    wire = WireBytes()
+    with StandInServer(page_size=page_size, compression=compression) as server:
+        client = EasydbClient(url=server.url, transport=HTTPClientTransport(), observer=wire, compression=compression)
+        bucket = client.create_space().get_bucket('benchmark')
+        ids = []
+        results = {
+            'add': measure(lambda: ids.extend(bucket.add(e)['id'] for e in elements), wire, count),
+            'update': measure(lambda: [bucket.update(i, e) for i, e in zip(ids, reversed(elements))], wire, count),
+            'page_fetch': measure(lambda: sum(1 for _ in bucket.all()), wire, count),
+            'page_stream': measure(lambda: sum(1 for _ in bucket.all(stream=True)), wire, count),
+        }
+        client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of compressed request and response bodies')
+    parser.add_argument('--levels', default='0,1,6,9')
+    parser.add_argument('--elements', type=int, default=5000)
+    parser.add_argument('--fields', type=int, default=8)
+    parser.add_argument('--threshold', type=int, default=1024)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for level in [int(level) for level in args.levels.split(',')]:
+        measured = benchmark(level, args.elements, args.fields, args.threshold, args.page_size, args.seed)
+        for operation, summary in measured.items():
+            print('level={level}/{operation:<12} {bytes_per_element:>9} B/element  client cpu '
+                  '{client_cpu_us_per_element:>7} us/element  total cpu {total_cpu_us_per_element:>7} us/element  '
+                  '{elements_per_s:>9} elements/s'.format(level=level, operation=operation, **summary))
+
+
+if __name__ == '__main__':
+    main()
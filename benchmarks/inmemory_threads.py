@@ -0,0 +1,80 @@
+# Multithreaded stress benchmark of easydb_client.inmemory
+#
+#   python benchmarks/inmemory_threads.py --threads 1,2,4,8 --ops 20000
+#
+# Every worker runs a mix of add/get/update/filter/remove and periodic full scans, on its own bucket
+# (--buckets per-thread) or on one bucket shared by all workers (--buckets shared).
+# Throughput scales with thread count only as far as the interpreter lets threads run python code in parallel,
+# on GIL builds per bucket locks mostly show up as lack of contention between buckets.
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from easydb_client import inmemory  # noqa: E402
+from easydb_client import query as Q  # noqa: E402
+
+
+def work(bucket, ops, worker_id, errors):
+    try:
+        pks = []
+        for i in range(ops):
+            operation = i % 10
+            if operation < 4 or not pks:
+                pks.append(bucket.add({'worker': str(worker_id), 'group': str(i % 16)})['id'])
+            elif operation < 7:
+                bucket.get(pks[i % len(pks)])
+            elif operation == 7:
+                bucket.update(pks[i % len(pks)], {'worker': str(worker_id), 'group': str(i % 16)})
+            elif operation == 8:
+                for _ in bucket.filter(Q.where('group').eq(str(i % 16))):
+                    pass
+            else:
+                bucket.remove(pks.pop())
+            if i % 1000 == 999:
+                for _ in bucket.all():
+                    pass
+    except Exception as e:
+        errors.append(e)
+
+
+def run(threads, ops, shared_bucket):
+    space = inmemory.create_space()
+    errors = []
+    workers = [
+        threading.Thread(target=work, args=(
+            space.get_bucket('shared' if shared_bucket else f'bucket-{n}'), ops, n, errors))
+        for n in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    inmemory.remove_space(space.name)
+    if errors:
+        raise errors[0]
+    return threads * ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', default='1,2,4,8')
+    parser.add_argument('--ops', type=int, default=20000, help='operations per thread')
+    parser.add_argument('--buckets', choices=['per-thread', 'shared'], default='per-thread')
+    args = parser.parse_args()
+
+    baseline = None
+    print(f'{"threads":>8} {"ops/s":>12} {"speedup":>8}')
+    for threads in (int(t) for t in args.threads.split(',')):
+        throughput = run(threads, args.ops, args.buckets == 'shared')
+        baseline = baseline or throughput
+        print(f'{threads:>8} {throughput:>12.0f} {throughput / baseline:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,21 @@ from .easydb import create_space
 from .easydb import get_space
 from .easydb import space_exists
 from .easydb import remove_space
+from .easydb import EasydbClient
+from .easydb import get_default_client
+from .easydb import set_default_client
+from .easydb import BulkResult
+from .easydb import DeadlineExceeded
 from .easydb import ElementNotFound
 from .easydb import InvalidElementFormat
 from .easydb import SpaceNotFound
 
-from . import inmemory
-from . import query
\ No newline at end of file
+
+# submodules are imported on first access, so importing the package stays fast
+
+
+def __getattr__(name):
+    if name in ('aio', 'inmemory', 'inmemory_aio', 'query'):
+        import importlib
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {module!r} has no attribute {name!r}'.format(module=__name__, name=name))
\ No newline at end of file
@@ -0,0 +1,444 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+
+import aiohttp
+
+from .easydb import EASYDB_URL
+from .easydb import DeadlineExceeded
+from .easydb import SpaceNotFound
+from .easydb import _BaseBucket
+from .easydb import _BaseClient
+from .easydb import _bulk_result
+from .easydb import _element_id
+from .easydb import _measure_response
+from .easydb import _past_last_page
+from .singleflight import AsyncSingleFlight
+from .streaming import STREAM_CHUNK_SIZE
+
+# asyncio version of easydb client, requires aiohttp. Everything but sending requests and waiting for them
+# is shared with easydb_client.easydb.
+
+
+class AsyncResponse:
+    # response read by aiohttp, with the attributes of transport responses which the client measures and decodes
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.request_bytes = 0
+        self.ttfb = None
+        self.connect_time = 0.0
+
+
+def _trace_connections():
+    # measures time of opening connections for observers
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.connect += time.perf_counter() - context.connect_started
+
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+class _Timing:
+    # seconds spent opening connections for a request, added up by the trace
+    __slots__ = ('connect',)
+
+    def __init__(self):
+        self.connect = 0.0
+
+
+async def _run_bulk(operation, args_iterable, concurrency):
+    in_flight = deque()
+    try:
+        for args in args_iterable:
+            in_flight.append(asyncio.ensure_future(operation(*args)))
+            if len(in_flight) >= concurrency:
+                yield await _next_bulk_result(in_flight)
+        while in_flight:
+            yield await _next_bulk_result(in_flight)
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def _next_bulk_result(in_flight):
+    # task is taken off only when it finished, so it is cancelled with the others when waiting for it is
+    await asyncio.wait([in_flight[0]])
+    return _bulk_result(in_flight.popleft())
+
+
+class AsyncBucket(_BaseBucket):
+    async def add(self, element, deadline=None):
+        return self._added(await self._write(None, 'add', 'post', self._build_url(), deadline=deadline,
+                                             json=self._element_body(element)))
+
+    async def remove(self, element_id, deadline=None):
+        self._removed(element_id, await self._write(
+            element_id, 'remove', 'delete', self._build_element_url(element_id), deadline=deadline))
+
+    async def update(self, element_id, element, deadline=None):
+        return self._updated(element_id, element, await self._write(
+            element_id, 'update', 'put', self._build_element_url(element_id), deadline=deadline,
+            json=self._element_body(element)))
+
+    async def get(self, element_id, deadline=None):
+        element, generation = self._cached(element_id)
+        if element is not None:
+            return element
+        return self._got(await self._request('get', 'get', self._build_element_url(element_id), deadline=deadline,
+                                             idempotent=True), generation)
+
+    def add_many(self, elements, concurrency=32):
+        return _run_bulk(self.add, ((element,) for element in elements), concurrency)
+
+    def update_many(self, elements, concurrency=32):
+        return _run_bulk(self.update, elements, concurrency)
+
+    def remove_many(self, element_ids, concurrency=32):
+        return _run_bulk(self.remove, ((element_id,) for element_id in element_ids), concurrency)
+
+    async def filter(self, q, prefetch=0, stream=False, fields=None):
+        async for element in self._fetch(self._build_query_url(q), prefetch, stream, *self._reader(fields)):
+            yield element
+
+    async def all(self, prefetch=0, stream=False, fields=None):
+        async for element in self._fetch(self._build_url(), prefetch, stream, *self._reader(fields)):
+            yield element
+
+    async def count(self, q=None):
+        # elements of pages are counted raw, without turning their fields into dicts or mapping them
+        next_url, count = self._build_query_url(q), 0
+        while next_url:
+            next_url, results = await self._fetch_part(next_url, self.client.codec.decode)
+            count += len(results)
+        return count
+
+    async def ids(self, q=None, prefetch=0, stream=False):
+        async for element_id in self._fetch(self._build_query_url(q), prefetch, stream, _element_id,
+                                            self.client.codec.decode):
+            yield element_id
+
+    async def scan(self, q=None, workers=4, page_size=100, fields=None):
+        # pages are requested by offset, up to `workers` of them at once, and yielded in order
+        mapper, decode = self._reader(fields)
+        query_string = self._query_string(q)
+        results, last, page_size = await self._probe_page_size(query_string, page_size, decode)
+        for element in map(mapper, results):
+            yield element
+        if last:
+            return
+
+        in_flight = deque()
+        next_page = 1
+        try:
+            while True:
+                while len(in_flight) < workers and not _past_last_page(in_flight, page_size):
+                    in_flight.append(asyncio.ensure_future(
+                        self._fetch_page(query_string, next_page * page_size, page_size, decode)))
+                    next_page += 1
+                results, last = await in_flight.popleft()
+                for element in map(mapper, results):
+                    yield element
+                if last:
+                    return
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def _write(self, element_id, operation, method, url, **kwargs):
+        # cached element is dropped before it is written, not only when response comes
+        if element_id is not None:
+            self._forget(element_id)
+        try:
+            return await self._request(operation, method, url, **kwargs)
+        except BaseException:
+            self._unsettled(element_id)
+            raise
+
+    async def _probe_page_size(self, query_string, page_size, decode=None):
+        return self._probed(*await self._fetch_page(query_string, 0, page_size, decode), page_size)
+
+    async def _fetch_page(self, query_string, offset, limit, decode=None):
+        next_url, results = await self._fetch_part(self._build_page_url(query_string, offset, limit), decode)
+        return results, next_url is None
+
+    async def _fetch(self, url, prefetch=0, stream=False, mapper=None, decode=None):
+        mapper = mapper or self._map_element
+        if stream and prefetch:
+            raise ValueError('Streamed pages can not be prefetched')
+        if stream:
+            async for element in self._stream(url, mapper, decode):
+                yield element
+            return
+        if prefetch:
+            async for element in self._fetch_ahead(url, prefetch, mapper, decode):
+                yield element
+            return
+
+        next_url = url
+        while next_url:
+            next_url, results = await self._fetch_part(next_url, decode)
+            for element in map(mapper, results):
+                yield element
+
+    async def _fetch_ahead(self, url, prefetch, mapper, decode):
+        # pages are fetched by worker task, at most `prefetch` of them wait for the consumer
+        pages = asyncio.Queue(maxsize=prefetch)
+
+        async def fetch_pages():
+            next_url = url
+            try:
+                while next_url:
+                    next_url, results = await self._fetch_part(next_url, decode)
+                    await pages.put((map(mapper, results), None))
+            except Exception as e:
+                await pages.put((None, e))
+                return
+            await pages.put((None, None))
+
+        worker = asyncio.ensure_future(fetch_pages())
+        try:
+            while True:
+                part, error = await pages.get()
+                if error is not None:
+                    raise error
+                if part is None:
+                    return
+                for element in part:
+                    yield element
+        finally:
+            worker.cancel()
+
+    async def _stream(self, url, mapper, decode=None):
+        next_url = url
+        while next_url:
+            parser = self._parser(decode)
+            async with self.client.stream('get', next_url, operation='page_stream', space_name=self.space.name,
+                                          bucket_name=self.bucket_name) as response:
+                assert response.status == 200
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    for element in map(mapper, parser.feed(chunk)):
+                        yield element
+                for element in map(mapper, parser.close()):
+                    yield element
+            next_url = parser.next_url
+
+    async def _fetch_part(self, url, decode=None):
+        return self._page(await self._request('page_fetch', 'get', url, idempotent=True, decode=decode), decode)
+
+
+class AsyncSpace:
+    def __init__(self, name, client=None):
+        self.name = name
+        self.client = client or get_default_client()
+
+    def get_bucket(self, bucket_name, cache=None):
+        return AsyncBucket(self, bucket_name, cache)
+
+
+class AsyncEasydbClient(_BaseClient):
+    def __init__(self, url=EASYDB_URL, limit=100, limit_per_host=0, connect_timeout=None, read_timeout=None,
+                 cache=None, compact_elements=False, deadline=None, hedging=None, coalesce=True,
+                 observer=None, codec=None, compression=None):
+        # compressed responses are asked for and decompressed by aiohttp whatever `compression` is
+        super().__init__(url, cache, compact_elements, deadline, hedging, observer, codec, compression)
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=read_timeout)
+        self._session = None
+        self._loop = None
+
+    def _get_session(self):
+        # aiohttp sessions are bound to the loop they were created in
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host),
+                timeout=self.timeout, trace_configs=None if self.observer is None else [_trace_connections()])
+            self._loop = loop
+        return self._session
+
+    async def request(self, method, url, deadline=None, idempotent=False, operation=None, space_name=None,
+                      bucket_name=None, decode=None, **kwargs):
+        self._encode_body(kwargs)
+        if self.observer is None:
+            return await self._call(method, url, deadline, idempotent, kwargs)
+        measurement = self._measurement(operation or method, space_name, bucket_name)
+        started = time.perf_counter()
+        try:
+            response = await self._call(method, url, deadline, idempotent, kwargs)
+            _measure_response(measurement, response, False, decode or self._decoder())
+        except Exception as e:
+            measurement.error = e
+            raise
+        finally:
+            measurement.duration = time.perf_counter() - started
+            self.observer.observe(measurement)
+        return response
+
+    async def _call(self, method, url, deadline, idempotent, kwargs):
+        if deadline is None:
+            deadline = self.deadline
+        if idempotent and self.single_flight is not None and not kwargs:
+            # shared call is limited by deadline of the caller which started it, callers waiting longer than
+            # that start their own
+            expires_at = None if deadline is None else asyncio.get_running_loop().time() + deadline
+            return await self._limited(self.single_flight.do(
+                (method, url), lambda: self._limited(self._attempt(method, url, idempotent, kwargs), deadline),
+                expires_at), deadline)
+        try:
+            return await self._limited(self._attempt(method, url, idempotent, kwargs), deadline)
+        finally:
+            if not idempotent and self.single_flight is not None:
+                # reads in flight may have read what was there before the write, later callers do not share them
+                self.single_flight.forget(('get', url))
+
+    @staticmethod
+    async def _limited(attempt, deadline):
+        if deadline is None:
+            return await attempt
+        try:
+            return await asyncio.wait_for(attempt, deadline)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+
+    def _attempt(self, method, url, idempotent, kwargs):
+        if idempotent and self.hedging is not None:
+            return self._hedged_request(method, url, kwargs)
+        return self._send(method, url, kwargs)
+
+    async def _hedged_request(self, method, url, kwargs):
+        started = hedge_started = time.monotonic()
+        first = asyncio.ensure_future(self._send(method, url, kwargs))
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedging.delay)
+            if not done:
+                hedge_started = time.monotonic()
+                attempts.append(asyncio.ensure_future(self._send(method, url, kwargs)))
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        hedge_won = attempt is not first
+                        self.hedging.record(time.monotonic() - (hedge_started if hedge_won else started),
+                                            hedged=len(attempts) > 1, hedge_won=hedge_won)
+                        return attempt.result()
+                    error = error or attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _send(self, method, url, kwargs):
+        timing = None if self.observer is None else _Timing()
+        started = time.perf_counter()
+        async with self._get_session().request(method, url, trace_request_ctx=timing, **kwargs) as response:
+            ttfb = time.perf_counter() - started
+            result = AsyncResponse(response.status, response.headers, await response.read())
+        if timing is not None:
+            # bodies are serialized by the client, so their size is known
+            result.request_bytes = len(kwargs.get('data') or b'')
+            result.ttfb = ttfb
+            result.connect_time = timing.connect
+        return result
+
+    def stream(self, method, url, operation=None, space_name=None, bucket_name=None, **kwargs):
+        if self.observer is None:
+            return self._get_session().request(method, url, **kwargs)
+        return self._measured_stream(method, url, self._measurement(operation or method, space_name, bucket_name),
+                                     kwargs)
+
+    @contextlib.asynccontextmanager
+    async def _measured_stream(self, method, url, measurement, kwargs):
+        timing = _Timing()
+        measurement.request_bytes = len(kwargs.get('data') or b'')
+        started = time.perf_counter()
+        try:
+            async with self._get_session().request(method, url, trace_request_ctx=timing, **kwargs) as response:
+                measurement.ttfb = time.perf_counter() - started
+                measurement.status = response.status
+                measurement.response_bytes = response.content_length
+                yield response
+        except Exception as e:
+            measurement.error = e
+            raise
+        finally:
+            measurement.connect = timing.connect
+            measurement.duration = time.perf_counter() - started
+            self.observer.observe(measurement)
+
+    async def create_space(self, deadline=None):
+        response = await self.request('post', self._spaces_url(), deadline=deadline, operation='create_space')
+        return AsyncSpace(self._created_space_name(response), self)
+
+    async def get_space(self, space_name, deadline=None):
+        response = await self.request('get', self._space_url(space_name), deadline=deadline, idempotent=True,
+                                      operation='get_space', space_name=space_name)
+        return AsyncSpace(self._found_space_name(response), self)
+
+    async def space_exists(self, space_name, deadline=None):
+        try:
+            await self.get_space(space_name, deadline)
+            return True
+        except SpaceNotFound:
+            return False
+
+    async def remove_space(self, space_name, deadline=None):
+        self._removed_space(await self.request('delete', self._space_url(space_name), deadline=deadline,
+                                               operation='remove_space', space_name=space_name))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+_default_client = None
+
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = AsyncEasydbClient()
+    return _default_client
+
+
+def set_default_client(client):
+    global _default_client
+    _default_client = client
+
+
+async def create_space():
+    return await get_default_client().create_space()
+
+
+async def get_space(space_name):
+    return await get_default_client().get_space(space_name)
+
+
+async def space_exists(space_name):
+    return await get_default_client().space_exists(space_name)
+
+
+async def remove_space(space_name):
+    await get_default_client().remove_space(space_name)
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from collections import namedtuple
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'expirations', 'size', 'maxsize'])
+
+_missing = object()
+
+
+class ElementCache:
+    # thread safe LRU cache with optional time to live (in seconds) of entries
+    #
+    # Every put and invalidate of a key moves it to new generation. Value read from the server is put with
+    # generation of the key taken before it was requested, it is dropped when the key was written since then,
+    # so response which raced with a write does not bring back the old value.
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        # key -> generation for at most maxsize recently written keys, the others are at the generation
+        # of the last one dropped from here
+        self._generations = OrderedDict()
+        self._generation = 0
+        self._dropped_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _missing)
+            if entry is _missing:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations.get(key, self._dropped_generation)
+
+    def put(self, key, value, generation=None):
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            if generation is None:
+                self._next_generation(key)
+            elif generation != self._generations.get(key, self._dropped_generation):
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._next_generation(key)
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._dropped_generation = self._generation
+            self._generations.clear()
+            self._entries.clear()
+
+    def _next_generation(self, key):
+        self._generation += 1
+        self._generations[key] = self._generation
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.maxsize:
+            _, self._dropped_generation = self._generations.popitem(last=False)
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.expirations, len(self._entries), self.maxsize)
+
+    def __len__(self):
+        return len(self._entries)
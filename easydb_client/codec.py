@@ -0,0 +1,59 @@
+import json
+
+# Codecs of request and response bodies. Both produce the same bytes: compact separators, non ascii characters
+# written as utf-8. OrjsonCodec is used when orjson is installed (`pip install easydb_client[fast]`), it encodes and
+# decodes straight from bytes in C, JsonCodec is the stdlib fallback.
+#
+# decode_elements returns body with element fields, received as [{'name': ..., 'value': ...}], turned into dict,
+# so pages and elements come out in their final shape and are not mapped again by buckets.
+
+
+def shape_element(body):
+    body['fields'] = {field['name']: field['value'] for field in body['fields']}
+    return body
+
+
+def shape_body(body):
+    # page ({'next': ..., 'results': [...]}) or single element
+    if isinstance(body, dict):
+        results = body.get('results')
+        if results is not None:
+            for element in results:
+                shape_element(element)
+        elif 'fields' in body:
+            shape_element(body)
+    return body
+
+
+class JsonCodec:
+    name = 'json'
+
+    def encode(self, body):
+        return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def decode_elements(self, data):
+        return shape_body(self.decode(data))
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def encode(self, body):
+        return self._orjson.dumps(body)
+
+    def decode(self, data):
+        return self._orjson.loads(data)
+
+
+def default_codec():
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JsonCodec()
@@ -0,0 +1,94 @@
+import zlib
+
+# Compression of request and response bodies. Pages and elements are json with "name" and "value" keys repeated
+# for every field, they get several times smaller.
+#
+# Client with compression asks for gzip compressed responses (Accept-Encoding), transports decompress them while
+# they are read, so streamed pages are decompressed chunk by chunk as they arrive and parsed right away.
+# Request bodies (added and updated elements) of at least `threshold` bytes are sent gzip compressed at `level`
+# (1 is the fastest, 9 compresses the most).
+
+ACCEPT_ENCODING = 'gzip'
+CONTENT_ENCODING = 'gzip'
+
+# window bits of zlib for content encodings, gzip and zlib streams have their own headers
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'x-gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+class UnsupportedContentEncoding(ValueError):
+    pass
+
+
+class Compression:
+    def __init__(self, level=6, threshold=1024):
+        self.level = level
+        # bodies shorter than that are sent as they are, compressing them saves less than it costs
+        self.threshold = threshold
+
+    def compress(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS[CONTENT_ENCODING])
+        return compressor.compress(data) + compressor.flush()
+
+    def should_compress(self, data):
+        return len(data) >= self.threshold
+
+
+def accepts(accept_encoding, encoding=CONTENT_ENCODING):
+    # Accept-Encoding header allows given encoding, `q=0` excludes it
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() in (encoding, '*'):
+            weight = params.replace(' ', '').lower()
+            if not weight.startswith('q='):
+                return True
+            try:
+                return float(weight[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def decompressor(content_encoding):
+    # None for body which is not compressed
+    if not content_encoding or content_encoding.strip().lower() == 'identity':
+        return None
+    wbits = _WBITS.get(content_encoding.strip().lower())
+    if wbits is None:
+        raise UnsupportedContentEncoding('Unsupported content encoding {encoding}'.format(encoding=content_encoding))
+    return zlib.decompressobj(wbits)
+
+
+def decompress(data, content_encoding):
+    decompressing = decompressor(content_encoding)
+    if decompressing is None:
+        return data
+    try:
+        return decompressing.decompress(data) + decompressing.flush()
+    except zlib.error as e:
+        raise UnsupportedContentEncoding('Malformed {encoding} body: {error}'.format(
+            encoding=content_encoding, error=e)) from None
+
+
+class DecompressingReader:
+    # raw body of response decompressed while it is read, read(amt) returns up to amt decompressed bytes
+    def __init__(self, raw, decompressor):
+        self._raw = raw
+        self._decompressor = decompressor
+        self._eof = False
+
+    def read(self, amt=None):
+        if amt is None:
+            data = self._decompressor.decompress(self._decompressor.unconsumed_tail + self._raw.read())
+            self._eof = True
+            return data + self._decompressor.flush()
+        while not self._eof:
+            compressed = self._decompressor.unconsumed_tail
+            if not compressed:
+                compressed = self._raw.read(amt)
+                if not compressed:
+                    self._eof = True
+                    return self._decompressor.flush()
+            data = self._decompressor.decompress(compressed, amt)
+            if data:
+                return data
+        return b''
@@ -1,8 +1,25 @@
-import requests
+import queue
+import threading
+import time
+from collections import deque
+from collections import namedtuple
+from urllib.parse import urlencode
+
 from . import query as Q
+from .codec import default_codec
+from .codec import shape_element
+from .compression import ACCEPT_ENCODING
+from .compression import CONTENT_ENCODING
+from .element import Element
+from .singleflight import SingleFlight
+from .streaming import STREAM_CHUNK_SIZE
+from .streaming import PageParser
 
 EASYDB_URL = 'https://easy-db.herokuapp.com'
 
+# concurrent.futures, requests and metrics are imported where they are first needed, so importing the package
+# (e.g. by short lived jobs making single call) does not load them
+
 
 class ElementNotFound(ValueError):
     pass
@@ -20,53 +37,132 @@ class SpaceNotFound(ValueError):
     pass
 
 
-class Bucket:
-    def __init__(self, space, bucket_name):
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+# result of single item of bulk operation, error is set when item was rejected
+BulkResult = namedtuple('BulkResult', ['value', 'error'])
+
+BULK_ITEM_ERRORS = (InvalidElementFormat, ElementNotFound)
+
+
+def _copy_element(element):
+    if isinstance(element, Element):
+        return element.copy()
+    return {
+        'id': element['id'],
+        'bucketName': element['bucketName'],
+        'fields': dict(element['fields'])
+    }
+
+
+def _bulk_result(future):
+    # result of item of bulk operation from its finished future (of a thread or asyncio task),
+    # items rejected by the server are reported, other errors are raised
+    error = future.exception()
+    if isinstance(error, BULK_ITEM_ERRORS):
+        return BulkResult(None, error)
+    return BulkResult(future.result(), None)
+
+
+def _run_bulk(operation, args_iterable, concurrency):
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = deque()
+        try:
+            for args in args_iterable:
+                in_flight.append(executor.submit(operation, *args))
+                if len(in_flight) >= concurrency:
+                    yield _bulk_result(in_flight.popleft())
+            while in_flight:
+                yield _bulk_result(in_flight.popleft())
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _measure_response(measurement, response, streamed, decode):
+    measurement.status = response.status_code
+    measurement.request_bytes = response.request_bytes
+    measurement.ttfb = response.ttfb
+    measurement.connect = response.connect_time
+    # size received, of compressed body when it was compressed
+    length = response.headers.get('Content-Length')
+    if streamed:
+        measurement.response_bytes = None if length is None else int(length)
+        return
+    measurement.response_bytes = len(response.content) if length is None else int(length)
+    if response.content:
+        started = time.perf_counter()
+        try:
+            response.decoded_body = decode, decode(response.content)
+        except ValueError:
+            return
+        measurement.decode = time.perf_counter() - started
+
+
+def _element_id(body):
+    return body['id']
+
+
+def _past_last_page(in_flight, page_size):
+    # page requested already came back as the last (or short) one, pages after it are not requested
+    for page in in_flight:
+        if page.done() and page.exception() is None:
+            results, last = page.result()
+            if last or len(results) < page_size:
+                return True
+    return False
+
+
+class _BaseBucket:
+    # part of Bucket and easydb_client.aio.AsyncBucket which does not do I/O: urls and bodies of requests,
+    # handling of responses, mapping, caching and replicating elements. Subclasses send requests and wait
+    # for them their own way.
+
+    def __init__(self, space, bucket_name, cache=None):
         self.space = space
         self.bucket_name = bucket_name
+        self.client = space.client
+        self.cache = cache if cache is not None else self.client.cache
+
+    @staticmethod
+    def _element_body(element):
+        return {
+            'fields': [{'name': field_name, 'value': field_value} for field_name, field_value in element.items()]
+        }
 
-    def add(self, element):
-        response = requests.post(
-            '{EASYDB_URL}/api/v1/{space_name}/{bucket_name}'.format(
-                EASYDB_URL=EASYDB_URL, space_name=self.space.name, bucket_name=self.bucket_name),
-            json={
-                'fields': [{'name': field_name, 'value': field_value} for field_name, field_value in element.items()]
-            })
+    def _added(self, response):
         if response.status_code == 201:
-            body = response.json()
-            return {
-                'id': body['id'],
-                'bucketName': body['bucketName'],
-                'fields': {field['name']: field['value'] for field in body['fields']}
-            }
+            element = self._map_element(self.client._decode(response))
+            self._remember(element)
+            self._replicate(element['id'], element['fields'])
+            return element
         elif response.status_code == 400:
             raise InvalidElementFormat()
         else:
             assert response.status_code == 500
             raise ServerError()
 
-    def remove(self, element_id):
-        response = requests.delete('{EASYDB_URL}/api/v1/{space_name}/{bucket_name}/{element_id}'.format(
-            EASYDB_URL=EASYDB_URL, space_name=self.space.name, bucket_name=self.bucket_name, element_id=element_id))
+    def _removed(self, element_id, response):
+        self._forget(element_id)
         if response.status_code == 404:
+            self._replicate(element_id, None)
             raise ElementNotFound()
         elif response.status_code == 500:
             raise ServerError()
         else:
             assert response.status_code == 200
+            self._replicate(element_id, None)
 
-    def update(self, element_id, element):
-        response = requests.put('{EASYDB_URL}/api/v1/{space_name}/{bucket_name}/{element_id}'.format(
-            EASYDB_URL=EASYDB_URL, space_name=self.space.name, bucket_name=self.bucket_name, element_id=element_id),
-                                json={
-                                    'fields': [{'name': field_name, 'value': field_value} for field_name, field_value in element.items()]
-                                })
+    def _updated(self, element_id, element, response):
+        self._forget(element_id)
         if response.status_code == 200:
-            return {
-                'id': element_id,
-                'bucketName': self.bucket_name,
-                'fields': element
-            }
+            updated_element = self._build_element(element_id, self.bucket_name, element)
+            self._remember(updated_element)
+            self._replicate(element_id, element)
+            return updated_element
         elif response.status_code == 404:
             raise ElementNotFound()
         elif response.status_code == 400:
@@ -75,97 +171,601 @@ class Bucket:
             assert response.status_code == 500
             raise ServerError()
 
-    def filter(self, q):
-        q_string = self._produce_query_string_from_query(q._validate())
-        yield from self._fetch(f'{self._build_url()}?{q_string}')
+    def _cached(self, element_id):
+        # copy of cached element (None when it is not cached) and generation of its cache entry
+        if self.cache is None:
+            return None, None
+        element = self.cache.get(self._cache_key(element_id))
+        if element is not None:
+            return _copy_element(element), None
+        # element written while it is fetched is not cached
+        return None, self.cache.generation(self._cache_key(element_id))
+
+    def _got(self, response, generation):
+        if response.status_code == 200:
+            element = self._map_element(self.client._decode(response))
+            self._remember(element, generation)
+            return element
+        elif response.status_code == 404:
+            raise ElementNotFound()
+        else:
+            raise ServerError()
+
+    def _page(self, response, decode):
+        # pages are decoded by client decoder, in final shape of elements, unless raw `decode` is given
+        assert response.status_code == 200
+        body = self.client._decode(response, decode)
+        return body['next'], body['results']
+
+    @staticmethod
+    def _probed(results, last, page_size):
+        # server may return smaller pages than requested, following pages are requested with its page size
+        if not last and len(results) < page_size:
+            page_size = len(results)
+        return results, last or not results, page_size
+
+    def _parser(self, decode):
+        # elements of pages decoded raw are not shaped either
+        return PageParser(None if decode is not None or self.client.compact_elements else shape_element)
+
+    def _map_element(self, body):
+        # without compact elements bodies are decoded in their final shape
+        if self.client.compact_elements:
+            return Element(body['id'], body['bucketName'], body['fields'])
+        return body
+
+    def _reader(self, fields):
+        # mapper of elements of pages and decoder of the pages (None for client decoder), projections are read
+        # from raw pages, so fields which are not wanted are never turned into dicts
+        if fields is None:
+            return self._map_element, None
+        wanted = frozenset(fields)
+        return (lambda body: self._project(body, wanted)), self.client.codec.decode
+
+    def _project(self, body, wanted):
+        fields = [field for field in body['fields'] if field['name'] in wanted]
+        if self.client.compact_elements:
+            return Element(body['id'], body['bucketName'], fields)
+        return {
+            'id': body['id'],
+            'bucketName': body['bucketName'],
+            'fields': {field['name']: field['value'] for field in fields}
+        }
+
+    def _build_element(self, element_id, bucket_name, fields):
+        if self.client.compact_elements:
+            return Element(element_id, bucket_name, dict(fields))
+        return {
+            'id': element_id,
+            'bucketName': bucket_name,
+            'fields': fields
+        }
+
+    def _request(self, operation, method, url, **kwargs):
+        return self.client.request(method, url, operation=operation, space_name=self.space.name,
+                                   bucket_name=self.bucket_name, **kwargs)
+
+    def _build_url(self):
+        result = '{EASYDB_URL}/api/v1/{space_name}/{bucket_name}'.format(
+            EASYDB_URL=self.client.url, space_name=self.space.name, bucket_name=self.bucket_name)
+        return result
+
+    def _build_query_url(self, q):
+        if q is None:
+            return self._build_url()
+        return '{bucket_url}?{query_string}'.format(bucket_url=self._build_url(), query_string=self._query_string(q))
+
+    def _build_page_url(self, query_string, offset, limit):
+        paging = urlencode({'offset': offset, 'limit': limit})
+        return '{bucket_url}?{query_string}'.format(
+            bucket_url=self._build_url(), query_string=query_string + '&' + paging if query_string else paging)
+
+    def _query_string(self, q):
+        return '' if q is None else Q.compile(q).query_string
+
+    def _build_element_url(self, element_id):
+        return '{bucket_url}/{element_id}'.format(bucket_url=self._build_url(), element_id=element_id)
+
+    def _cache_key(self, element_id):
+        return self.space.name, self.bucket_name, element_id
+
+    def _remember(self, element, generation=None):
+        if self.cache is not None:
+            self.cache.put(self._cache_key(element['id']), _copy_element(element), generation)
+
+    def _forget(self, element_id):
+        if self.cache is not None:
+            self.cache.invalidate(self._cache_key(element_id))
+
+    def _replicate(self, element_id, fields):
+        # written element (fields are None when it was removed) is applied to read replica of the bucket
+        replica = self.client._replicas.get((self.space.name, self.bucket_name))
+        if replica is not None:
+            replica._written(element_id, fields)
+
+    def _unsettled(self, element_id):
+        # write which got no response (deadline exceeded, connection lost) may have been applied by the server,
+        # element is not served from cache and read replica of the bucket is reloaded before it is read again
+        if element_id is not None:
+            self._forget(element_id)
+        replica = self.client._replicas.get((self.space.name, self.bucket_name))
+        if replica is not None:
+            replica._unsettled()
+
 
-    def _produce_query_string_from_query(self, q):
-        if isinstance(q, Q.WhereCriteria):
-            return f'{q.field_name}={q.expected_value}'
-        elif isinstance(q, Q.AndCriteria):
-            left_result = self._produce_query_string_from_query(q.left)
-            right_result = self._produce_query_string_from_query(q.right)
-            return f'{left_result}&{right_result}'
+class Bucket(_BaseBucket):
+    def add(self, element, deadline=None):
+        return self._added(self._write(None, 'add', 'post', self._build_url(), deadline=deadline,
+                                       json=self._element_body(element)))
 
-    def all(self):
+    def remove(self, element_id, deadline=None):
+        self._removed(element_id, self._write(element_id, 'remove', 'delete', self._build_element_url(element_id),
+                                              deadline=deadline))
+
+    def update(self, element_id, element, deadline=None):
+        return self._updated(element_id, element, self._write(
+            element_id, 'update', 'put', self._build_element_url(element_id), deadline=deadline,
+            json=self._element_body(element)))
+
+    def get(self, element_id, deadline=None):
+        element, generation = self._cached(element_id)
+        if element is not None:
+            return element
+        return self._got(self._request('get', 'get', self._build_element_url(element_id), deadline=deadline,
+                                       idempotent=True), generation)
+
+    def add_many(self, elements, concurrency=8):
+        return _run_bulk(self.add, ((element,) for element in elements), concurrency)
+
+    def update_many(self, elements, concurrency=8):
+        return _run_bulk(self.update, elements, concurrency)
+
+    def remove_many(self, element_ids, concurrency=8):
+        return _run_bulk(self.remove, ((element_id,) for element_id in element_ids), concurrency)
+
+    def filter(self, q, prefetch=0, stream=False, fields=None):
+        yield from self._fetch(self._build_query_url(q), prefetch, stream, *self._reader(fields))
+
+    def all(self, prefetch=0, stream=False, fields=None):
         url = self._build_url()
-        yield from self._fetch(url)
+        yield from self._fetch(url, prefetch, stream, *self._reader(fields))
 
-    def _fetch(self, url):
-        next_url, part = self._fetch_part(url)
-        yield from part
+    def count(self, q=None):
+        # elements of pages are counted raw, without turning their fields into dicts or mapping them
+        next_url, count = self._build_query_url(q), 0
+        while next_url:
+            next_url, results = self._fetch_part(next_url, self.client.codec.decode)
+            count += len(results)
+        return count
+
+    def ids(self, q=None, prefetch=0, stream=False):
+        yield from self._fetch(self._build_query_url(q), prefetch, stream, _element_id, self.client.codec.decode)
+
+    def scan(self, q=None, workers=4, page_size=100, fields=None):
+        # pages are requested by offset, by up to `workers` threads at once, and yielded in order
+        mapper, decode = self._reader(fields)
+        query_string = self._query_string(q)
+        results, last, page_size = self._probe_page_size(query_string, page_size, decode)
+        yield from map(mapper, results)
+        if last:
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            next_page = 1
+            try:
+                while True:
+                    while len(in_flight) < workers and not _past_last_page(in_flight, page_size):
+                        in_flight.append(executor.submit(
+                            self._fetch_page, query_string, next_page * page_size, page_size, decode))
+                        next_page += 1
+                    results, last = in_flight.popleft().result()
+                    yield from map(mapper, results)
+                    if last:
+                        return
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def partitions(self, count, q=None, page_size=100, fields=None):
+        # `count` partitions, every one of them fetches every count-th page, for separate consumers
+        query_string = self._query_string(q)
+        _, _, page_size = self._probe_page_size(query_string, page_size)
+        return [Partition(self, query_string, index, count, page_size, fields) for index in range(count)]
+
+    def _write(self, element_id, operation, method, url, **kwargs):
+        # cached element is dropped before it is written, not only when response comes
+        if element_id is not None:
+            self._forget(element_id)
+        try:
+            return self._request(operation, method, url, **kwargs)
+        except BaseException:
+            self._unsettled(element_id)
+            raise
+
+    def _probe_page_size(self, query_string, page_size, decode=None):
+        return self._probed(*self._fetch_page(query_string, 0, page_size, decode), page_size)
+
+    def _fetch_page(self, query_string, offset, limit, decode=None):
+        next_url, results = self._fetch_part(self._build_page_url(query_string, offset, limit), decode)
+        return results, next_url is None
+
+    def _fetch(self, url, prefetch=0, stream=False, mapper=None, decode=None):
+        mapper = mapper or self._map_element
+        if stream and prefetch:
+            raise ValueError('Streamed pages can not be prefetched')
+        if stream:
+            yield from self._stream(url, mapper, decode)
+            return
+        if prefetch:
+            yield from self._fetch_ahead(url, prefetch, mapper, decode)
+            return
+
+        next_url, results = self._fetch_part(url, decode)
+        yield from map(mapper, results)
 
         while next_url:
-            next_url, part = self._fetch_part(next_url)
-            yield from part
+            next_url, results = self._fetch_part(next_url, decode)
+            yield from map(mapper, results)
+
+    def _fetch_ahead(self, url, prefetch, mapper, decode):
+        # pages are fetched by worker thread, at most `prefetch` of them wait for the consumer
+        pages = queue.Queue(maxsize=prefetch)
+        closed = threading.Event()
+
+        def fetch_pages():
+            next_url = url
+            try:
+                while next_url and not closed.is_set():
+                    next_url, results = self._fetch_part(next_url, decode)
+                    pages.put((map(mapper, results), None))
+            except Exception as e:
+                pages.put((None, e))
+                return
+            if not closed.is_set():
+                pages.put((None, None))
+
+        threading.Thread(target=fetch_pages, daemon=True).start()
+        try:
+            while True:
+                part, error = pages.get()
+                if error is not None:
+                    raise error
+                if part is None:
+                    return
+                yield from part
+        finally:
+            closed.set()
+            # unblock worker waiting for free slot, it stops before fetching next page
+            while True:
+                try:
+                    pages.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _stream(self, url, mapper, decode=None):
+        next_url = url
+        while next_url:
+            next_url = yield from self._stream_part(next_url, mapper, decode)
 
-    def _fetch_part(self, url):
-        response = requests.get(url)
-        assert response.status_code == 200
-        body = response.json()
-        return body['next'], ({
-            'id': element['id'],
-            'bucketName': element['bucketName'],
-            'fields': {field['name']: field['value'] for field in element['fields']}
-        } for element in body['results'])
+    def _stream_part(self, url, mapper, decode=None):
+        with self._request('page_stream', 'get', url, stream=True) as response:
+            assert response.status_code == 200
+            parser = self._parser(decode)
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                yield from map(mapper, parser.feed(chunk))
+            yield from map(mapper, parser.close())
+        return parser.next_url
+
+    def _fetch_part(self, url, decode=None):
+        return self._page(self._request('page_fetch', 'get', url, idempotent=True, decode=decode), decode)
+
+
+class Partition:
+    # Every count-th page of bucket (or of its filter) starting from index-th one.
+    # Can be pickled and consumed in other process, which uses its own client with the same url.
+
+    def __init__(self, bucket, query_string, index, count, page_size, fields=None):
+        self.space_name = bucket.space.name
+        self.bucket_name = bucket.bucket_name
+        self.url = bucket.client.url
+        self.compact_elements = bucket.client.compact_elements
+        self.query_string = query_string
+        self.index = index
+        self.count = count
+        self.page_size = page_size
+        self.fields = fields
+        self._bucket = bucket
+
+    def __iter__(self):
+        bucket = self._get_bucket()
+        mapper, decode = bucket._reader(self.fields)
+        page = self.index
+        while True:
+            results, last = bucket._fetch_page(self.query_string, page * self.page_size, self.page_size, decode)
+            yield from map(mapper, results)
+            if last:
+                return
+            page += self.count
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            client = EasydbClient(self.url, compact_elements=self.compact_elements)
+            self._bucket = Space(self.space_name, client).get_bucket(self.bucket_name)
+        return self._bucket
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_bucket'] = None
+        return state
 
-    def _build_url(self):
-        result = '{EASYDB_URL}/api/v1/{space_name}/{bucket_name}'.format(
-            EASYDB_URL=EASYDB_URL, space_name=self.space.name, bucket_name=self.bucket_name)
-        return result
 
-    def get(self, element_id):
-        response = requests.get('{EASYDB_URL}/api/v1/{space_name}/{bucket_name}/{element_id}'.format(
-            EASYDB_URL=EASYDB_URL, space_name=self.space.name, bucket_name=self.bucket_name, element_id=element_id))
+class Space:
+    def __init__(self, name, client=None):
+        self.name = name
+        self.client = client or get_default_client()
+
+    def get_bucket(self, bucket_name, cache=None):
+        return Bucket(self, bucket_name, cache)
+
+
+class _BaseClient:
+    # part of EasydbClient and easydb_client.aio.AsyncEasydbClient which does not do I/O: encoding and decoding
+    # bodies, measurements, urls of spaces and handling of their responses
+
+    def __init__(self, url, cache, compact_elements, deadline, hedging, observer, codec, compression):
+        self.url = url
+        self.cache = cache
+        self.compact_elements = compact_elements
+        # default limit of seconds for every call, None means no limit
+        self.deadline = deadline
+        self.hedging = hedging
+        # easydb_client.metrics.Observer called with measurement of every request
+        self.observer = observer
+        # easydb_client.codec.JsonCodec encoding request and decoding response bodies, orjson when installed
+        self.codec = codec if codec is not None else default_codec()
+        # easydb_client.compression.Compression, asks for compressed responses and compresses large request bodies
+        self.compression = compression
+        # (space name, bucket name) -> easydb_client.replica.BucketReplica, kept up to date with writes of this client
+        self._replicas = {}
+
+    def _encode_body(self, kwargs):
+        if 'json' in kwargs:
+            kwargs['data'] = self.codec.encode(kwargs.pop('json'))
+            kwargs['headers'] = {'Content-Type': 'application/json'}
+            if self.compression is not None and self.compression.should_compress(kwargs['data']):
+                kwargs['data'] = self.compression.compress(kwargs['data'])
+                kwargs['headers']['Content-Encoding'] = CONTENT_ENCODING
+
+    @staticmethod
+    def _measurement(operation, space_name, bucket_name):
+        from .metrics import Measurement
+        return Measurement(operation, space_name, bucket_name)
+
+    def _decoder(self):
+        # compact elements decode their fields on first access
+        return self.codec.decode if self.compact_elements else self.codec.decode_elements
+
+    def _decode(self, response, decode=None):
+        # body decoded while response was measured is taken by single caller decoding it the same way, others
+        # sharing coalesced response decode their own copy, so decoded elements are never shared between callers
+        decode = decode or self._decoder()
+        decoded = response.__dict__.pop('decoded_body', None)
+        if decoded is not None and decoded[0] == decode:
+            return decoded[1]
+        return decode(response.content)
+
+    def _spaces_url(self):
+        return '{EASYDB_URL}/api/v1/spaces'.format(EASYDB_URL=self.url)
+
+    def _space_url(self, space_name):
+        return '{EASYDB_URL}/api/v1/spaces/{space_name}'.format(EASYDB_URL=self.url, space_name=space_name)
+
+    def _created_space_name(self, response):
+        assert response.status_code == 201
+        return self._decode(response)['spaceName']
+
+    def _found_space_name(self, response):
         if response.status_code == 200:
-            body = response.json()
-            return {
-                'id': body['id'],
-                'bucketName': body['bucketName'],
-                'fields': {field['name']: field['value'] for field in body['fields']}
-            }
-        elif response.status_code == 404:
-            raise ElementNotFound()
+            return self._decode(response)['spaceName']
         else:
-            raise ServerError()
+            assert response.status_code == 404
+            raise SpaceNotFound()
 
+    @staticmethod
+    def _removed_space(response):
+        if response.status_code == 404:
+            raise SpaceNotFound()
+        elif response.status_code == 500:
+            raise ServerError()
+        else:
+            assert response.status_code == 200
 
-class Space:
-    def __init__(self, name):
-        self.name = name
 
-    def get_bucket(self, bucket_name):
-        return Bucket(self, bucket_name)
+class EasydbClient(_BaseClient):
+    def __init__(self, url=EASYDB_URL, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 connect_timeout=None, read_timeout=None, max_retries=0, cache=None, compact_elements=False,
+                 deadline=None, hedging=None, coalesce=True, observer=None, codec=None, transport=None,
+                 compression=None):
+        super().__init__(url, cache, compact_elements, deadline, hedging, observer, codec, compression)
+        self.timeout = (connect_timeout, read_timeout)
+        # concurrent identical reads share single http call
+        self.single_flight = SingleFlight() if coalesce else None
+        # easydb_client.transport sending requests, pooled connections of requests session by default
+        if transport is None:
+            from .transport_requests import RequestsTransport
+            transport = RequestsTransport(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                          pool_block=pool_block, max_retries=max_retries)
+        self.transport = transport
+        self.session = getattr(self.transport, 'session', None)
+        self._pool_maxsize = pool_maxsize
+        # attempts and shared calls waiting for attempts are run by separate pools, so they can not starve each other
+        self._executors = {}
+        self._executor_lock = threading.Lock()
+
+    def request(self, method, url, deadline=None, idempotent=False, operation=None, space_name=None,
+                bucket_name=None, decode=None, **kwargs):
+        self._encode_body(kwargs)
+        if self.observer is None:
+            return self._call(method, url, deadline, idempotent, kwargs)
+        measurement = self._measurement(operation or method, space_name, bucket_name)
+        started = time.perf_counter()
+        try:
+            response = self._call(method, url, deadline, idempotent, kwargs)
+            _measure_response(measurement, response, kwargs.get('stream', False), decode or self._decoder())
+        except Exception as e:
+            measurement.error = e
+            raise
+        finally:
+            measurement.duration = time.perf_counter() - started
+            self.observer.observe(measurement)
+        return response
+
+    def _call(self, method, url, deadline, idempotent, kwargs):
+        if deadline is None:
+            deadline = self.deadline
+        expires_at = None if deadline is None else time.monotonic() + deadline
+        if idempotent and self.single_flight is not None and not kwargs:
+            from concurrent.futures import TimeoutError as FutureTimeoutError
+            try:
+                # shared call is limited by deadline of the caller which started it, callers waiting longer than
+                # that start their own
+                return self.single_flight.do(
+                    (method, url), lambda: self._request(method, url, expires_at, idempotent, kwargs), expires_at,
+                    executor=None if expires_at is None else self._get_executor('shared calls'))
+            except FutureTimeoutError:
+                raise DeadlineExceeded()
+        try:
+            return self._request(method, url, expires_at, idempotent, kwargs)
+        finally:
+            if not idempotent and self.single_flight is not None:
+                # reads in flight may have read what was there before the write, later callers do not share them
+                self.single_flight.forget(('get', url))
+
+    def _request(self, method, url, expires_at, idempotent, kwargs):
+        if idempotent and self.hedging is not None:
+            return self._hedged_request(method, url, expires_at, kwargs)
+        if expires_at is None:
+            return self._send(method, url, None, kwargs)
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+        attempt = self._get_executor().submit(self._send, method, url, expires_at, kwargs)
+        try:
+            return attempt.result(timeout=max(expires_at - time.monotonic(), 0))
+        except FutureTimeoutError:
+            raise DeadlineExceeded()
+
+    def _hedged_request(self, method, url, expires_at, kwargs):
+        from concurrent.futures import FIRST_COMPLETED
+        from concurrent.futures import wait
+        executor = self._get_executor()
+        started = hedge_started = time.monotonic()
+        first = executor.submit(self._send, method, url, expires_at, kwargs)
+        attempts = [first]
+        delay = self.hedging.delay if expires_at is None else min(self.hedging.delay, expires_at - started)
+        done, _ = wait(attempts, timeout=max(delay, 0))
+        if not done and (expires_at is None or time.monotonic() < expires_at):
+            hedge_started = time.monotonic()
+            attempts.append(executor.submit(self._send, method, url, expires_at, kwargs))
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=None if expires_at is None else max(expires_at - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded()
+            for attempt in done:
+                if attempt.exception() is None:
+                    hedge_won = attempt is not first
+                    self.hedging.record(time.monotonic() - (hedge_started if hedge_won else started),
+                                        hedged=len(attempts) > 1, hedge_won=hedge_won)
+                    return attempt.result()
+                error = error or attempt.exception()
+        raise error
+
+    def _send(self, method, url, expires_at, kwargs):
+        timeout = self.timeout
+        if expires_at is not None:
+            remaining = max(expires_at - time.monotonic(), 0.001)
+            timeout = tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        if self.compression is not None:
+            # added here, so identical reads still share calls
+            headers = dict(kwargs.get('headers') or {})
+            headers['Accept-Encoding'] = ACCEPT_ENCODING
+            kwargs = dict(kwargs, headers=headers)
+        try:
+            return self.transport.request(method, url, timeout=timeout, **kwargs)
+        except self.transport.timeout_errors:
+            if expires_at is not None and time.monotonic() >= expires_at:
+                raise DeadlineExceeded()
+            raise
+
+    def _get_executor(self, purpose='attempts'):
+        from concurrent.futures import ThreadPoolExecutor
+        with self._executor_lock:
+            if purpose not in self._executors:
+                self._executors[purpose] = ThreadPoolExecutor(max_workers=2 * self._pool_maxsize)
+            return self._executors[purpose]
+
+    def create_space(self, deadline=None):
+        response = self.request('post', self._spaces_url(), deadline=deadline, operation='create_space')
+        return Space(self._created_space_name(response), self)
+
+    def get_space(self, space_name, deadline=None):
+        response = self.request('get', self._space_url(space_name), deadline=deadline, idempotent=True,
+                                operation='get_space', space_name=space_name)
+        return Space(self._found_space_name(response), self)
+
+    def space_exists(self, space_name, deadline=None):
+        try:
+            self.get_space(space_name, deadline)
+            return True
+        except SpaceNotFound:
+            return False
+
+    def remove_space(self, space_name, deadline=None):
+        self._removed_space(self.request('delete', self._space_url(space_name), deadline=deadline,
+                                         operation='remove_space', space_name=space_name))
+
+    def close(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_default_client = None
+
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = EasydbClient()
+    return _default_client
+
+
+def set_default_client(client):
+    global _default_client
+    _default_client = client
 
 
 def create_space():
-    response = requests.post('{EASYDB_URL}/api/v1/spaces'.format(EASYDB_URL=EASYDB_URL))
-    assert response.status_code == 201
-    return Space(response.json()['spaceName'])
+    return get_default_client().create_space()
 
 
 def get_space(space_name):
-    response = requests.get('{EASYDB_URL}/api/v1/spaces/{space_name}'.format(EASYDB_URL=EASYDB_URL, space_name=space_name))
-    if response.status_code == 200:
-        return Space(response.json()['spaceName'])
-    else:
-        assert response.status_code == 404
-        raise SpaceNotFound()
+    return get_default_client().get_space(space_name)
 
 
 def space_exists(space_name):
-    try:
-        get_space(space_name)
-        return True
-    except SpaceNotFound:
-        return False
+    return get_default_client().space_exists(space_name)
 
 
 def remove_space(space_name):
-    response = requests.delete('{EASYDB_URL}/api/v1/spaces/{space_name}'.format(EASYDB_URL=EASYDB_URL, space_name=space_name))
-    if response.status_code == 404:
-        raise SpaceNotFound()
-    elif response.status_code == 500:
-        raise ServerError()
-    else:
-        assert response.status_code == 200
\ No newline at end of file
+    get_default_client().remove_space(space_name)
@@ -0,0 +1,51 @@
+import sys
+from collections.abc import Mapping
+
+
+class Element(Mapping):
+    # compact, read only mapping with the same keys as element dict: 'id', 'bucketName' and 'fields'
+    # fields received from api as list of {'name': ..., 'value': ...} are turned into dict on first access
+
+    __slots__ = ('id', 'bucket_name', '_fields')
+
+    _keys = ('id', 'bucketName', 'fields')
+
+    def __init__(self, element_id, bucket_name, fields):
+        self.id = element_id
+        self.bucket_name = sys.intern(bucket_name)
+        self._fields = fields
+
+    @property
+    def fields(self):
+        fields = self._fields
+        if isinstance(fields, list):
+            fields = self._fields = {field['name']: field['value'] for field in fields}
+        return fields
+
+    def copy(self):
+        return Element(self.id, self.bucket_name, dict(self.fields))
+
+    def __getitem__(self, key):
+        if key == 'fields':
+            return self.fields
+        elif key == 'id':
+            return self.id
+        elif key == 'bucketName':
+            return self.bucket_name
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        return 'Element(id={id!r}, bucketName={bucket_name!r}, fields={fields!r})'.format(
+            id=self.id, bucket_name=self.bucket_name, fields=self.fields)
+
+    def __getstate__(self):
+        return self.id, self.bucket_name, self.fields
+
+    def __setstate__(self, state):
+        self.id, self.bucket_name, self._fields = state
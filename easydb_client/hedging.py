@@ -0,0 +1,44 @@
+import threading
+from collections import deque
+from collections import namedtuple
+
+HedgingInfo = namedtuple('HedgingInfo', ['requests', 'hedges', 'hedges_won', 'delay'])
+
+
+class HedgingPolicy:
+    # Second attempt of idempotent request is sent when first one did not answer within `percentile`
+    # of recently observed latencies, whichever answers first wins.
+    # Until `min_samples` latencies were observed `initial_delay` (seconds) is used.
+
+    def __init__(self, percentile=95, initial_delay=0.05, min_delay=0.001, window=1000, min_samples=20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self._delay = initial_delay
+        self._latencies = deque(maxlen=window)
+        self._recorded_since_update = 0
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self):
+        return self._delay
+
+    def record(self, latency, hedged=False, hedge_won=False):
+        with self._lock:
+            self.requests += 1
+            self.hedges += hedged
+            self.hedges_won += hedge_won
+            self._latencies.append(latency)
+            self._recorded_since_update += 1
+            if len(self._latencies) >= self.min_samples and self._recorded_since_update >= self.min_samples:
+                ordered = sorted(self._latencies)
+                position = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+                self._delay = max(self.min_delay, ordered[position])
+                self._recorded_since_update = 0
+
+    def info(self):
+        with self._lock:
+            return HedgingInfo(self.requests, self.hedges, self.hedges_won, self._delay)
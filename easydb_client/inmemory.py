@@ -1,47 +1,212 @@
+import threading
+from itertools import islice
 from uuid import uuid1
 
 from .easydb import SpaceNotFound
 from .easydb import ElementNotFound
 from .easydb import InvalidElementFormat
+from .easydb import BulkResult
+from .element import Element
 
 from . import query
+from .inmemory_storage import ADD_SPACE
+from .inmemory_storage import REMOVE_ALL_SPACES
+from .inmemory_storage import REMOVE_SPACE
+from .inmemory_storage import LogStorage
 
-# in memory, NOT THREAD SAFE implementation of easydb client interface
-# for testing and local development
+# in memory implementation of easydb client interface for testing and local development
+# every bucket has its own lock, so writers to different buckets do not contend
+# scans iterate over snapshot of the bucket taken when they were started
+
+# retired element versions kept in log before it is compacted
+MIN_VERSIONS_TO_COMPACT = 1024
+
+
+class ElementVersion:
+    __slots__ = ('element', 'created_at', 'retired_at', 'indexed')
+
+    def __init__(self, element, created_at):
+        self.element = element
+        self.created_at = created_at
+        self.retired_at = None
+        # field name -> value under which the element was put into index of that field, so it is taken out
+        # of the same entry even when caller modified fields of the element it was given
+        self.indexed = None
 
 
 class ElementsRepository:
-    def __init__(self, bucket_name):
+    # Elements are versioned. Every write bumps bucket version. Log has one slot (list of versions, the newest last)
+    # per element, in order of adding, update appends new version to the slot of element and marks replaced one
+    # as retired at that version, so elements keep their place. Snapshot is (log, its length, version), so it is
+    # taken in O(1) and sees in every slot appended before it the version which was current when it was taken.
+    # Log is compacted into new list of slots with only current versions when most of versions are retired,
+    # snapshots keep iterating over the old one.
+
+    def __init__(self, bucket_name, auto_index=True, journal=None, compact_elements=False):
         self._bucket_name = bucket_name
+        self._journal = journal
+        self._compact_elements = compact_elements
+        # pk -> live element version, slot of the element in log and its position in log (kept by compaction),
+        # by which elements matched by indexes are ordered like the log
         self._elements = {}
+        self._slots = {}
+        self._positions = {}
+        self._added = 0
+        self._log = []
+        self._version = 0
+        self._retired = 0
+        # field name -> field value -> ordered set (dict with None values) of element pks
+        self._indexes = {}
+        self._auto_index = auto_index
+        self._lock = threading.RLock()
 
     def add(self, element):
         pk = str(uuid1())
         if not self._is_valid(element):
             raise InvalidElementFormat()
         element_to_store = self._map_to_internal_representation(element, pk)
-        self._elements[pk] = element_to_store
+        with self._lock:
+            self._store(element_to_store)
         return element_to_store
 
     def remove(self, element_pk):
-        if not self.exists(element_pk):
-            raise ElementNotFound()
-        del self._elements[element_pk]
+        with self._lock:
+            if not self.exists(element_pk):
+                raise ElementNotFound()
+            self._unstore(element_pk)
+
+    def add_many(self, elements):
+        for element in elements:
+            if not self._is_valid(element):
+                yield BulkResult(None, InvalidElementFormat())
+                continue
+            element_to_store = self._map_to_internal_representation(element, str(uuid1()))
+            with self._lock:
+                self._store(element_to_store)
+            yield BulkResult(element_to_store, None)
+
+    def update_many(self, elements):
+        for element_pk, element in elements:
+            if not self._is_valid(element):
+                yield BulkResult(None, InvalidElementFormat())
+                continue
+            element_to_store = self._map_to_internal_representation(element, element_pk)
+            with self._lock:
+                found = element_pk in self._elements
+                if found:
+                    self._store(element_to_store)
+            yield BulkResult(element_to_store, None) if found else BulkResult(None, ElementNotFound())
+
+    def remove_many(self, element_pks):
+        for element_pk in element_pks:
+            with self._lock:
+                found = element_pk in self._elements
+                if found:
+                    self._unstore(element_pk)
+            yield BulkResult(None, None) if found else BulkResult(None, ElementNotFound())
+
+    def create_index(self, field_name):
+        with self._lock:
+            if field_name not in self._indexes:
+                index = {}
+                for pk, element_version in self._elements.items():
+                    fields = element_version.element['fields']
+                    if field_name in fields:
+                        self._index(index, field_name, pk, element_version, fields[field_name])
+                self._indexes[field_name] = index
+
+    def drop_index(self, field_name):
+        with self._lock:
+            self._indexes.pop(field_name, None)
 
-    def filter(self, q):
-        result = (e for e in self._elements.values())
-        return self._filter_by_query(result, q._validate())
+    @property
+    def indexed_fields(self):
+        return set(self._indexes)
 
-    def _filter_by_query(self, result, q):
-        if isinstance(q, query.WhereCriteria):
-            return (e for e in result if q.field_name in e['fields'] and e['fields'][q.field_name] == q.expected_value)
-        elif isinstance(q, query.AndCriteria):
-            result = self._filter_by_query(result, q.left)
-            return self._filter_by_query(result, q.right)
+    def filter(self, q):
+        compiled_query = query.compile(q)
+        with self._lock:
+            pks, fully_indexed = self._match_indexes(compiled_query)
+            if pks is None:
+                return self._filter_by_query(self._snapshot(), compiled_query)
+            matching = [self._elements[pk].element for pk in self._in_log_order(pks)]
+        if not fully_indexed:
+            return self._filter_by_query(matching, compiled_query)
+        return (e for e in matching)
+
+    def count(self, q=None):
+        if q is None:
+            return len(self._elements)
+        compiled_query = query.compile(q)
+        with self._lock:
+            pks, fully_indexed = self._match_indexes(compiled_query)
+            if fully_indexed:
+                # O(1) for single field
+                return len(pks)
+        return sum(1 for _ in self.filter(compiled_query))
+
+    def ids(self, q=None):
+        if q is None:
+            return (e['id'] for e in self._snapshot())
+        compiled_query = query.compile(q)
+        with self._lock:
+            pks, fully_indexed = self._match_indexes(compiled_query)
+            if fully_indexed:
+                return iter(self._in_log_order(pks))
+        return (e['id'] for e in self.filter(compiled_query))
+
+    def _match_indexes(self, compiled_query):
+        # pks matching indexed terms of the query (None when none of them is indexed)
+        # and whether all of its terms are indexed, called with lock held
+        if self._auto_index:
+            for field_name, _ in compiled_query.terms:
+                self.create_index(field_name)
+        indexed = [t for t in compiled_query.terms if t[0] in self._indexes]
+        if not indexed:
+            return None, False
+
+        # intersect pk sets starting from the smallest one
+        pk_sets = sorted((self._indexes[field_name].get(value, {}) for field_name, value in indexed), key=len)
+        smallest, others = pk_sets[0], pk_sets[1:]
+        if others:
+            smallest = [pk for pk in smallest if all(pk in pks for pks in others)]
+        return smallest, len(indexed) == len(compiled_query.terms)
+
+    def _in_log_order(self, pks):
+        return sorted(pks, key=self._positions.__getitem__)
+
+    def project(self, elements, fields):
+        wanted = list(fields)
+        for element in elements:
+            element_fields = element['fields']
+            projected = {name: element_fields[name] for name in wanted if name in element_fields}
+            if self._compact_elements:
+                yield Element(element['id'], self._bucket_name, projected)
+            else:
+                yield {'id': element['id'], 'bucketName': self._bucket_name, 'fields': projected}
+
+    def _filter_by_query(self, result, compiled_query):
+        predicate = compiled_query.predicate
+        return (e for e in result if predicate(e['fields']))
 
     @property
     def all(self):
-        return (e for e in self._elements.values())
+        return self._snapshot()
+
+    def _snapshot(self):
+        with self._lock:
+            return self._iterate_versions(self._log, len(self._log), self._version)
+
+    @staticmethod
+    def _iterate_versions(log, length, version):
+        for slot in islice(log, length):
+            element_version = slot[-1]
+            if element_version.created_at > version:
+                # updated after snapshot was taken
+                element_version = next(v for v in reversed(slot) if v.created_at <= version)
+            retired_at = element_version.retired_at
+            if retired_at is None or retired_at > version:
+                yield element_version.element
 
     def exists(self, element_pk):
         return element_pk in self._elements
@@ -49,19 +214,94 @@ class ElementsRepository:
     def update(self, element_pk, element):
         if not self._is_valid(element):
             raise InvalidElementFormat()
-        if not self.exists(element_pk):
-            raise ElementNotFound()
-        self._elements[element_pk] = self._map_to_internal_representation(element, element_pk)
-        return self._elements[element_pk]
+        element_to_store = self._map_to_internal_representation(element, element_pk)
+        with self._lock:
+            if not self.exists(element_pk):
+                raise ElementNotFound()
+            self._store(element_to_store)
+        return element_to_store
 
     def get(self, element_pk):
-        if not self.exists(element_pk):
+        element_version = self._elements.get(element_pk)
+        if element_version is None:
             raise ElementNotFound()
-        return self._elements[element_pk]
+        return element_version.element
+
+    def _store(self, element):
+        pk = element['id']
+        self._version += 1
+        element_version = ElementVersion(element, self._version)
+        previous = self._elements.get(pk)
+        if previous is not None:
+            self._retire(pk, previous, element['fields'])
+            self._slots[pk].append(element_version)
+        else:
+            slot = [element_version]
+            self._slots[pk] = slot
+            self._log.append(slot)
+            self._positions[pk] = self._added
+            self._added += 1
+        self._elements[pk] = element_version
+        if self._journal is not None:
+            self._journal.put(element)
+        fields = element['fields']
+        for field_name, index in self._indexes.items():
+            if field_name in fields:
+                self._index(index, field_name, pk, element_version, fields[field_name])
+        self._compact()
+
+    def _unstore(self, element_pk):
+        self._version += 1
+        del self._slots[element_pk]
+        del self._positions[element_pk]
+        self._retire(element_pk, self._elements.pop(element_pk))
+        if self._journal is not None:
+            self._journal.remove(element_pk)
+        self._compact()
+
+    @staticmethod
+    def _index(index, field_name, pk, element_version, value):
+        index.setdefault(value, {})[pk] = None
+        if element_version.indexed is None:
+            element_version.indexed = {}
+        element_version.indexed[field_name] = value
+
+    def _restore(self, element_pk, fields):
+        with self._lock:
+            self._store(self._map_to_internal_representation(fields, element_pk))
+
+    def _restore_removal(self, element_pk):
+        with self._lock:
+            if element_pk in self._elements:
+                self._unstore(element_pk)
+
+    def _retire(self, element_pk, element_version, fields=None):
+        # entries of values not changed by update (`fields` of new version) are kept, so they keep their place
+        element_version.retired_at = self._version
+        indexed = element_version.indexed or {}
+        fields = fields or {}
+        for field_name, index in self._indexes.items():
+            if field_name in indexed:
+                value = indexed[field_name]
+                if field_name in fields and fields[field_name] == value:
+                    continue
+                pks = index[value]
+                del pks[element_pk]
+                if not pks:
+                    del index[value]
+        self._retired += 1
+
+    def _compact(self):
+        if self._retired > MIN_VERSIONS_TO_COMPACT and self._retired > len(self._elements):
+            self._log = [[slot[-1]] for slot in self._log if slot[-1].retired_at is None]
+            self._slots = {slot[0].element['id']: slot for slot in self._log}
+            self._retired = 0
 
     def _map_to_internal_representation(self, element, pk):
+        if self._compact_elements:
+            return Element(pk, self._bucket_name, dict(element))
         return {
-            'fields': element,
+            'fields': dict(element),
             'id': pk,
             'bucketName': self._bucket_name
         }
@@ -76,62 +316,145 @@ class InMemoryBucket:
     def __init__(self, space, name):
         self.space = space
         self.name = name
-        self._elements_repository = ElementsRepository(name)
+        self._elements_repository = ElementsRepository(
+            name, journal=space._journal(name), compact_elements=space.compact_elements)
 
-    def add(self, element):
+    def add(self, element, deadline=None):
         return self._elements_repository.add(element)
 
-    def remove(self, element_pk):
+    def remove(self, element_pk, deadline=None):
         self._elements_repository.remove(element_pk)
 
-    def update(self, element_pk, element):
+    def update(self, element_pk, element, deadline=None):
         return self._elements_repository.update(element_pk, element)
 
-    def all(self):
+    def add_many(self, elements, concurrency=None):
+        return self._elements_repository.add_many(elements)
+
+    def update_many(self, elements, concurrency=None):
+        return self._elements_repository.update_many(elements)
+
+    def remove_many(self, element_pks, concurrency=None):
+        return self._elements_repository.remove_many(element_pks)
+
+    def all(self, prefetch=0, stream=False, fields=None):
+        if fields is not None:
+            return self._elements_repository.project(self._elements_repository.all, fields)
         return self._elements_repository.all
 
-    def filter(self, q):
+    def filter(self, q, prefetch=0, stream=False, fields=None):
+        if fields is not None:
+            return self._elements_repository.project(self._elements_repository.filter(q), fields)
         return self._elements_repository.filter(q)
 
-    def get(self, element_pk):
+    def scan(self, q=None, workers=4, page_size=100, fields=None):
+        return self.all(fields=fields) if q is None else self.filter(q, fields=fields)
+
+    def partitions(self, count, q=None, page_size=100, fields=None):
+        elements = list(self.scan(q, fields=fields))
+        return [elements[index::count] for index in range(count)]
+
+    def count(self, q=None):
+        return self._elements_repository.count(q)
+
+    def ids(self, q=None, prefetch=0, stream=False):
+        return self._elements_repository.ids(q)
+
+    def get(self, element_pk, deadline=None):
         return self._elements_repository.get(element_pk)
 
+    def create_index(self, field_name):
+        self._elements_repository.create_index(field_name)
+
 
 class InMemorySpace:
-    def __init__(self, name):
+    def __init__(self, name, storage=None, compact_elements=False):
         self.name = name
+        self.compact_elements = compact_elements
         self._buckets = {}
+        self._lock = threading.Lock()
+        self._storage = storage
 
     def get_bucket(self, bucket_name):
-        if bucket_name not in self._buckets:
-            self._buckets[bucket_name] = InMemoryBucket(self, bucket_name)
-        return self._buckets[bucket_name]
+        with self._lock:
+            if bucket_name not in self._buckets:
+                self._buckets[bucket_name] = InMemoryBucket(self, bucket_name)
+            return self._buckets[bucket_name]
+
+    def _journal(self, bucket_name):
+        if self._storage is None:
+            return None
+        return self._storage.journal(self.name, bucket_name)
+
+    def _attach_storage(self, storage):
+        with self._lock:
+            self._storage = storage
+            for bucket in self._buckets.values():
+                bucket._elements_repository._journal = self._journal(bucket.name)
+
+    def _snapshot_buckets(self):
+        with self._lock:
+            return list(self._buckets.values())
 
 
 class SpaceRepository:
-    def __init__(self):
+    def __init__(self, compact_elements=False):
         self.spaces = {}
+        # store elements of spaces created from now on as compact Element instead of dict
+        self.compact_elements = compact_elements
+        self._lock = threading.Lock()
+        self._storage = None
 
     def add(self):
-        space_name = uuid1()
-        self.spaces[space_name] = InMemorySpace(space_name)
-        return self.spaces[space_name]
+        with self._lock:
+            space = InMemorySpace(str(uuid1()), self._storage, self.compact_elements)
+            self.spaces[space.name] = space
+            self._record(ADD_SPACE, space.name)
+        return space
 
     def get(self, space_name):
-        if not self.exists(space_name):
+        space = self.spaces.get(space_name)
+        if space is None:
             raise SpaceNotFound()
-        return self.spaces[space_name]
+        return space
 
     def exists(self, space_name):
         return space_name in self.spaces
 
     def remove(self, space_name):
-        if not self.exists(space_name):
-            raise SpaceNotFound()
-        del self.spaces[space_name]
+        with self._lock:
+            if not self.exists(space_name):
+                raise SpaceNotFound()
+            del self.spaces[space_name]
+            self._record(REMOVE_SPACE, space_name)
 
     def remove_all(self):
-        self.spaces = {}
+        with self._lock:
+            self.spaces = {}
+            self._record(REMOVE_ALL_SPACES)
+
+    def make_durable(self, storage):
+        with self._lock:
+            had_spaces = bool(self.spaces)
+            replayed_logs = storage.load(self)
+            storage.attach(self)
+            self._storage = storage
+            for space in self.spaces.values():
+                space._attach_storage(storage)
+        if had_spaces or replayed_logs:
+            storage.compact()
+
+    def _record(self, *entry):
+        if self._storage is not None:
+            self._storage.record(*entry)
+
+    def _restore_space(self, space_name):
+        if space_name not in self.spaces:
+            self.spaces[space_name] = InMemorySpace(space_name, compact_elements=self.compact_elements)
+
+    def _snapshot_spaces(self):
+        with self._lock:
+            return list(self.spaces.values())
 
 
 space_repository = SpaceRepository()
@@ -142,4 +465,10 @@ get_space = space_repository.get
 space_exists = space_repository.exists
 remove_space = space_repository.remove
 
-remove_all_spaces = space_repository.remove_all
\ No newline at end of file
+remove_all_spaces = space_repository.remove_all
+
+
+def make_durable(directory, fsync=False, max_log_size=64 * 1024 * 1024):
+    storage = LogStorage(directory, fsync, max_log_size)
+    space_repository.make_durable(storage)
+    return storage
\ No newline at end of file
@@ -0,0 +1,82 @@
+from . import inmemory
+
+# asyncio version of in memory implementation, shares state with easydb_client.inmemory
+
+
+class AsyncInMemoryBucket:
+    def __init__(self, space, bucket):
+        self.space = space
+        self.name = bucket.name
+        self._bucket = bucket
+
+    async def add(self, element, deadline=None):
+        return self._bucket.add(element)
+
+    async def remove(self, element_pk, deadline=None):
+        self._bucket.remove(element_pk)
+
+    async def update(self, element_pk, element, deadline=None):
+        return self._bucket.update(element_pk, element)
+
+    async def get(self, element_pk, deadline=None):
+        return self._bucket.get(element_pk)
+
+    async def add_many(self, elements, concurrency=None):
+        for result in self._bucket.add_many(elements):
+            yield result
+
+    async def update_many(self, elements, concurrency=None):
+        for result in self._bucket.update_many(elements):
+            yield result
+
+    async def remove_many(self, element_pks, concurrency=None):
+        for result in self._bucket.remove_many(element_pks):
+            yield result
+
+    async def all(self, prefetch=0, stream=False, fields=None):
+        for element in self._bucket.all(fields=fields):
+            yield element
+
+    async def filter(self, q, prefetch=0, stream=False, fields=None):
+        for element in self._bucket.filter(q, fields=fields):
+            yield element
+
+    async def scan(self, q=None, workers=4, page_size=100, fields=None):
+        for element in self._bucket.scan(q, fields=fields):
+            yield element
+
+    async def count(self, q=None):
+        return self._bucket.count(q)
+
+    async def ids(self, q=None, prefetch=0, stream=False):
+        for element_id in self._bucket.ids(q):
+            yield element_id
+
+
+class AsyncInMemorySpace:
+    def __init__(self, space):
+        self.name = space.name
+        self._space = space
+
+    def get_bucket(self, bucket_name):
+        return AsyncInMemoryBucket(self, self._space.get_bucket(bucket_name))
+
+
+async def create_space():
+    return AsyncInMemorySpace(inmemory.space_repository.add())
+
+
+async def get_space(space_name):
+    return AsyncInMemorySpace(inmemory.space_repository.get(space_name))
+
+
+async def space_exists(space_name):
+    return inmemory.space_repository.exists(space_name)
+
+
+async def remove_space(space_name):
+    inmemory.space_repository.remove(space_name)
+
+
+async def remove_all_spaces():
+    inmemory.space_repository.remove_all()
@@ -0,0 +1,177 @@
+import json
+import mmap
+import os
+import re
+import threading
+
+# durable storage for in memory implementation
+#
+# Every mutation is appended as json line to log-<generation>.jsonl. Compaction starts new log generation
+# and writes all live spaces and elements to snapshot-<generation>.jsonl, using the same entries as the log,
+# after which older logs and snapshots are removed. On load newest snapshot is replayed followed by logs
+# of its generation and newer ones. Replay is idempotent, so entries present both in snapshot and in log are harmless.
+# Every run appends to a log of its own generation, so logs replayed on load are compacted right away, otherwise
+# they would pile up across restarts.
+
+ADD_SPACE = 's+'
+REMOVE_SPACE = 's-'
+REMOVE_ALL_SPACES = 's0'
+PUT_ELEMENT = 'e+'
+REMOVE_ELEMENT = 'e-'
+
+_file_name_pattern = re.compile(r'^(log|snapshot)-(\d+)\.jsonl$')
+
+
+class CorruptedStorage(RuntimeError):
+    pass
+
+
+class BucketJournal:
+    def __init__(self, storage, space_name, bucket_name):
+        self._storage = storage
+        self._space_name = space_name
+        self._bucket_name = bucket_name
+
+    def put(self, element):
+        self._storage.record(PUT_ELEMENT, self._space_name, self._bucket_name, element['id'], element['fields'])
+
+    def remove(self, element_pk):
+        self._storage.record(REMOVE_ELEMENT, self._space_name, self._bucket_name, element_pk)
+
+
+class LogStorage:
+    def __init__(self, directory, fsync=False, max_log_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.fsync = fsync
+        self.max_log_size = max_log_size
+        self._repository = None
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self._compacting = False
+        self._log = None
+        self._log_size = 0
+        self._generation = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def journal(self, space_name, bucket_name):
+        return BucketJournal(self, space_name, bucket_name)
+
+    def load(self, space_repository):
+        snapshots, logs = self._list_files()
+        start = max(snapshots, default=0)
+        if start:
+            self._replay(self._path('snapshot', start), space_repository)
+        replayed = sorted(g for g in logs if g >= start)
+        for generation in replayed:
+            self._replay(self._path('log', generation), space_repository)
+        self._generation = max(list(snapshots) + list(logs), default=0)
+        return bool(replayed)
+
+    def attach(self, space_repository):
+        self._repository = space_repository
+        with self._lock:
+            self._open_log(self._generation + 1)
+
+    def record(self, *entry):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._log.write(line)
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._log_size += len(line)
+            start_compaction = self._log_size > self.max_log_size and not self._compacting
+            if start_compaction:
+                self._compacting = True
+        if start_compaction:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        with self._compaction_lock:
+            with self._lock:
+                generation = self._generation + 1
+                self._open_log(generation)
+            # writes logged to new generation after this point may also be part of snapshot
+            spaces = self._repository._snapshot_spaces()
+            snapshot_path = self._path('snapshot', generation)
+            with open(snapshot_path + '.tmp', 'w') as snapshot:
+                for space in spaces:
+                    snapshot.write(json.dumps([ADD_SPACE, space.name]) + '\n')
+                    for bucket in space._snapshot_buckets():
+                        for element in bucket.all():
+                            snapshot.write(json.dumps(
+                                [PUT_ELEMENT, space.name, bucket.name, element['id'], element['fields']],
+                                separators=(',', ':')) + '\n')
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(snapshot_path + '.tmp', snapshot_path)
+            self._remove_older_than(generation)
+            with self._lock:
+                self._compacting = False
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def disk_usage(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+
+    def _open_log(self, generation):
+        if self._log is not None:
+            self._log.close()
+        self._generation = generation
+        self._log = open(self._path('log', generation), 'a')
+        self._log_size = self._log.tell()
+
+    def _remove_older_than(self, generation):
+        snapshots, logs = self._list_files()
+        for older in (g for g in snapshots if g < generation):
+            os.remove(self._path('snapshot', older))
+        for older in (g for g in logs if g < generation):
+            os.remove(self._path('log', older))
+
+    def _list_files(self):
+        snapshots, logs = set(), set()
+        for name in os.listdir(self.directory):
+            match = _file_name_pattern.match(name)
+            if match:
+                (logs if match.group(1) == 'log' else snapshots).add(int(match.group(2)))
+        return snapshots, logs
+
+    def _path(self, kind, generation):
+        return os.path.join(self.directory, '{kind}-{generation:010d}.jsonl'.format(kind=kind, generation=generation))
+
+    def _replay(self, path, space_repository):
+        for entry in self._read_entries(path):
+            operation = entry[0]
+            if operation == PUT_ELEMENT:
+                space = space_repository.spaces.get(entry[1])
+                if space is not None:
+                    space.get_bucket(entry[2])._elements_repository._restore(entry[3], entry[4])
+            elif operation == REMOVE_ELEMENT:
+                space = space_repository.spaces.get(entry[1])
+                if space is not None:
+                    space.get_bucket(entry[2])._elements_repository._restore_removal(entry[3])
+            elif operation == ADD_SPACE:
+                space_repository._restore_space(entry[1])
+            elif operation == REMOVE_SPACE:
+                space_repository.spaces.pop(entry[1], None)
+            elif operation == REMOVE_ALL_SPACES:
+                space_repository.spaces = {}
+
+    def _read_entries(self, path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b''):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        if not line.endswith(b'\n'):
+                            # last write was interrupted
+                            return
+                        raise CorruptedStorage(path)
+                    yield entry
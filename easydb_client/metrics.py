@@ -0,0 +1,163 @@
+import logging
+import math
+import threading
+
+# Instrumentation of client requests. Observer given to client is called with Measurement of every request:
+#   operation        add, get, update, remove, page_fetch, page_stream, create_space, get_space, remove_space
+#   space, bucket    names, None when not applicable
+#   status           http status code, None when request failed
+#   request_bytes    size of request body
+#   response_bytes   size of response body, None when streamed without known length
+#   connect          seconds spent opening connection (name resolution, tcp and tls), 0 for reused connection
+#   ttfb             seconds from sending request to receiving response headers
+#   decode           seconds spent decoding json body
+#   duration         seconds of whole request, including hedged attempts and waiting for coalesced calls
+#   error            exception raised by request, None on success
+# Client without observer (the default) does not measure anything.
+
+logger = logging.getLogger('easydb_client')
+
+
+class Measurement:
+    __slots__ = ('operation', 'space', 'bucket', 'status', 'request_bytes', 'response_bytes',
+                 'connect', 'ttfb', 'decode', 'duration', 'error')
+
+    def __init__(self, operation, space=None, bucket=None):
+        self.operation = operation
+        self.space = space
+        self.bucket = bucket
+        self.status = None
+        self.request_bytes = 0
+        self.response_bytes = None
+        self.connect = 0.0
+        self.ttfb = None
+        self.decode = 0.0
+        self.duration = None
+        self.error = None
+
+    def __repr__(self):
+        return 'Measurement({fields})'.format(
+            fields=', '.join('{name}={value!r}'.format(name=name, value=getattr(self, name)) for name in self.__slots__))
+
+
+class Observer:
+    def observe(self, measurement):
+        pass
+
+
+class Observers(Observer):
+    def __init__(self, *observers):
+        self.observers = observers
+
+    def observe(self, measurement):
+        for observer in self.observers:
+            observer.observe(measurement)
+
+
+class Histogram:
+    # log-linear buckets, percentiles are accurate within `precision` relative error
+
+    def __init__(self, precision=0.02, lowest=1e-6):
+        self._log_growth = math.log(1 + 2 * precision)
+        self._lowest = lowest
+        self._counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        index = 0 if value <= self._lowest else int(math.log(value / self._lowest) / self._log_growth) + 1
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                if index == 0:
+                    return min(self.max, self._lowest)
+                # middle of the bucket
+                return min(self.max, self._lowest * math.exp((index - 0.5) * self._log_growth))
+        return self.max
+
+
+class HistogramCollector(Observer):
+    TIMINGS = ('duration', 'connect', 'ttfb', 'decode')
+
+    def __init__(self, percentiles=(50, 90, 99, 99.9), precision=0.02):
+        self.percentiles = percentiles
+        self.precision = precision
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def observe(self, measurement):
+        with self._lock:
+            stats = self._operations.get(measurement.operation)
+            if stats is None:
+                stats = self._operations[measurement.operation] = _OperationStats(self.precision)
+            stats.record(measurement)
+
+    def report(self):
+        with self._lock:
+            return {operation: stats.report(self.percentiles) for operation, stats in self._operations.items()}
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+
+
+class _OperationStats:
+    def __init__(self, precision):
+        self.count = 0
+        self.errors = 0
+        self.statuses = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.timings = {name: Histogram(precision) for name in HistogramCollector.TIMINGS}
+
+    def record(self, measurement):
+        self.count += 1
+        if measurement.error is not None:
+            self.errors += 1
+        else:
+            self.statuses[measurement.status] = self.statuses.get(measurement.status, 0) + 1
+        self.request_bytes += measurement.request_bytes
+        self.response_bytes += measurement.response_bytes or 0
+        for name, histogram in self.timings.items():
+            value = getattr(measurement, name)
+            if value is not None:
+                histogram.record(value)
+
+    def report(self, percentiles):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'statuses': dict(self.statuses),
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'timings': {
+                name: dict({'p{p:g}'.format(p=p): histogram.percentile(p) for p in percentiles}, max=histogram.max)
+                for name, histogram in self.timings.items() if histogram.count
+            }
+        }
+
+
+class SlowOperationLog(Observer):
+    def __init__(self, threshold, log=logger, level=logging.WARNING):
+        self.threshold = threshold
+        self.log = log
+        self.level = level
+
+    def observe(self, measurement):
+        if measurement.duration >= self.threshold:
+            self.log.log(self.level, 'Slow easydb operation %s on %s/%s took %.3fs (status %s, connect %.3fs, '
+                                     'ttfb %s, decode %.3fs, %s bytes sent, %s bytes received)',
+                         measurement.operation, measurement.space, measurement.bucket, measurement.duration,
+                         measurement.status, measurement.connect, measurement.ttfb, measurement.decode,
+                         measurement.request_bytes, measurement.response_bytes)
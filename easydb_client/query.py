@@ -1,3 +1,7 @@
+from functools import lru_cache
+from urllib.parse import urlencode
+
+
 class InvalidQuery(ValueError):
     pass
 
@@ -30,10 +34,93 @@ class AndCriteria:
         self.right = right
 
     def _validate(self):
-        self.left._validate()
-        self.right._validate()
+        compile(self)
         return self
 
+    def __and__(self, other):
+        return AndCriteria(self, other)
+
+
+class CompiledQuery:
+    # immutable conjunction of (field name, expected value) terms, sorted and without duplicates
+    # query string and predicate are built once and shared by all filters with the same terms
+
+    __slots__ = ('terms', '_query_string', '_predicate')
+
+    def __init__(self, terms):
+        object.__setattr__(self, 'terms', terms)
+        object.__setattr__(self, '_query_string', None)
+        object.__setattr__(self, '_predicate', None)
+
+    @property
+    def query_string(self):
+        if self._query_string is None:
+            object.__setattr__(self, '_query_string', urlencode(self.terms))
+        return self._query_string
+
+    @property
+    def predicate(self):
+        if self._predicate is None:
+            object.__setattr__(self, '_predicate', _build_predicate(self.terms))
+        return self._predicate
+
+    def matches(self, element):
+        return self.predicate(element['fields'])
+
+    def _validate(self):
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CompiledQuery is immutable')
+
+    def __eq__(self, other):
+        return isinstance(other, CompiledQuery) and self.terms == other.terms
+
+    def __hash__(self):
+        return hash(self.terms)
+
+    def __repr__(self):
+        return 'CompiledQuery({terms!r})'.format(terms=self.terms)
+
+
+def _build_predicate(terms):
+    if len(terms) == 1:
+        (field_name, expected_value), = terms
+        return lambda fields: fields.get(field_name) == expected_value
+
+    def predicate(fields):
+        for field_name, expected_value in terms:
+            if fields.get(field_name) != expected_value:
+                return False
+        return True
+
+    return predicate
+
+
+@lru_cache(maxsize=1024)
+def _compiled(terms):
+    return CompiledQuery(terms)
+
+
+def compile(q):
+    if isinstance(q, CompiledQuery):
+        return q
+    terms = set()
+    to_visit = [q]
+    while to_visit:
+        q = to_visit.pop()
+        if isinstance(q, AndCriteria):
+            to_visit.append(q.right)
+            to_visit.append(q.left)
+        elif isinstance(q, WhereCriteria):
+            q._validate()
+            terms.add((q.field_name, q.expected_value))
+        elif isinstance(q, CompiledQuery):
+            terms.update(q.terms)
+        else:
+            raise InvalidQuery('Unsupported criteria {q!r}'.format(q=q))
+    return _compiled(tuple(sorted(terms)))
+
 
 where = WhereCriteria.where
 available_criteria = {WhereCriteria, AndCriteria}
\ No newline at end of file
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import namedtuple
+
+from .inmemory import ElementsRepository
+
+# Read replica of a bucket: elements are loaded into local indexed repository and reads are served from it.
+# It is reloaded every `refresh_interval` seconds in background, new copy replaces the old one at once,
+# so readers never see half loaded bucket. Elements added, updated and removed through buckets of the same client
+# are applied to the replica immediately, writes of other clients are visible after the next refresh. Writes which
+# got no response may have been applied or not, so the replica is reloaded before it is read again.
+# Reads of replica older than `max_staleness` seconds (when background refreshes fail) reload it first.
+
+ReplicaInfo = namedtuple('ReplicaInfo', ['size', 'age', 'refreshes', 'failures', 'last_error'])
+
+
+class BucketReplica:
+    def __init__(self, bucket, refresh_interval=60, max_staleness=None, workers=4, clock=time.monotonic):
+        self.bucket = bucket
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.workers = workers
+        self._clock = clock
+        self._repository = None
+        self._loaded_at = None
+        # writes made while replica is reloaded, applied to the new copy before it replaces the old one
+        self._pending = None
+        # set by write of unknown outcome, replica is reloaded by the next read
+        self._unsettled_writes = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._closed = threading.Event()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+
+        # registered before the first load, so writes made during it are not lost
+        bucket.client._replicas[bucket.space.name, bucket.bucket_name] = self
+        try:
+            self.refresh()
+        except Exception:
+            self._unregister()
+            raise
+        self._refresher = None
+        if refresh_interval is not None:
+            self._refresher = threading.Thread(target=self._refresh_periodically, daemon=True)
+            self._refresher.start()
+
+    @property
+    def age(self):
+        return self._clock() - self._loaded_at
+
+    def get(self, element_id, deadline=None):
+        return self._current().get(element_id)
+
+    def all(self, prefetch=0, stream=False, fields=None):
+        repository = self._current()
+        if fields is not None:
+            return repository.project(repository.all, fields)
+        return repository.all
+
+    def filter(self, q, prefetch=0, stream=False, fields=None):
+        repository = self._current()
+        if fields is not None:
+            return repository.project(repository.filter(q), fields)
+        return repository.filter(q)
+
+    def count(self, q=None):
+        return self._current().count(q)
+
+    def ids(self, q=None, prefetch=0, stream=False):
+        return self._current().ids(q)
+
+    def create_index(self, field_name):
+        self._current().create_index(field_name)
+
+    # writes are sent by the bucket, which applies them to its client's replica
+
+    def add(self, element, deadline=None):
+        return self.bucket.add(element, deadline=deadline)
+
+    def update(self, element_id, element, deadline=None):
+        return self.bucket.update(element_id, element, deadline=deadline)
+
+    def remove(self, element_id, deadline=None):
+        self.bucket.remove(element_id, deadline=deadline)
+
+    def add_many(self, elements, concurrency=8):
+        return self.bucket.add_many(elements, concurrency)
+
+    def update_many(self, elements, concurrency=8):
+        return self.bucket.update_many(elements, concurrency)
+
+    def remove_many(self, element_ids, concurrency=8):
+        return self.bucket.remove_many(element_ids, concurrency)
+
+    def refresh(self):
+        with self._refresh_lock:
+            self._reload()
+
+    def info(self):
+        return ReplicaInfo(self.count(), self.age, self.refreshes, self.failures, self.last_error)
+
+    def close(self):
+        self._closed.set()
+        if self._refresher is not None:
+            self._refresher.join()
+        self._unregister()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _unregister(self):
+        replicas = self.bucket.client._replicas
+        key = self.bucket.space.name, self.bucket.bucket_name
+        if replicas.get(key) is self:
+            del replicas[key]
+
+    def _current(self):
+        if self._outdated():
+            with self._refresh_lock:
+                # other reader could have reloaded it while this one was waiting
+                if self._outdated():
+                    self._reload()
+        return self._repository
+
+    def _outdated(self):
+        return self._unsettled_writes or (self.max_staleness is not None and self.age > self.max_staleness)
+
+    def _reload(self):
+        started = self._clock()
+        with self._lock:
+            self._pending = []
+            unsettled_writes, self._unsettled_writes = self._unsettled_writes, False
+        try:
+            repository = ElementsRepository(
+                self.bucket.bucket_name, compact_elements=self.bucket.client.compact_elements)
+            for element in self.bucket.scan(workers=self.workers):
+                repository._restore(element['id'], element['fields'])
+            if self._repository is not None:
+                for field_name in self._repository.indexed_fields:
+                    repository.create_index(field_name)
+        except Exception:
+            with self._lock:
+                self._pending = None
+                self._unsettled_writes = self._unsettled_writes or unsettled_writes
+            raise
+        with self._lock:
+            for element_id, fields in self._pending:
+                _apply(repository, element_id, fields)
+            self._pending = None
+            self._repository = repository
+            self._loaded_at = started
+        self.refreshes += 1
+
+    def _refresh_periodically(self):
+        while not self._closed.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+
+    def _written(self, element_id, fields):
+        # fields are None for removed element
+        with self._lock:
+            if self._repository is not None:
+                _apply(self._repository, element_id, fields)
+            if self._pending is not None:
+                self._pending.append((element_id, fields))
+
+    def _unsettled(self):
+        with self._lock:
+            self._unsettled_writes = True
+
+
+def _apply(repository, element_id, fields):
+    if fields is None:
+        repository._restore_removal(element_id)
+    else:
+        repository._restore(element_id, fields)
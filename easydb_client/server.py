@@ -0,0 +1,260 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from . import query as Q
+from .codec import default_codec
+from .compression import CONTENT_ENCODING
+from .compression import Compression
+from .compression import UnsupportedContentEncoding
+from .compression import accepts
+from .compression import decompress
+from .easydb import ElementNotFound
+from .easydb import InvalidElementFormat
+from .easydb import SpaceNotFound
+from .inmemory import SpaceRepository
+from .transport import Response
+
+# Local stand-in of easydb api backed by in memory implementation, for tests and benchmarks on real sockets
+#
+#   python -m easydb_client.server --port 9000
+#
+# Elements of bucket are returned in pages of `page_size` linked by `next`, query params other than
+# `offset` and `limit` filter elements by field values. Requested `limit` is capped at `max_page_size`.
+# Compressed request bodies are accepted, with `compression` responses are gzip compressed for clients accepting it.
+# InProcessTransport serves the same api to client of this process without sockets.
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+
+
+class StandInServer:
+    def __init__(self, host='127.0.0.1', port=0, page_size=PAGE_SIZE, max_page_size=MAX_PAGE_SIZE,
+                 space_repository=None, compression=None):
+        self.api = StandInApi(space_repository, page_size, max_page_size, compression)
+        self.space_repository = self.api.space_repository
+        self._server = _Server((host, port), _handler(self.api))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{host}:{port}'.format(host=host, port=port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class InProcessTransport:
+    # transport of the client calling stand-in api of this process directly, without sockets,
+    # so the whole http client code path runs at memory speed
+    timeout_errors = ()
+
+    def __init__(self, space_repository=None, page_size=PAGE_SIZE, max_page_size=MAX_PAGE_SIZE, compression=None):
+        self.api = StandInApi(space_repository, page_size, max_page_size, compression)
+        self.space_repository = self.api.space_repository
+
+    def request(self, method, url, data=None, headers=None, timeout=None, stream=False):
+        started = time.perf_counter()
+        parts = urlsplit(url)
+        headers = headers or {}
+        status, response_headers, content = self.api.serve(
+            method.lower(), parts.path, parts.query, data or b'', '{scheme}://{host}'.format(
+                scheme=parts.scheme, host=parts.netloc),
+            headers.get('Content-Encoding'), headers.get('Accept-Encoding'))
+        response_headers = dict(response_headers)
+        if 'Content-Encoding' in response_headers:
+            content = decompress(content, response_headers['Content-Encoding'])
+        response = Response(status, response_headers, content=content)
+        response.request_bytes = 0 if data is None else len(data)
+        response.ttfb = time.perf_counter() - started
+        return response
+
+    def close(self):
+        pass
+
+
+def _element_body(element):
+    return {
+        'id': element['id'],
+        'bucketName': element['bucketName'],
+        'fields': [{'name': name, 'value': value} for name, value in element['fields'].items()]
+    }
+
+
+class StandInApi:
+    # easydb api routes over in memory spaces, handle returns status code and encoded body of response
+
+    def __init__(self, space_repository=None, page_size=PAGE_SIZE, max_page_size=MAX_PAGE_SIZE, compression=None):
+        self.space_repository = space_repository if space_repository is not None else SpaceRepository()
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        # easydb_client.compression.Compression of responses, None sends them as they are
+        self.compression = compression
+        self._codec = default_codec()
+
+    def serve(self, method, path, query_string, body, base_url, content_encoding=None, accept_encoding=None):
+        # handles request as received, returns status code, response headers and body to send
+        try:
+            body = decompress(body, content_encoding)
+        except UnsupportedContentEncoding:
+            status, content = 415, b''
+        else:
+            status, content = self.handle(method, path, query_string, body, base_url)
+        headers = [('Content-Type', 'application/json')]
+        if self.compression is not None and self.compression.should_compress(content) and accepts(accept_encoding):
+            content = self.compression.compress(content)
+            headers.append(('Content-Encoding', CONTENT_ENCODING))
+        headers.append(('Content-Length', str(len(content))))
+        return status, headers, content
+
+    def handle(self, method, path, query_string, body, base_url):
+        parts = path.strip('/').split('/')
+        if parts[:2] != ['api', 'v1'] or len(parts) not in (3, 4, 5):
+            return self._respond(404)
+        try:
+            if parts[2] == 'spaces' and len(parts) < 5:
+                return self._space(method, parts[3] if len(parts) == 4 else None)
+            elif len(parts) > 3:
+                bucket = self.space_repository.get(parts[2]).get_bucket(parts[3])
+                if len(parts) == 5:
+                    return self._element(method, bucket, parts[4], body)
+                return self._elements(method, bucket, base_url + path, query_string, body)
+            return self._respond(404)
+        except SpaceNotFound:
+            return self._respond(404)
+        except ElementNotFound:
+            return self._respond(404)
+        except (InvalidElementFormat, ValueError, KeyError, TypeError):
+            return self._respond(400)
+
+    def _space(self, method, space_name):
+        if method == 'post' and space_name is None:
+            return self._respond(201, {'spaceName': self.space_repository.add().name})
+        elif method == 'get' and space_name is not None:
+            return self._respond(200, {'spaceName': self.space_repository.get(space_name).name})
+        elif method == 'delete' and space_name is not None:
+            self.space_repository.remove(space_name)
+            return self._respond(200)
+        return self._respond(405)
+
+    def _element(self, method, bucket, element_id, body):
+        if method == 'get':
+            return self._respond(200, _element_body(bucket.get(element_id)))
+        elif method == 'put':
+            return self._respond(200, _element_body(bucket.update(element_id, self._read_fields(body))))
+        elif method == 'delete':
+            bucket.remove(element_id)
+            return self._respond(200)
+        return self._respond(405)
+
+    def _elements(self, method, bucket, url, query_string, body):
+        if method == 'post':
+            return self._respond(201, _element_body(bucket.add(self._read_fields(body))))
+        elif method == 'get':
+            return self._page(bucket, url, query_string)
+        return self._respond(405)
+
+    def _page(self, bucket, url, query_string):
+        params = dict(parse_qsl(query_string))
+        offset = int(params.pop('offset', 0))
+        limit = min(int(params.pop('limit', self.page_size)), self.max_page_size)
+        q = None
+        for field_name, value in params.items():
+            criteria = Q.where(field_name).eq(value)
+            q = criteria if q is None else q & criteria
+        elements = bucket.all() if q is None else bucket.filter(q)
+        page = list(islice(elements, offset, offset + limit + 1))
+        next_url = None
+        if len(page) > limit:
+            next_url = '{url}?{query}'.format(url=url, query=urlencode(dict(params, offset=offset + limit, limit=limit)))
+        return self._respond(200, {'next': next_url, 'results': [_element_body(e) for e in page[:limit]]})
+
+    def _read_fields(self, body):
+        return {field['name']: field['value'] for field in self._codec.decode(body)['fields']}
+
+    def _respond(self, status, body=None):
+        return status, b'' if body is None else self._codec.encode(body)
+
+
+class _Server(ThreadingHTTPServer):
+    # clients with hundreds of threads open as many connections at once, default backlog of 5 resets them
+    request_queue_size = 1024
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # headers and body are written separately, without it every response would wait for delayed ack
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._dispatch('get')
+
+        def do_POST(self):
+            self._dispatch('post')
+
+        def do_PUT(self):
+            self._dispatch('put')
+
+        def do_DELETE(self):
+            self._dispatch('delete')
+
+        def log_message(self, format, *args):
+            pass
+
+        def _dispatch(self, method):
+            # body is read upfront, so connection can be reused whatever the response is
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            url = urlsplit(self.path)
+            status, headers, content = api.serve(method, url.path, url.query, body, 'http://' + self.headers['Host'],
+                                                 self.headers.get('Content-Encoding'),
+                                                 self.headers.get('Accept-Encoding'))
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in of easydb api')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--compression-level', type=int, help='gzip compress responses at given level')
+    args = parser.parse_args()
+    server = StandInServer(args.host, args.port, args.page_size, compression=None if args.compression_level is None
+                           else Compression(args.compression_level))
+    print('Serving easydb api on', server.url)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
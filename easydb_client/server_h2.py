@@ -0,0 +1,161 @@
+import argparse
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from .server import MAX_PAGE_SIZE
+from .server import PAGE_SIZE
+from .server import StandInApi
+from .transport_h2 import H2Peer
+
+# HTTP/2 stand-in of easydb api (h2c with prior knowledge), for tests and benchmarks of H2Transport
+#
+#   python -m easydb_client.server_h2 --port 9000
+#
+# Requests of all streams of all connections are handled concurrently by `workers` threads, every connection
+# accepts at most `max_concurrent_streams` streams at once, as advertised in its settings.
+
+MAX_CONCURRENT_STREAMS = 100
+WORKERS = 16
+
+
+class H2StandInServer:
+    def __init__(self, host='127.0.0.1', port=0, page_size=PAGE_SIZE, max_page_size=MAX_PAGE_SIZE,
+                 space_repository=None, max_concurrent_streams=MAX_CONCURRENT_STREAMS, workers=WORKERS,
+                 compression=None):
+        self.api = StandInApi(space_repository, page_size, max_page_size, compression)
+        self.space_repository = self.api.space_repository
+        self.max_concurrent_streams = max_concurrent_streams
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._listener = socket.socket()
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, port))
+        self._listener.listen(1024)
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._listener.getsockname()[:2]
+        return 'http://{host}:{port}'.format(host=host, port=port)
+
+    def connections(self):
+        with self._lock:
+            return len(self._connections)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                if self._stopped.is_set():
+                    return
+                raise
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = _ServerConnection(sock, self)
+            with self._lock:
+                self._connections.add(connection)
+
+    def stop(self):
+        self._stopped.set()
+        # wakes up accept
+        try:
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for connection in connections:
+            connection.close()
+        self.executor.shutdown()
+
+    def _discard(self, connection):
+        with self._lock:
+            self._connections.discard(connection)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def _header(headers, name):
+    value = headers.get(name)
+    return None if value is None else value.decode('latin-1')
+
+
+class _ServerConnection(H2Peer):
+    def __init__(self, sock, server):
+        super().__init__(sock, client_side=False, settings={
+            h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: server.max_concurrent_streams})
+        self.server = server
+        # stream id -> headers and chunks of body of request being received
+        self._requests = {}
+        self.start()
+
+    def handle_event(self, event):
+        if isinstance(event, h2.events.RequestReceived):
+            self._requests[event.stream_id] = dict(event.headers), []
+        elif isinstance(event, h2.events.DataReceived):
+            self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if event.stream_id in self._requests:
+                self._requests[event.stream_id][1].append(event.data)
+        elif isinstance(event, h2.events.StreamEnded):
+            headers, body = self._requests.pop(event.stream_id, (None, None))
+            if headers is not None:
+                self.server.executor.submit(self._respond, event.stream_id, headers, b''.join(body))
+        elif isinstance(event, h2.events.StreamReset):
+            self._requests.pop(event.stream_id, None)
+        else:
+            super().handle_event(event)
+
+    def closed(self, error):
+        self.server._discard(self)
+
+    def _respond(self, stream_id, headers, body):
+        url = urlsplit(headers[b':path'].decode())
+        status, response_headers, content = self.server.api.serve(
+            headers[b':method'].decode().lower(), url.path, url.query, body,
+            'http://' + headers[b':authority'].decode(), _header(headers, b'content-encoding'),
+            _header(headers, b'accept-encoding'))
+        response_headers = [(':status', str(status))] + [(name.lower(), value) for name, value in response_headers]
+        with self.lock:
+            try:
+                self.h2.send_headers(stream_id, response_headers, end_stream=not content)
+                self.flush()
+                self.send_body(stream_id, content)
+            except (h2.exceptions.ProtocolError, OSError):
+                # stream was reset or connection closed by the client
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local HTTP/2 stand-in of easydb api')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--max-concurrent-streams', type=int, default=MAX_CONCURRENT_STREAMS)
+    args = parser.parse_args()
+    server = H2StandInServer(args.host, args.port, args.page_size, max_concurrent_streams=args.max_concurrent_streams)
+    print('Serving easydb api over HTTP/2 on', server.url)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .easydb import BulkResult
+from .easydb import ElementNotFound
+
+# Unit of work: mutations of buckets are recorded and sent on flush, redundant ones are collapsed first:
+#   add + update    -> add with updated fields
+#   update + update -> last update
+#   add + remove    -> nothing is sent
+#   update + remove -> remove
+
+ADD = 'add'
+UPDATE = 'update'
+REMOVE = 'remove'
+
+
+class PendingElement:
+    # element added in session, `element` is set once it was flushed, `error` if adding it failed
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.element = None
+        self.error = None
+        self.discarded = False
+
+    @property
+    def id(self):
+        return None if self.element is None else self.element['id']
+
+
+class SessionBucket:
+    def __init__(self, session, bucket):
+        self.session = session
+        self.bucket = bucket
+
+    def add(self, element):
+        return self.session._record_add(self.bucket, element)
+
+    def update(self, element_id, element):
+        self.session._record(self.bucket, element_id, UPDATE, element)
+
+    def remove(self, element_id):
+        self.session._record(self.bucket, element_id, REMOVE, None)
+
+
+class WriteSession:
+    def __init__(self, concurrency=8, flush_interval=None):
+        self.concurrency = concurrency
+        self.flush_interval = flush_interval
+        self.errors = []
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval is not None:
+            # write behind, pending mutations are flushed in background every `flush_interval` seconds
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    def bucket(self, bucket):
+        return SessionBucket(self, bucket)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                mutations, self._pending = list(self._pending.values()), OrderedDict()
+            if not mutations:
+                return []
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(mutations))) as executor:
+                results = list(executor.map(self._apply, mutations))
+            self.errors.extend(result.error for result in results if result.error is not None)
+            return results
+
+    def discard(self):
+        with self._lock:
+            for bucket, key, operation, element in self._pending.values():
+                if isinstance(key, PendingElement):
+                    key.discarded = True
+            self._pending = OrderedDict()
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.discard()
+        self.close()
+
+    def _record_add(self, bucket, element):
+        pending_element = PendingElement(bucket)
+        with self._lock:
+            self._pending[pending_element] = (bucket, pending_element, ADD, dict(element))
+        return pending_element
+
+    def _record(self, bucket, element_id, operation, element):
+        if isinstance(element_id, PendingElement) and element_id.element is not None:
+            # already flushed, further mutations refer to it by id
+            element_id = element_id.id
+        key = element_id if isinstance(element_id, PendingElement) else (id(bucket), element_id)
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is None:
+                self._pending[key] = (bucket, element_id, operation, None if element is None else dict(element))
+                return
+            previous_operation = previous[2]
+            if previous_operation == REMOVE:
+                raise ElementNotFound()
+            if operation == UPDATE:
+                self._pending[key] = (bucket, element_id, previous_operation, dict(element))
+            elif previous_operation == ADD:
+                del self._pending[key]
+                element_id.discarded = True
+            else:
+                self._pending[key] = (bucket, element_id, REMOVE, None)
+
+    def _apply(self, mutation):
+        bucket, key, operation, element = mutation
+        element_id = key.id if isinstance(key, PendingElement) and operation != ADD else key
+        try:
+            if isinstance(key, PendingElement) and operation != ADD and key.element is None:
+                # adding it failed in earlier flush
+                raise key.error or ElementNotFound()
+            if operation == ADD:
+                key.element = bucket.add(element)
+                return BulkResult(key.element, None)
+            elif operation == UPDATE:
+                return BulkResult(bucket.update(element_id, element), None)
+            else:
+                bucket.remove(element_id)
+                return BulkResult(None, None)
+        except Exception as e:
+            if operation == ADD:
+                key.error = e
+            return BulkResult(None, e)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
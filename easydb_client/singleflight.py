@@ -0,0 +1,100 @@
+import threading
+import time
+
+# Concurrent identical calls share single execution. First caller of a key runs the call, callers arriving
+# while it is in flight wait for it and receive the same result or exception. Once the call finished the key
+# is forgotten, so later callers start a new one.
+# Call is cut off at deadline of the caller which started it (`expires_at`, None when it has none), so it is joined
+# only by callers which would not wait longer than that, others start a new call, joined by callers after them.
+# `forget` makes the call in flight private to its callers, e.g. once what it reads was written.
+# concurrent.futures and asyncio are imported on first call, so importing sync client does not load them.
+
+
+def _lasts(call_expires_at, expires_at):
+    # call lasts as long as caller waits for it
+    return call_expires_at is None or (expires_at is not None and call_expires_at >= expires_at)
+
+
+class SingleFlight:
+    # call is run by the first caller, or by `executor` when given, so that the first caller can stop
+    # waiting for it at `expires_at` (time.monotonic()) like any other one
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        # key -> future of call in flight and its expires_at
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, expires_at=None, executor=None):
+        from concurrent.futures import Future
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None or not _lasts(call[1], expires_at)
+            if leader:
+                future = Future()
+                self._in_flight[key] = future, expires_at
+                self.calls += 1
+            else:
+                future = call[0]
+                self.shared += 1
+        if leader:
+            if executor is not None:
+                executor.submit(self._run, key, function, future)
+            else:
+                self._run(key, function, future)
+        return future.result(None if expires_at is None else max(expires_at - time.monotonic(), 0))
+
+    def forget(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _run(self, key, function, future):
+        try:
+            result = function()
+        except BaseException as e:
+            self._forget(key, future)
+            future.set_exception(e)
+        else:
+            self._forget(key, future)
+            future.set_result(result)
+
+    def _forget(self, key, future):
+        with self._lock:
+            call = self._in_flight.get(key)
+            if call is not None and call[0] is future:
+                del self._in_flight[key]
+
+
+class AsyncSingleFlight:
+    # callers can be cancelled (e.g. by their deadline) without cancelling the call shared with others,
+    # expires_at is time of the loop
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}
+
+    async def do(self, key, function, expires_at=None):
+        import asyncio
+        call = self._in_flight.get(key)
+        if call is None or call[0].get_loop() is not asyncio.get_running_loop() or not _lasts(call[1], expires_at):
+            task = asyncio.ensure_future(function())
+            self._in_flight[key] = task, expires_at
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+        else:
+            task = call[0]
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def forget(self, key):
+        self._in_flight.pop(key, None)
+
+    def _forget(self, key, task):
+        call = self._in_flight.get(key)
+        if call is not None and call[0] is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # retrieved, so it is not reported when every caller was cancelled
+            task.exception()
@@ -0,0 +1,133 @@
+import codecs
+import json
+import re
+
+# incremental parser of page responses, {"next": ..., "results": [...]}, returning every element
+# of results as soon as it was received, so only the element being parsed has to be kept in memory
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+_incomplete = object()
+
+(_OBJECT_START, _KEY, _COLON, _VALUE, _MEMBER_END,
+ _RESULTS_START, _RESULT, _RESULT_END, _DONE) = range(9)
+
+
+class MalformedPage(ValueError):
+    pass
+
+
+class PageParser:
+    def __init__(self, element_hook=None):
+        # called with every decoded element, its result is returned instead
+        self.element_hook = element_hook
+        self.next_url = None
+        self._text = ''
+        self._pos = 0
+        self._state = _OBJECT_START
+        self._key = None
+        self._bytes_decoder = codecs.getincrementaldecoder('utf-8')()
+        # incomplete values are decoded again only when enough data arrived, so large ones are not parsed
+        # over and over for every chunk, chunks received until then are joined to the text at once
+        self._resume_at = 0
+        self._pending = []
+        self._pending_length = 0
+
+    def feed(self, data):
+        decoded = self._bytes_decoder.decode(data)
+        self._pending.append(decoded)
+        self._pending_length += len(decoded)
+        if len(self._text) - self._pos + self._pending_length < self._resume_at:
+            return []
+        self._join_pending()
+        return self._parse(final=False)
+
+    def close(self):
+        self._pending.append(self._bytes_decoder.decode(b'', final=True))
+        self._join_pending()
+        elements = self._parse(final=True)
+        if self._state != _DONE:
+            raise MalformedPage('Page ended unexpectedly')
+        return elements
+
+    def _join_pending(self):
+        self._text = self._text[self._pos:] + ''.join(self._pending)
+        self._pos = 0
+        self._pending = []
+        self._pending_length = 0
+
+    def _parse(self, final):
+        elements = []
+        while self._state != _DONE:
+            self._pos = _whitespace.match(self._text, self._pos).end()
+            if self._pos == len(self._text):
+                break
+            char = self._text[self._pos]
+            state = self._state
+            if state == _OBJECT_START:
+                self._expect(char, '{')
+                self._state = _KEY
+            elif state == _KEY:
+                if char == '}':
+                    self._pos += 1
+                    self._state = _DONE
+                    continue
+                key = self._decode(final)
+                if key is _incomplete:
+                    break
+                self._key = key
+                self._state = _COLON
+            elif state == _COLON:
+                self._expect(char, ':')
+                self._state = _RESULTS_START if self._key == 'results' else _VALUE
+            elif state == _VALUE:
+                value = self._decode(final)
+                if value is _incomplete:
+                    break
+                if self._key == 'next':
+                    self.next_url = value
+                self._state = _MEMBER_END
+            elif state == _MEMBER_END:
+                self._expect(char, ',}')
+                self._state = _KEY if char == ',' else _DONE
+            elif state == _RESULTS_START:
+                self._expect(char, '[')
+                self._state = _RESULT
+            elif state == _RESULT:
+                if char == ']':
+                    self._pos += 1
+                    self._state = _MEMBER_END
+                    continue
+                element = self._decode(final)
+                if element is _incomplete:
+                    break
+                elements.append(element if self.element_hook is None else self.element_hook(element))
+                self._state = _RESULT_END
+            elif state == _RESULT_END:
+                self._expect(char, ',]')
+                self._state = _RESULT if char == ',' else _MEMBER_END
+        return elements
+
+    def _expect(self, char, expected):
+        if char not in expected:
+            raise MalformedPage('Expected {expected!r} at {pos}, got {char!r}'.format(
+                expected=expected, pos=self._pos, char=char))
+        self._pos += 1
+
+    def _decode(self, final):
+        try:
+            value, end = _decoder.raw_decode(self._text, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            self._resume_at = 2 * (len(self._text) - self._pos)
+            return _incomplete
+        if end == len(self._text) and not final and isinstance(value, (int, float)):
+            # number can continue in next chunk
+            self._resume_at = len(self._text) - self._pos + 1
+            return _incomplete
+        self._pos = end
+        self._resume_at = 0
+        return value
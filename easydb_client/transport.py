@@ -0,0 +1,199 @@
+import select
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .compression import DecompressingReader
+from .compression import decompressor
+
+# Transports send requests of the client:
+#
+#   transport.request(method, url, data=None, headers=None, timeout=(connect, read), stream=False)
+#
+# returns response with `status_code`, `headers`, `content`, `iter_content(chunk_size)` and `close()`
+# (it is also a context manager), which tells `request_bytes` sent, `ttfb` (seconds from sending request
+# to receiving response headers) and `connect_time` (seconds spent opening connection).
+# Exceptions listed in `timeout_errors` of transport are raised when timeout passed.
+# Bodies compressed by the server (Content-Encoding) are decompressed while they are read, `Content-Length` header
+# tells the size received.
+#
+#   RequestsTransport      pooled connections of requests session (the default)
+#   HTTPClientTransport    stdlib http.client with keep-alive connections, less overhead per request
+#   H2Transport            concurrent requests multiplexed over few HTTP/2 connections (requires h2)
+#   easydb_client.server.InProcessTransport
+#                          stand-in api in the same process, without sockets
+#
+# http stacks are imported when transport using them is created, so importing the package stays fast.
+
+# requests which can be sent again when connection was lost before their response came
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+
+class Response:
+    # response of http.client and in process transports, with the part of requests.Response used by the client
+
+    def __init__(self, status_code, headers, content=None, raw=None, release=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.request_bytes = 0
+        self.ttfb = None
+        self.connect_time = 0.0
+        self._content = content
+        # streamed body, `release` is called once it was read or response was closed
+        self._raw = raw
+        self._release = release
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self._raw.read()
+            self.close()
+        return self._content
+
+    def iter_content(self, chunk_size=1):
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self.close()
+
+    def close(self):
+        if self._release is not None:
+            self._release()
+            self._release = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _decompressed(raw, headers):
+    decompressing = decompressor(headers.get('Content-Encoding'))
+    return raw if decompressing is None else DecompressingReader(raw, decompressing)
+
+
+class HTTPClientTransport:
+    # keeps up to `pool_maxsize` idle connections per host, idle connection closed by the server is replaced.
+    # Request failed on reused connection is sent again over new one when it is idempotent or was not sent at all,
+    # others could have been applied by the server before it closed the connection.
+    timeout_errors = (socket.timeout,)
+
+    def __init__(self, pool_maxsize=10):
+        import http.client
+        self._http = http.client
+        self.pool_maxsize = pool_maxsize
+        # (scheme, host, port) -> idle connections
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, data=None, headers=None, timeout=(None, None), stream=False):
+        parts = urlsplit(url)
+        key = parts.scheme, parts.hostname, parts.port
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        connect_timeout, read_timeout = timeout or (None, None)
+        started = time.perf_counter()
+        while True:
+            connection, reused = self._acquire(key)
+            connect_time = 0.0
+            sent = False
+            try:
+                if connection.sock is None:
+                    connection.timeout = connect_timeout
+                    connection.connect()
+                    connect_time = time.perf_counter() - started
+                connection.sock.settimeout(read_timeout)
+                connection.request(method.upper(), path, body=data, headers=headers or {})
+                sent = True
+                raw = connection.getresponse()
+                break
+            except ConnectionError:
+                connection.close()
+                if not reused or sent and method.upper() not in IDEMPOTENT_METHODS:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+
+        def release():
+            # connection can be reused only when body was read to the end
+            if raw.isclosed():
+                self._release(key, connection)
+            else:
+                connection.close()
+
+        ttfb = time.perf_counter() - started
+        try:
+            body = _decompressed(raw, raw.headers)
+        except BaseException:
+            release()
+            raise
+        if stream:
+            response = Response(raw.status, raw.headers, raw=body, release=release)
+        else:
+            try:
+                response = Response(raw.status, raw.headers, content=body.read())
+            finally:
+                release()
+        response.request_bytes = 0 if data is None else len(data)
+        response.ttfb = ttfb
+        response.connect_time = connect_time
+        return response
+
+    def _acquire(self, key):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                connection = idle.pop()
+            if not _dropped(connection):
+                return connection, True
+            connection.close()
+        scheme, host, port = key
+        if scheme == 'https':
+            return self._http.HTTPSConnection(host, port), False
+        return self._http.HTTPConnection(host, port), False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_maxsize:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+def _dropped(connection):
+    # idle connection becomes readable only when the server closed it
+    try:
+        return bool(select.select([connection.sock], [], [], 0)[0])
+    except OSError:
+        return True
+    except ValueError:
+        # descriptor too large for select, connection is found out to be closed when it is used
+        return False
+
+
+def __getattr__(name):
+    if name == 'RequestsTransport':
+        from .transport_requests import RequestsTransport
+        return RequestsTransport
+    if name == 'H2Transport':
+        from .transport_h2 import H2Transport
+        return H2Transport
+    raise AttributeError('module {module!r} has no attribute {name!r}'.format(module=__name__, name=name))
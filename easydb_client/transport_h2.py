@@ -0,0 +1,376 @@
+import queue
+import socket
+import threading
+import time
+from email.message import Message
+from urllib.parse import urlsplit
+
+import h2.config
+import h2.connection
+import h2.errors
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from .transport import Response
+from .transport import _decompressed
+
+# HTTP/2 transport, requires h2 (`pip install easydb_client[http2]`). Concurrent requests of all threads (element
+# operations, pages fetched in background by `all(prefetch=...)` and `scan`) are sent as streams multiplexed over
+# at most `max_connections` connections per host, instead of a connection per request in flight. Every connection
+# carries at most `max_concurrent_streams` streams (or less when the server says so), requests over the limit wait
+# for a stream to finish. New connection is opened only when all open ones are full.
+# http urls are spoken to with prior knowledge (h2c), https ones negotiate h2 by alpn.
+#
+# Every connection has a reader thread, which receives frames of all its streams and hands them to requests.
+
+# receive window of connection and of every stream, pages are received without waiting for window updates
+WINDOW_SIZE = 16 * 1024 * 1024
+# connection window starts at this size whatever the settings are
+DEFAULT_WINDOW_SIZE = 65535
+READ_SIZE = 65536
+
+
+class H2Peer:
+    # one end of http/2 connection (used by the stand-in server too): h2 state and socket are guarded by `lock`,
+    # frames are received in reader thread and passed to `handle_event` with the lock held
+
+    def __init__(self, sock, client_side, settings):
+        self.sock = sock
+        # headers sent are built here with lowercase names, validating them costs more than framing
+        self.h2 = h2.connection.H2Connection(h2.config.H2Configuration(
+            client_side=client_side, header_encoding=None, validate_outbound_headers=False,
+            normalize_outbound_headers=False))
+        settings = dict(settings)
+        settings[h2.settings.SettingCodes.INITIAL_WINDOW_SIZE] = WINDOW_SIZE
+        self.h2.local_settings = h2.settings.Settings(client=client_side, initial_values=settings)
+        self.lock = threading.RLock()
+        self.window_open = threading.Condition(self.lock)
+        self.settings_received = threading.Event()
+        self.alive = True
+        self.error = None
+        self.h2.initiate_connection()
+        self.h2.increment_flow_control_window(WINDOW_SIZE - DEFAULT_WINDOW_SIZE)
+        self.flush()
+
+    def start(self):
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def flush(self):
+        data = self.h2.data_to_send()
+        if data:
+            self.sock.sendall(data)
+
+    def send_body(self, stream_id, data):
+        # called with the lock held, waits until flow control windows of stream and connection let data through
+        sent = 0
+        while sent < len(data):
+            if not self.alive:
+                raise self.error
+            size = min(self.h2.local_flow_control_window(stream_id), self.h2.max_outbound_frame_size, len(data) - sent)
+            if size <= 0:
+                self.window_open.wait()
+                continue
+            self.h2.send_data(stream_id, data[sent:sent + size], end_stream=sent + size == len(data))
+            self.flush()
+            sent += size
+
+    def handle_event(self, event):
+        if isinstance(event, h2.events.RemoteSettingsChanged):
+            self.settings_received.set()
+            self.window_open.notify_all()
+        elif isinstance(event, h2.events.WindowUpdated):
+            self.window_open.notify_all()
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            raise ConnectionError('Connection terminated by peer, error code {code}'.format(code=event.error_code))
+
+    def closed(self, error):
+        pass
+
+    def close(self, error=None):
+        with self.lock:
+            if not self.alive:
+                return
+            self.alive = False
+            self.error = error or ConnectionError('Connection closed')
+            if error is None:
+                try:
+                    self.h2.close_connection()
+                    self.flush()
+                except (h2.exceptions.ProtocolError, OSError):
+                    pass
+            self.window_open.notify_all()
+        self.closed(self.error)
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _read(self):
+        try:
+            while True:
+                data = self.sock.recv(READ_SIZE)
+                if not data:
+                    raise ConnectionError('Connection closed by peer')
+                with self.lock:
+                    for event in self.h2.receive_data(data):
+                        self.handle_event(event)
+                    self.flush()
+        except (OSError, h2.exceptions.ProtocolError) as e:
+            self.close(e if isinstance(e, OSError) else ConnectionError(str(e)))
+
+
+class _Stream:
+    # events of single response: (status, headers), chunks of body, None at its end or exception,
+    # it is also raw body of the response
+    def __init__(self, timeout):
+        self.events = queue.Queue()
+        self.timeout = timeout
+        self.ended = False
+        self._buffer = b''
+
+    def next(self):
+        try:
+            event = self.events.get(timeout=self.timeout)
+        except queue.Empty:
+            raise socket.timeout('Timed out waiting for response') from None
+        if isinstance(event, Exception):
+            raise event
+        return event
+
+    def read(self, amt=None):
+        if amt is None:
+            chunks = [self._buffer]
+            while not self.ended:
+                self._receive(chunks)
+            self._buffer = b''
+            return b''.join(chunks)
+        while not self._buffer and not self.ended:
+            chunks = []
+            self._receive(chunks)
+            self._buffer = b''.join(chunks)
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def _receive(self, chunks):
+        chunk = self.next()
+        if chunk is None:
+            self.ended = True
+        else:
+            chunks.append(chunk)
+
+
+class _Connection(H2Peer):
+    def __init__(self, sock, on_close):
+        super().__init__(sock, client_side=True, settings={h2.settings.SettingCodes.ENABLE_PUSH: 0})
+        # requests in flight, counted by the transport
+        self.active = 0
+        self._on_close = on_close
+        self._streams = {}
+        self.start()
+
+    @property
+    def max_streams(self):
+        return self.h2.remote_settings.max_concurrent_streams
+
+    def send(self, method, parts, data, headers, timeout):
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        request_headers = [(':method', method.upper()), (':scheme', parts.scheme), (':authority', parts.netloc),
+                           (':path', path)]
+        request_headers.extend((name.lower(), value) for name, value in (headers or {}).items())
+        if data:
+            request_headers.append(('content-length', str(len(data))))
+        stream = _Stream(timeout)
+        with self.lock:
+            if not self.alive:
+                raise self.error
+            try:
+                stream_id = self.h2.get_next_available_stream_id()
+            except h2.exceptions.NoAvailableStreamIDError:
+                self.close(ConnectionError('Stream ids of connection were used up'))
+                raise self.error
+            self._streams[stream_id] = stream
+            try:
+                self.h2.send_headers(stream_id, request_headers, end_stream=not data)
+                self.flush()
+                if data:
+                    self.send_body(stream_id, data)
+            except OSError as e:
+                self.close(e)
+                raise
+        return stream_id, stream
+
+    def cancel(self, stream_id):
+        with self.lock:
+            if self._streams.pop(stream_id, None) is not None and self.alive:
+                try:
+                    self.h2.reset_stream(stream_id, h2.errors.ErrorCodes.CANCEL)
+                    self.flush()
+                except (h2.exceptions.ProtocolError, OSError):
+                    pass
+
+    def handle_event(self, event):
+        stream = self._streams.get(getattr(event, 'stream_id', None))
+        if isinstance(event, h2.events.ResponseReceived):
+            if stream is not None:
+                headers = Message()
+                for name, value in event.headers:
+                    if not name.startswith(b':'):
+                        headers[name.decode('latin-1')] = value.decode('latin-1')
+                stream.events.put((int(dict(event.headers)[b':status']), headers))
+        elif isinstance(event, h2.events.DataReceived):
+            self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if stream is not None:
+                stream.events.put(event.data)
+        elif isinstance(event, h2.events.StreamEnded):
+            if stream is not None:
+                stream.events.put(None)
+                del self._streams[event.stream_id]
+        elif isinstance(event, h2.events.StreamReset):
+            if stream is not None:
+                stream.events.put(ConnectionError('Stream reset by server, error code {code}'.format(
+                    code=event.error_code)))
+                del self._streams[event.stream_id]
+        else:
+            super().handle_event(event)
+
+    def closed(self, error):
+        streams, self._streams = self._streams, {}
+        for stream in streams.values():
+            stream.events.put(error)
+        self._on_close()
+
+
+class H2Transport:
+    timeout_errors = (socket.timeout,)
+
+    def __init__(self, max_connections=2, max_concurrent_streams=100):
+        self.max_connections = max_connections
+        self.max_concurrent_streams = max_concurrent_streams
+        # (scheme, host, port) -> open connections and number of connections being opened
+        self._connections = {}
+        self._connecting = {}
+        self._available = threading.Condition()
+
+    def request(self, method, url, data=None, headers=None, timeout=(None, None), stream=False):
+        parts = urlsplit(url)
+        key = parts.scheme, parts.hostname, parts.port
+        connect_timeout, read_timeout = timeout or (None, None)
+        started = time.perf_counter()
+        while True:
+            connection, connect_time = self._acquire(key, connect_timeout)
+            try:
+                stream_id, body = connection.send(method, parts, data, headers, read_timeout)
+                break
+            except ConnectionError:
+                self._release(connection)
+                # connection closed by the server while idle, request was not sent
+                if connect_time is not None:
+                    raise
+            except BaseException:
+                self._release(connection)
+                raise
+
+        def release():
+            # stream not read to the end is reset, connection is used by other requests anyway
+            if not body.ended:
+                connection.cancel(stream_id)
+            self._release(connection)
+
+        try:
+            status, response_headers = body.next()
+        except BaseException:
+            release()
+            raise
+        ttfb = time.perf_counter() - started
+        try:
+            raw = _decompressed(body, response_headers)
+        except BaseException:
+            release()
+            raise
+        if stream:
+            response = Response(status, response_headers, raw=raw, release=release)
+        else:
+            try:
+                response = Response(status, response_headers, content=raw.read())
+            finally:
+                release()
+        response.request_bytes = 0 if data is None else len(data)
+        response.ttfb = ttfb
+        response.connect_time = connect_time or 0.0
+        return response
+
+    def connections(self):
+        with self._available:
+            return sum(len(connections) for connections in self._connections.values())
+
+    def _acquire(self, key, connect_timeout):
+        # connection with the fewest streams in flight, connect_time is None for connection already open
+        with self._available:
+            while True:
+                connections = self._connections.setdefault(key, [])
+                connections[:] = [c for c in connections if c.alive]
+                free = [c for c in connections if c.active < min(self.max_concurrent_streams, c.max_streams)]
+                if free:
+                    connection = min(free, key=lambda c: c.active)
+                    connection.active += 1
+                    return connection, None
+                if len(connections) + self._connecting.get(key, 0) < self.max_connections:
+                    self._connecting[key] = self._connecting.get(key, 0) + 1
+                    break
+                self._available.wait()
+        started = time.perf_counter()
+        connection = None
+        try:
+            connection = self._connect(key, connect_timeout)
+            return connection, time.perf_counter() - started
+        finally:
+            with self._available:
+                self._connecting[key] -= 1
+                if connection is not None:
+                    connection.active += 1
+                    self._connections.setdefault(key, []).append(connection)
+                self._available.notify_all()
+
+    def _connect(self, key, connect_timeout):
+        scheme, host, port = key
+        port = port or (443 if scheme == 'https' else 80)
+        sock = socket.create_connection((host, port), timeout=connect_timeout)
+        connection = None
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if scheme == 'https':
+                import ssl
+                context = ssl.create_default_context()
+                context.set_alpn_protocols(['h2'])
+                sock = context.wrap_socket(sock, server_hostname=host)
+                if sock.selected_alpn_protocol() != 'h2':
+                    raise ConnectionError('{host} does not support http/2'.format(host=host))
+            sock.settimeout(None)
+            connection = _Connection(sock, self._notify)
+            # stream limit of the server is known from its settings
+            if not connection.settings_received.wait(connect_timeout):
+                raise socket.timeout('Timed out waiting for settings of the server')
+            return connection
+        except BaseException:
+            if connection is not None:
+                connection.close()
+            else:
+                sock.close()
+            raise
+
+    def _release(self, connection):
+        with self._available:
+            connection.active -= 1
+            self._available.notify_all()
+
+    def _notify(self):
+        with self._available:
+            self._available.notify_all()
+
+    def close(self):
+        with self._available:
+            connections, self._connections = self._connections, {}
+        for connection in [c for connections in connections.values() for c in connections]:
+            connection.close()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.connectionpool import HTTPSConnectionPool
+
+# transport of pooled connections of requests session, see easydb_client.transport
+
+_connect_timing = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0.0) + time.perf_counter() - started
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0.0) + time.perf_counter() - started
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    # measures time of opening connections
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+
+class RequestsTransport:
+    timeout_errors = (requests.Timeout,)
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, max_retries=0):
+        self.session = requests.Session()
+        adapter = _TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block, max_retries=max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, data=None, headers=None, timeout=None, stream=False):
+        _connect_timing.seconds = 0.0
+        response = self.session.request(method, url, data=data, headers=headers, timeout=timeout, stream=stream)
+        response.request_bytes = 0 if data is None else len(data)
+        response.ttfb = response.elapsed.total_seconds()
+        response.connect_time = _connect_timing.seconds
+        return response
+
+    def close(self):
+        self.session.close()
@@ -11,8 +11,14 @@ setup(
     download_url='https://github.com/prototype-project/easydb-python-client/archive/0.5.0.tar.gz',
     keywords=['client', 'database'],
     classifiers=[],
+    python_requires='>=3.8',
     install_requires=[
           'requests',
           'httmock',
-      ]
+      ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'http2': ['h2'],
+    }
 )
\ No newline at end of file
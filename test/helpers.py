@@ -0,0 +1,26 @@
+from easydb_client.metrics import Observer
+
+# helpers shared by tests
+
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        self.measurements = []
+
+    def observe(self, measurement):
+        self.measurements.append(measurement)
+
+    @property
+    def operations(self):
+        return [m.operation for m in self.measurements]
+
+    def of(self, operation):
+        return [m for m in self.measurements if m.operation == operation]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,334 @@
+import asyncio
+from unittest import TestCase
+from unittest import skipUnless
+
+import easydb_client
+import easydb_client.inmemory as inmemory
+from easydb_client.server import StandInServer
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    web = None
+
+PAGE_SIZE = 2
+
+
+# Test for both async easydb client and async in memory version of easydb
+
+
+def run_for_both_async_client_and_in_memory(test_method):
+    def test_for_both_client_and_in_memory(self):
+        from easydb_client.aio import AsyncEasydbClient
+        import easydb_client.inmemory_aio as inmemory_aio
+
+        async def run_against_api(url):
+            async with AsyncEasydbClient(url=url) as client:
+                await test_method(self, client)
+
+        with StandInServer(page_size=PAGE_SIZE) as server:
+            asyncio.run(run_against_api(server.url))
+
+        asyncio.run(test_method(self, inmemory_aio))
+        inmemory.remove_all_spaces()
+
+    return test_for_both_client_and_in_memory
+
+
+@skipUnless(web, 'aiohttp is not installed')
+class AsyncEasydbTest(TestCase):
+    @run_for_both_async_client_and_in_memory
+    async def test_should_manage_spaces(self, easydb):
+        # given
+        space = await easydb.create_space()
+
+        # when
+        fetched_space = await easydb.get_space(space.name)
+
+        # then
+        self.assertEqual(fetched_space.name, space.name)
+
+        # and
+        self.assertTrue(await easydb.space_exists(space.name))
+
+        # when
+        await easydb.remove_space(space.name)
+
+        # then
+        self.assertFalse(await easydb.space_exists(space.name))
+
+        # and
+        with self.assertRaises(easydb_client.SpaceNotFound):
+            await easydb.get_space(space.name)
+
+
+@skipUnless(web, 'aiohttp is not installed')
+class AsyncBucketTest(TestCase):
+    @run_for_both_async_client_and_in_memory
+    async def test_should_add_get_update_and_remove_element(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+
+        # when
+        saved_element = await bucket.add({'firstName': 'John'})
+
+        # then
+        self.assertEqual(await bucket.get(saved_element['id']), saved_element)
+
+        # when
+        updated_element = await bucket.update(saved_element['id'], {'firstName': 'Johny'})
+
+        # then
+        self.assertEqual(updated_element['fields'], {'firstName': 'Johny'})
+
+        # when
+        await bucket.remove(saved_element['id'])
+
+        # then
+        with self.assertRaises(easydb_client.ElementNotFound):
+            await bucket.get(saved_element['id'])
+
+    @run_for_both_async_client_and_in_memory
+    async def test_should_throw_error_when_passing_invalid_element(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+
+        with self.assertRaises(easydb_client.InvalidElementFormat):  # then
+            await bucket.add({'fieldWithInvalidValue': []})  # when
+
+    @run_for_both_async_client_and_in_memory
+    async def test_should_walk_all_pages(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+
+        # and
+        await asyncio.gather(*(bucket.add({'index': str(i)}) for i in range(5)))
+
+        # when
+        elements = [e async for e in bucket.all()]
+
+        # then
+        self.assertEqual(sorted(e['fields']['index'] for e in elements), ['0', '1', '2', '3', '4'])
+
+        # when
+        prefetched_elements = [e async for e in bucket.all(prefetch=2)]
+
+        # then
+        self.assertEqual(prefetched_elements, elements)
+
+        # when
+        streamed_elements = [e async for e in bucket.all(stream=True)]
+
+        # then
+        self.assertEqual(streamed_elements, elements)
+
+        # when
+        scan = bucket.all(prefetch=1)
+        await scan.__anext__()
+
+        # then
+        self.assertIsNone(await scan.aclose())
+
+    @run_for_both_async_client_and_in_memory
+    async def test_should_filter_elements(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+
+        # and
+        await bucket.add({'firstName': 'John'})
+        await bucket.add({'firstName': 'Mark', 'lastName': 'Smith'})
+        await bucket.add({'firstName': 'Mark', 'lastName': 'Robinson'})
+
+        # when
+        q = easydb_client.query.where('firstName').eq('Mark') & easydb_client.query.where('lastName').eq('Smith')
+        elements = [e async for e in bucket.filter(q)]
+
+        # then
+        self.assertEqual([e['fields']['lastName'] for e in elements], ['Smith'])
+
+    @run_for_both_async_client_and_in_memory
+    async def test_should_count_list_ids_and_project_elements(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+        for i in range(5):
+            await bucket.add({'group': str(i % 2), 'index': str(i)})
+        odd = easydb_client.query.where('group').eq('1')
+
+        # when
+        count = await bucket.count()
+        odd_count = await bucket.count(odd)
+
+        # then
+        self.assertEqual((count, odd_count), (5, 2))
+
+        # and
+        self.assertEqual([i async for i in bucket.ids(odd)], [e['id'] async for e in bucket.filter(odd)])
+
+        # and
+        self.assertEqual([e['fields'] async for e in bucket.all(fields=['index'])],
+                         [{'index': str(i)} for i in range(5)])
+
+    @run_for_both_async_client_and_in_memory
+    async def test_should_scan_pages_in_parallel(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+        [r async for r in bucket.add_many({'index': str(i)} for i in range(11))]
+
+        # when
+        scanned = [e async for e in bucket.scan(workers=3, page_size=2)]
+
+        # then
+        self.assertEqual(scanned, [e async for e in bucket.all()])
+
+    @run_for_both_async_client_and_in_memory
+    async def test_should_run_bulk_writes(self, easydb):
+        # given
+        bucket = (await easydb.create_space()).get_bucket('users')
+
+        # when
+        added = [r async for r in bucket.add_many(({'index': str(i)} for i in range(10)), concurrency=3)]
+
+        # then
+        self.assertEqual([r.value['fields']['index'] for r in added], [str(i) for i in range(10)])
+
+        # when
+        updated = [r async for r in bucket.update_many(
+            [(added[0].value['id'], {'index': 'first'}), ('missing', {'index': 'none'})])]
+
+        # then
+        self.assertEqual(updated[0].value['fields'], {'index': 'first'})
+
+        # and
+        self.assertIsInstance(updated[1].error, easydb_client.ElementNotFound)
+
+        # when
+        removed = [r async for r in bucket.remove_many(r.value['id'] for r in added)]
+
+        # then
+        self.assertTrue(all(r.error is None for r in removed))
+
+        # and
+        self.assertEqual([e async for e in bucket.all()], [])
+
+
+@skipUnless(web, 'aiohttp is not installed')
+class AsyncBucketReplicationTest(TestCase):
+    def test_should_apply_writes_to_replica_of_the_client(self):
+        from easydb_client.aio import AsyncEasydbClient
+        written = []
+
+        class RecordingReplica:
+            def _written(self, element_id, fields):
+                written.append((element_id, fields))
+
+        async def run(url):
+            async with AsyncEasydbClient(url=url) as client:
+                # given
+                space = await client.create_space()
+                bucket = space.get_bucket('users')
+                client._replicas[space.name, 'users'] = RecordingReplica()
+
+                # when
+                added = await bucket.add({'firstName': 'John'})
+                await bucket.update(added['id'], {'firstName': 'Johny'})
+                await bucket.remove(added['id'])
+
+                # then
+                self.assertEqual(written, [(added['id'], {'firstName': 'John'}),
+                                           (added['id'], {'firstName': 'Johny'}), (added['id'], None)])
+
+        with StandInServer(page_size=PAGE_SIZE) as server:
+            asyncio.run(run(server.url))
+
+
+@skipUnless(web, 'aiohttp is not installed')
+class AsyncClientTest(TestCase):
+    def run_against_slow_api(self, test, delays, **client_options):
+        from easydb_client.aio import AsyncEasydbClient
+
+        async def get_space(request):
+            await asyncio.sleep(delays.pop(0) if delays else 0)
+            return web.json_response({'spaceName': request.match_info['space']})
+
+        async def run():
+            app = web.Application()
+            app.add_routes([web.get('/api/v1/spaces/{space}', get_space)])
+            async with TestServer(app) as server:
+                async with AsyncEasydbClient(url=str(server.make_url('')).rstrip('/'), **client_options) as client:
+                    await test(client)
+
+        asyncio.run(run())
+
+    def test_should_raise_error_when_deadline_is_exceeded(self):
+        async def test(client):
+            # when
+            with self.assertRaises(easydb_client.DeadlineExceeded):
+                await client.get_space('space', deadline=0.05)
+
+            # then
+            self.assertEqual((await client.get_space('space', deadline=1)).name, 'space')
+
+        self.run_against_slow_api(test, [0.5])
+
+    def test_should_answer_with_hedged_request_when_first_one_is_slow(self):
+        from easydb_client.hedging import HedgingPolicy
+
+        async def test(client):
+            # when
+            started = asyncio.get_running_loop().time()
+            space = await client.get_space('space')
+
+            # then
+            self.assertEqual(space.name, 'space')
+
+            # and
+            self.assertLess(asyncio.get_running_loop().time() - started, 0.4)
+
+            # and
+            self.assertEqual(client.hedging.info()[:3], (1, 1, 1))
+
+        self.run_against_slow_api(test, [0.5], hedging=HedgingPolicy(initial_delay=0.02))
+
+    def test_should_send_single_request_for_concurrent_identical_reads(self):
+        async def test(client):
+            # when
+            spaces = await asyncio.gather(*(client.get_space('space') for _ in range(8)))
+
+            # then
+            self.assertEqual([space.name for space in spaces], ['space'] * 8)
+
+            # and
+            self.assertEqual((client.single_flight.calls, client.single_flight.shared), (1, 7))
+
+        self.run_against_slow_api(test, [0.1])
+
+    def test_should_limit_shared_call_by_deadline_of_caller_which_started_it(self):
+        async def test(client):
+            # when
+            with self.assertRaises(easydb_client.DeadlineExceeded):
+                await client.get_space('space', deadline=0.2)
+            await asyncio.sleep(0.05)
+
+            # then
+            self.assertEqual(client.single_flight._in_flight, {})
+
+        self.run_against_slow_api(test, [1])
+
+    def test_should_measure_every_request(self):
+        from easydb_client.metrics import HistogramCollector
+        collector = HistogramCollector()
+
+        async def test(client):
+            # when
+            await client.get_space('space')
+            await client.get_space('space')
+
+            # then
+            report = collector.report()['get_space']
+            self.assertEqual((report['count'], report['statuses']), (2, {200: 2}))
+
+            # and
+            self.assertGreater(report['timings']['connect']['max'], 0)
+
+        self.run_against_slow_api(test, [], observer=collector)
@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+from easydb_client.cache import ElementCache
+from .helpers import FakeClock
+
+
+class ElementCacheTest(TestCase):
+    def test_should_evict_least_recently_used_entry(self):
+        # given
+        cache = ElementCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+
+        # when
+        cache.get('a')
+        cache.put('c', 3)
+
+        # then
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+        # and
+        self.assertEqual(cache.info().evictions, 1)
+
+    def test_should_expire_entries_after_ttl(self):
+        # given
+        clock = FakeClock()
+        cache = ElementCache(ttl=10, clock=clock)
+        cache.put('a', 1)
+
+        # when
+        clock.now = 9
+        before_ttl = cache.get('a')
+        clock.now = 10
+        after_ttl = cache.get('a')
+
+        # then
+        self.assertEqual((before_ttl, after_ttl), (1, None))
+
+        # and
+        self.assertEqual(cache.info()[:5], (1, 1, 0, 1, 0))
+
+    def test_should_invalidate_entry(self):
+        # given
+        cache = ElementCache()
+        cache.put('a', 1)
+
+        # when
+        cache.invalidate('a')
+        cache.invalidate('missing')
+
+        # then
+        self.assertIsNone(cache.get('a'))
+
+    def test_should_not_put_value_when_key_was_written_since_generation_was_taken(self):
+        # given
+        cache = ElementCache(maxsize=2)
+        generation = cache.generation('a')
+
+        # when
+        cache.invalidate('a')
+        cache.put('a', 'stale', generation)
+
+        # then
+        self.assertIsNone(cache.get('a'))
+
+        # when
+        cache.put('a', 'fresh', cache.generation('a'))
+
+        # then
+        self.assertEqual(cache.get('a'), 'fresh')
+
+        # when
+        generation = cache.generation('a')
+        cache.put('a', 'written')
+        cache.invalidate('b')
+        cache.invalidate('c')
+        cache.put('a', 'stale', generation)
+
+        # then
+        self.assertEqual(cache.get('a'), 'written')
@@ -0,0 +1,132 @@
+import random
+from unittest import TestCase
+from unittest import skipUnless
+
+import easydb_client
+from easydb_client.codec import JsonCodec
+from easydb_client.codec import OrjsonCodec
+from easydb_client.codec import default_codec
+from easydb_client.metrics import Observer
+from easydb_client.server import StandInServer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ALPHABET = [chr(c) for c in range(0x80)] + ['é', 'ł', '中', ' ', ' ', '﻿', '\x80', '\x9f', '\U0001F600']
+
+
+def random_bodies(count, seed=0):
+    rng = random.Random(seed)
+
+    def text():
+        return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 16)))
+
+    for i in range(count):
+        element = {'id': text(), 'bucketName': text(),
+                   'fields': [{'name': text(), 'value': text()} for _ in range(rng.randint(0, 4))]}
+        yield rng.choice([
+            element,
+            {'fields': element['fields']},
+            {'next': rng.choice([None, text()]), 'results': [element] * rng.randint(0, 3)},
+            {'spaceName': text(), 'count': i},
+        ])
+
+
+class ShapeCountingCodec(JsonCodec):
+    def __init__(self):
+        self.shaped = 0
+
+    def decode_elements(self, data):
+        self.shaped += 1
+        return super().decode_elements(data)
+
+
+class JsonCodecTest(TestCase):
+    def test_should_decode_elements_in_final_shape(self):
+        # given
+        codec = JsonCodec()
+        page = {'next': None, 'results': [
+            {'id': '1', 'bucketName': 'users', 'fields': [{'name': 'firstName', 'value': 'John'}]}]}
+
+        # when
+        decoded = codec.decode_elements(codec.encode(page))
+
+        # then
+        self.assertEqual(decoded, {'next': None, 'results': [
+            {'id': '1', 'bucketName': 'users', 'fields': {'firstName': 'John'}}]})
+
+        # and
+        self.assertEqual(codec.decode_elements(b'{"spaceName":"abc"}'), {'spaceName': 'abc'})
+        self.assertEqual(codec.encode({'name': 'Zażółć'}), '{"name":"Zażółć"}'.encode('utf-8'))
+
+
+@skipUnless(orjson, 'orjson is not installed')
+class OrjsonCodecConformanceTest(TestCase):
+    def test_should_encode_the_same_bytes_as_stdlib(self):
+        # given
+        stdlib, fast = JsonCodec(), OrjsonCodec()
+
+        for body in random_bodies(5000):
+            # when
+            encoded = fast.encode(body)
+
+            # then
+            self.assertEqual(encoded, stdlib.encode(body))
+
+            # and
+            self.assertEqual(fast.decode(encoded), stdlib.decode(encoded))
+            self.assertEqual(fast.decode_elements(encoded), stdlib.decode_elements(encoded))
+
+    def test_should_be_default_codec(self):
+        self.assertIsInstance(default_codec(), OrjsonCodec)
+
+
+class ClientCodecTest(TestCase):
+    def test_should_read_and_write_the_same_elements_with_every_codec(self):
+        names = ['Zażółć', 'John', '"quoted"\n']
+        with StandInServer(page_size=2) as server:
+            for codec in [JsonCodec(), default_codec()]:
+                for compact_elements in [False, True]:
+                    with easydb_client.EasydbClient(url=server.url, codec=codec,
+                                                    compact_elements=compact_elements) as client:
+                        # given
+                        bucket = client.create_space().get_bucket('users')
+                        added = [bucket.add({'name': name}) for name in names]
+
+                        # when
+                        read = [bucket.get(added[0]['id'])] + list(bucket.all()) + list(bucket.all(stream=True)) + \
+                            list(bucket.all(fields=['name']))
+
+                    # then
+                    self.assertEqual([e['fields']['name'] for e in read], names[:1] + names * 3)
+                    self.assertEqual([e['id'] for e in read[1:4]], [e['id'] for e in added])
+
+    def test_should_not_shape_pages_read_for_counts_ids_and_projections(self):
+        with StandInServer(page_size=2) as server:
+            for observer in [None, Observer()]:
+                codec = ShapeCountingCodec()
+                with easydb_client.EasydbClient(url=server.url, codec=codec, observer=observer) as client:
+                    # given
+                    bucket = client.create_space().get_bucket('users')
+                    added = [bucket.add({'name': str(i), 'group': 'users'}) for i in range(3)]
+                    codec.shaped = 0
+
+                    # when
+                    count = bucket.count()
+                    ids = list(bucket.ids()) + list(bucket.ids(stream=True))
+                    projected = list(bucket.all(fields=['name'])) + list(bucket.scan(page_size=2, fields=['name']))
+
+                    # then
+                    self.assertEqual(codec.shaped, 0)
+                    self.assertEqual(count, 3)
+                    self.assertEqual(ids, [e['id'] for e in added] * 2)
+                    self.assertEqual([e['fields'] for e in projected], [{'name': str(i)} for i in range(3)] * 2)
+
+                    # when
+                    elements = list(bucket.all())
+
+                    # then
+                    self.assertEqual(elements, added)
+                    self.assertEqual(codec.shaped, 2)
@@ -0,0 +1,149 @@
+import asyncio
+import io
+from unittest import TestCase
+from unittest import skipUnless
+
+import easydb_client
+from easydb_client.compression import Compression
+from easydb_client.compression import DecompressingReader
+from easydb_client.compression import UnsupportedContentEncoding
+from easydb_client.compression import accepts
+from easydb_client.compression import decompress
+from easydb_client.compression import decompressor
+from easydb_client.server import InProcessTransport
+from easydb_client.server import StandInServer
+from easydb_client.transport import HTTPClientTransport
+from .helpers import RecordingObserver
+
+try:
+    from easydb_client.server_h2 import H2StandInServer
+    from easydb_client.transport_h2 import H2Transport
+except ImportError:
+    H2Transport = None
+
+try:
+    from easydb_client.aio import AsyncEasydbClient
+except ImportError:
+    AsyncEasydbClient = None
+
+
+def element(i):
+    return {'firstName': 'John', 'lastName': 'Smith', 'index': str(i), 'about': 'easydb user ' * 20}
+
+
+class CompressionTest(TestCase):
+    def test_should_decompress_body_while_it_is_read(self):
+        # given
+        data = b''.join(b'{"name":"field%d","value":"value"},' % i for i in range(5000))
+        compressed = Compression(level=9).compress(data)
+
+        # when
+        reader = DecompressingReader(io.BytesIO(compressed), decompressor('gzip'))
+        chunks = list(iter(lambda: reader.read(1024), b''))
+
+        # then
+        self.assertLess(len(compressed), len(data) / 10)
+        self.assertEqual(b''.join(chunks), data)
+        self.assertTrue(all(len(chunk) <= 1024 for chunk in chunks))
+
+        # and
+        self.assertEqual(DecompressingReader(io.BytesIO(compressed), decompressor('gzip')).read(), data)
+        self.assertEqual(decompress(data, None), data)
+        with self.assertRaises(UnsupportedContentEncoding):
+            decompress(data, 'br')
+        with self.assertRaises(UnsupportedContentEncoding):
+            decompress(data, 'gzip')
+
+    def test_should_negotiate_encoding(self):
+        self.assertTrue(accepts('gzip'))
+        self.assertTrue(accepts('deflate, GZIP;q=0.5'))
+        self.assertTrue(accepts('*'))
+        self.assertFalse(accepts('gzip;q=0'))
+        self.assertFalse(accepts('deflate'))
+        self.assertFalse(accepts(None))
+
+
+class ClientCompressionTest(TestCase):
+    def exercise_client(self, url, transport=None):
+        # given
+        observer = RecordingObserver()
+        client = easydb_client.EasydbClient(url=url, transport=transport, observer=observer,
+                                            compression=Compression(level=6, threshold=256))
+        bucket = client.create_space().get_bucket('users')
+
+        # when
+        added = [bucket.add(element(i)) for i in range(20)]
+        updated = bucket.update(added[0]['id'], dict(element(0), index='first'))
+        small = bucket.add({'firstName': 'Anna'})
+
+        # then
+        expected = ['first'] + [str(i) for i in range(1, 20)] + [None]
+        self.assertEqual(updated['fields']['index'], 'first')
+        self.assertEqual([e['fields'].get('index') for e in bucket.all()], expected)
+        self.assertEqual([e['fields'].get('index') for e in bucket.all(stream=True)], expected)
+        self.assertEqual(bucket.get(small['id'])['fields'], {'firstName': 'Anna'})
+
+        # and
+        add = observer.of('add')
+        self.assertLess(add[0].request_bytes, len(client.codec.encode({'fields': [
+            {'name': name, 'value': value} for name, value in element(0).items()]})) / 2)
+        self.assertLess(add[-1].request_bytes, 256)
+        page = observer.of('page_fetch')[0]
+        self.assertLess(page.response_bytes, len(client.codec.encode(list(bucket.all()))) / 2)
+        client.close()
+
+    def test_should_compress_requests_and_responses_over_http_client_connections(self):
+        with StandInServer(page_size=100, compression=Compression(threshold=256)) as server:
+            self.exercise_client(server.url, HTTPClientTransport())
+
+    def test_should_compress_requests_and_responses_over_requests_session(self):
+        with StandInServer(page_size=100, compression=Compression(threshold=256)) as server:
+            self.exercise_client(server.url)
+
+    def test_should_compress_requests_and_responses_in_process(self):
+        self.exercise_client('http://easydb', InProcessTransport(page_size=100, compression=Compression(threshold=256)))
+
+    @skipUnless(H2Transport, 'h2 is not installed')
+    def test_should_compress_requests_and_responses_over_http2(self):
+        with H2StandInServer(page_size=100, compression=Compression(threshold=256)) as server:
+            self.exercise_client(server.url, H2Transport())
+
+    def test_should_not_compress_responses_for_client_without_compression(self):
+        with StandInServer(page_size=100, compression=Compression(threshold=0)) as server:
+            # given
+            observer = RecordingObserver()
+            client = easydb_client.EasydbClient(url=server.url, transport=HTTPClientTransport(), observer=observer)
+            bucket = client.create_space().get_bucket('users')
+            bucket.add(element(0))
+
+            # when
+            elements = list(bucket.all())
+
+            # then
+            self.assertEqual(len(elements), 1)
+            self.assertEqual(observer.of('page_fetch')[0].response_bytes,
+                             len(client.codec.encode({'next': None, 'results': [{
+                                 'id': elements[0]['id'], 'bucketName': 'users', 'fields': [
+                                     {'name': name, 'value': value} for name, value in element(0).items()]}]})))
+            client.close()
+
+    @skipUnless(AsyncEasydbClient, 'aiohttp is not installed')
+    def test_should_compress_requests_of_async_client(self):
+        with StandInServer(page_size=100, compression=Compression(threshold=256)) as server:
+            # given
+            observer = RecordingObserver()
+
+            async def exercise():
+                async with AsyncEasydbClient(url=server.url, observer=observer,
+                                             compression=Compression(threshold=256)) as client:
+                    bucket = (await client.create_space()).get_bucket('users')
+                    added = await bucket.add(element(0))
+                    return added, [e async for e in bucket.all()]
+
+            # when
+            added, elements = asyncio.run(exercise())
+
+            # then
+            self.assertEqual(elements, [added])
+            self.assertLess(observer.of('add')[0].request_bytes, 256)
+            self.assertLess(observer.of('page_fetch')[0].response_bytes, 256)
@@ -1,5 +1,6 @@
 from unittest import TestCase
 import json
+import time
 from httmock import urlmatch, HTTMock
 from easydb_client.easydb import EASYDB_URL
 
@@ -376,6 +377,24 @@ def try_to_pass_invalid_element_to_add_api_mock(url, request):
     }
 
 
+@urlmatch(path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}'
+          .format(SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME), method='POST')
+def add_valid_elements_to_bucket_api_mock(url, request):
+    fields = json.loads(request.body)['fields']
+    if not all(isinstance(field['value'], str) for field in fields):
+        return {
+            'status_code': 400
+        }
+    return {
+        'status_code': 201,
+        'content': json.dumps({
+            'id': BUCKET_ELEMENT_ID,
+            'bucketName': BUCKET_NAME,
+            'fields': fields
+        })
+    }
+
+
 class BucketTest(TestCase):
     @with_mocked_api(add_element_to_bucket_api_mock)
     @with_mocked_api(create_space_api_mock)
@@ -471,6 +490,59 @@ class BucketTest(TestCase):
         # then
         self.assertEqual(len(elements), 2)
 
+    @with_mocked_api(add_element_to_bucket_api_mock)
+    @with_mocked_api(create_space_api_mock)
+    @with_mocked_api(get_all_bucket_elements_api_mock)
+    @run_for_both_client_and_in_memory(
+        in_memory_cleanup=lambda in_memory: in_memory.remove_all_spaces()
+    )
+    def test_should_get_all_elements_from_bucket_with_prefetch(self, easydb_client):
+        # given
+        space = easydb_client.create_space()
+
+        # and
+        bucket = space.get_bucket(BUCKET_NAME)
+
+        # and
+        bucket.add({'firstName': 'John'})
+        bucket.add({'firstName': 'Mark'})
+
+        # when
+        elements = list(bucket.all(prefetch=1))
+
+        # then
+        self.assertEqual([e['fields']['firstName'] for e in elements], ['John', 'Mark'])
+
+        # when
+        scan = bucket.all(prefetch=1)
+        next(scan)
+
+        # then
+        self.assertIsNone(scan.close())
+
+    @with_mocked_api(add_element_to_bucket_api_mock)
+    @with_mocked_api(create_space_api_mock)
+    @with_mocked_api(get_all_bucket_elements_api_mock)
+    @run_for_both_client_and_in_memory(
+        in_memory_cleanup=lambda in_memory: in_memory.remove_all_spaces()
+    )
+    def test_should_stream_all_elements_from_bucket(self, easydb_client):
+        # given
+        space = easydb_client.create_space()
+
+        # and
+        bucket = space.get_bucket(BUCKET_NAME)
+
+        # and
+        bucket.add({'firstName': 'John'})
+        bucket.add({'firstName': 'Mark'})
+
+        # when
+        elements = list(bucket.all(stream=True))
+
+        # then
+        self.assertEqual([e['fields']['firstName'] for e in elements], ['John', 'Mark'])
+
     @with_mocked_api(add_element_to_bucket_api_mock)
     @with_mocked_api(create_space_api_mock)
     @with_mocked_api(get_filtered_bucket_elements_api_mock)
@@ -523,6 +595,62 @@ class BucketTest(TestCase):
         # then
         self.assertEqual(len(elements), 1)
 
+    @with_mocked_api(add_element_to_bucket_api_mock)
+    @with_mocked_api(create_space_api_mock)
+    @with_mocked_api(get_all_bucket_elements_api_mock)
+    @run_for_both_client_and_in_memory(
+        in_memory_cleanup=lambda in_memory: in_memory.remove_all_spaces()
+    )
+    def test_should_count_elements_and_list_their_ids(self, easydb_client):
+        # given
+        space = easydb_client.create_space()
+
+        # and
+        bucket = space.get_bucket(BUCKET_NAME)
+
+        # and
+        bucket.add({'firstName': 'John'})
+        bucket.add({'firstName': 'Mark'})
+
+        # when
+        count = bucket.count()
+        ids = list(bucket.ids())
+
+        # then
+        self.assertEqual(count, 2)
+
+        # and
+        self.assertEqual(ids, [e['id'] for e in bucket.all()])
+
+    @with_mocked_api(add_element_to_bucket_api_mock)
+    @with_mocked_api(create_space_api_mock)
+    @with_mocked_api(get_filtered_single_bucket_elements_api_mock)
+    @run_for_both_client_and_in_memory(
+        in_memory_cleanup=lambda in_memory: in_memory.remove_all_spaces()
+    )
+    def test_should_project_filtered_elements_on_given_fields(self, easydb_client):
+        # given
+        space = easydb_client.create_space()
+
+        # and
+        bucket = space.get_bucket(BUCKET_NAME)
+
+        # and
+        bucket.add({'firstName': 'John'})
+        bucket.add({'firstName': 'Mark', 'lastName': 'Robinson', 'alias': 'meh'})
+
+        # and
+        alias_eq_meh = easydb_client.query.where('alias').eq('meh')
+
+        # when
+        elements = list(bucket.filter(alias_eq_meh, fields=['alias', 'missing']))
+
+        # then
+        self.assertEqual([e['fields'] for e in elements], [{'alias': 'meh'}])
+
+        # and
+        self.assertEqual(bucket.count(alias_eq_meh), 1)
+
     @with_mocked_api(add_element_to_bucket_api_mock)
     @with_mocked_api(create_space_api_mock)
     @run_for_both_client_and_in_memory(
@@ -647,3 +775,348 @@ class BucketTest(TestCase):
 
         with self.assertRaises(easydb_client.InvalidElementFormat):  # then
             bucket.add({'fieldWithInvalidValue': []})  # when
+
+
+class BulkTest(TestCase):
+    @with_mocked_api(add_valid_elements_to_bucket_api_mock)
+    @with_mocked_api(create_space_api_mock)
+    @run_for_both_client_and_in_memory(
+        in_memory_cleanup=lambda in_memory: in_memory.remove_all_spaces()
+    )
+    def test_should_add_many_elements_reporting_errors_in_input_order(self, easydb_client):
+        # given
+        bucket = easydb_client.create_space().get_bucket(BUCKET_NAME)
+
+        # when
+        results = list(bucket.add_many(
+            [{'firstName': 'John'}, {'firstName': []}, {'firstName': 'Mark'}], concurrency=2))
+
+        # then
+        self.assertEqual([r.value['fields']['firstName'] if r.value else None for r in results],
+                         ['John', None, 'Mark'])
+
+        # and
+        self.assertEqual([type(r.error) for r in results],
+                         [type(None), easydb_client.InvalidElementFormat, type(None)])
+
+    @with_mocked_api(create_space_api_mock)
+    @with_mocked_api(try_to_update_nonexistent_element_api_mock)
+    @with_mocked_api(try_to_remove_nonexistent_element_api_mock)
+    @run_for_both_client_and_in_memory(
+        in_memory_cleanup=lambda in_memory: in_memory.remove_all_spaces()
+    )
+    def test_should_report_missing_elements_without_aborting_batch(self, easydb_client):
+        # given
+        bucket = easydb_client.create_space().get_bucket(BUCKET_NAME)
+
+        # when
+        updated = list(bucket.update_many([(BUCKET_ELEMENT_ID, {'firstName': 'John'})] * 3))
+        removed = list(bucket.remove_many([BUCKET_ELEMENT_ID] * 3))
+
+        # then
+        self.assertTrue(all(isinstance(r.error, easydb_client.ElementNotFound) for r in updated + removed))
+
+        # and
+        self.assertEqual(len(updated + removed), 6)
+
+
+class CachedBucketTest(TestCase):
+    def setUp(self):
+        self.requests_sent = []
+
+        @urlmatch(path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}/{BUCKET_ELEMENT_ID}'.format(
+            SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME, BUCKET_ELEMENT_ID=BUCKET_ELEMENT_ID))
+        def counting_api_mock(url, request):
+            self.requests_sent.append(request.method)
+            return {
+                'status_code': 200,
+                'content': json.dumps({
+                    'id': BUCKET_ELEMENT_ID,
+                    'bucketName': BUCKET_NAME,
+                    'fields': [
+                        {
+                            'name': 'firstName',
+                            'value': 'John'
+                        }
+                    ]
+                })
+            }
+
+        self.counting_api_mock = counting_api_mock
+
+    def test_should_serve_repeated_gets_from_cache_until_element_is_written(self):
+        # given
+        from easydb_client import EasydbClient
+        from easydb_client.cache import ElementCache
+        client = EasydbClient(cache=ElementCache(maxsize=10))
+
+        with HTTMock(get_space_api_mock, self.counting_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+            # when
+            first = bucket.get(BUCKET_ELEMENT_ID)
+            second = bucket.get(BUCKET_ELEMENT_ID)
+
+            # then
+            self.assertEqual(first, second)
+
+            # and
+            self.assertEqual(self.requests_sent, ['GET'])
+
+            # when
+            bucket.update(BUCKET_ELEMENT_ID, {'firstName': 'Johny'})
+
+            # then
+            self.assertEqual(bucket.get(BUCKET_ELEMENT_ID)['fields'], {'firstName': 'Johny'})
+
+            # when
+            bucket.remove(BUCKET_ELEMENT_ID)
+            bucket.get(BUCKET_ELEMENT_ID)
+
+            # then
+            self.assertEqual(self.requests_sent, ['GET', 'PUT', 'DELETE', 'GET'])
+
+        # and
+        self.assertEqual(client.cache.info()[:2], (2, 2))
+
+    def test_should_not_cache_element_fetched_while_it_was_written(self):
+        # given
+        from easydb_client import EasydbClient
+        from easydb_client.cache import ElementCache
+        client = EasydbClient(cache=ElementCache(maxsize=10))
+
+        @urlmatch(method='get', path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}/{BUCKET_ELEMENT_ID}'.format(
+            SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME, BUCKET_ELEMENT_ID=BUCKET_ELEMENT_ID))
+        def racing_api_mock(url, request):
+            # element is updated after the server read it, before its response arrives
+            if self.requests_sent == []:
+                bucket.update(BUCKET_ELEMENT_ID, {'firstName': 'Johny'})
+            return self.counting_api_mock(url, request)
+
+        with HTTMock(get_space_api_mock, racing_api_mock, self.counting_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+            # when
+            stale = bucket.get(BUCKET_ELEMENT_ID)
+
+            # then
+            self.assertEqual(stale['fields'], {'firstName': 'John'})
+
+            # and
+            self.assertEqual(bucket.get(BUCKET_ELEMENT_ID)['fields'], {'firstName': 'Johny'})
+
+            # and
+            self.assertEqual(self.requests_sent, ['PUT', 'GET'])
+
+    def test_should_not_serve_cached_element_after_write_without_response(self):
+        # given
+        from easydb_client import EasydbClient, DeadlineExceeded
+        from easydb_client.cache import ElementCache
+        client = EasydbClient(cache=ElementCache(maxsize=10))
+        fields = [{'name': 'firstName', 'value': 'John'}]
+
+        @urlmatch(path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}/{BUCKET_ELEMENT_ID}'.format(
+            SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME, BUCKET_ELEMENT_ID=BUCKET_ELEMENT_ID))
+        def slow_writes_api_mock(url, request):
+            if request.method == 'PUT':
+                time.sleep(0.2)
+                fields[:] = json.loads(request.body)['fields']
+            return {
+                'status_code': 200,
+                'content': json.dumps({'id': BUCKET_ELEMENT_ID, 'bucketName': BUCKET_NAME, 'fields': fields})
+            }
+
+        with HTTMock(get_space_api_mock, slow_writes_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+            bucket.get(BUCKET_ELEMENT_ID)
+
+            # when
+            with self.assertRaises(DeadlineExceeded):
+                bucket.update(BUCKET_ELEMENT_ID, {'firstName': 'Johny'}, deadline=0.05)
+            time.sleep(0.3)
+
+            # then
+            self.assertEqual(bucket.get(BUCKET_ELEMENT_ID)['fields'], {'firstName': 'Johny'})
+        client.close()
+
+
+class EasydbClientTest(TestCase):
+    @with_mocked_api(add_element_to_bucket_api_mock)
+    @with_mocked_api(create_space_api_mock)
+    def test_should_route_space_and_bucket_traffic_through_client(self):
+        # given
+        from easydb_client import EasydbClient
+        client = EasydbClient(url='http://localhost:9000', pool_connections=1, pool_maxsize=4)
+
+        # when
+        space = client.create_space()
+        saved_element = space.get_bucket(BUCKET_NAME).add({'firstName': 'John'})
+
+        # then
+        self.assertIs(space.client, client)
+
+        # and
+        self.assertEqual(saved_element['fields']['firstName'], 'John')
+
+        # and
+        self.assertEqual(client.session.get_adapter('http://localhost:9000')._pool_maxsize, 4)
+
+    @with_mocked_api(get_all_bucket_elements_api_mock)
+    @with_mocked_api(get_space_api_mock)
+    def test_should_return_compact_elements(self):
+        # given
+        from easydb_client import EasydbClient
+        from easydb_client.element import Element
+        bucket = EasydbClient(compact_elements=True).get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+        # when
+        elements = list(bucket.all()) + list(bucket.all(stream=True))
+
+        # then
+        self.assertTrue(all(isinstance(e, Element) for e in elements))
+
+        # and
+        self.assertEqual([e['fields']['firstName'] for e in elements], ['John', 'Mark', 'John', 'Mark'])
+
+    @with_mocked_api(get_space_api_mock)
+    def test_should_use_default_client_for_module_level_functions(self):
+        # given
+        import easydb_client
+
+        # when
+        space = easydb_client.get_space(SPACE_NAME)
+
+        # then
+        self.assertIs(space.client, easydb_client.get_default_client())
+
+
+class DeadlineAndHedgingTest(TestCase):
+    def setUp(self):
+        self.delays = []
+
+        @urlmatch(path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}/{BUCKET_ELEMENT_ID}'.format(
+            SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME, BUCKET_ELEMENT_ID=BUCKET_ELEMENT_ID), method='GET')
+        def slow_api_mock(url, request):
+            time.sleep(self.delays.pop(0) if self.delays else 0)
+            return get_element_from_bucket_api_mock(url, request)
+
+        self.slow_api_mock = slow_api_mock
+
+    def test_should_raise_error_when_deadline_is_exceeded(self):
+        # given
+        from easydb_client import EasydbClient, DeadlineExceeded
+        client = EasydbClient()
+        self.delays = [0.5]
+
+        with HTTMock(get_space_api_mock, self.slow_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+            # when
+            started = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                bucket.get(BUCKET_ELEMENT_ID, deadline=0.05)
+
+            # then
+            self.assertLess(time.monotonic() - started, 0.4)
+
+            # and
+            self.assertEqual(bucket.get(BUCKET_ELEMENT_ID, deadline=1)['id'], BUCKET_ELEMENT_ID)
+        client.close()
+
+    def test_should_answer_with_hedged_request_when_first_one_is_slow(self):
+        # given
+        from easydb_client import EasydbClient
+        from easydb_client.hedging import HedgingPolicy
+        client = EasydbClient(hedging=HedgingPolicy(initial_delay=0.02))
+        self.delays = [0.5]
+
+        with HTTMock(get_space_api_mock, self.slow_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+            # when
+            started = time.monotonic()
+            element = bucket.get(BUCKET_ELEMENT_ID)
+
+            # then
+            self.assertEqual(element['id'], BUCKET_ELEMENT_ID)
+
+            # and
+            self.assertLess(time.monotonic() - started, 0.4)
+
+        # and
+        info = client.hedging.info()
+        self.assertEqual((info.requests, info.hedges, info.hedges_won), (2, 1, 1))
+        client.close()
+
+
+class CoalescedRequestsTest(TestCase):
+    def test_should_send_single_request_for_concurrent_identical_gets(self):
+        # given
+        from concurrent.futures import ThreadPoolExecutor
+        from easydb_client import EasydbClient
+        client = EasydbClient()
+        requests_sent = []
+
+        @urlmatch(path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}/{BUCKET_ELEMENT_ID}'.format(
+            SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME, BUCKET_ELEMENT_ID=BUCKET_ELEMENT_ID), method='GET')
+        def slow_api_mock(url, request):
+            requests_sent.append(request.method)
+            time.sleep(0.2)
+            return get_element_from_bucket_api_mock(url, request)
+
+        with HTTMock(get_space_api_mock, slow_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+            # when
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                elements = list(executor.map(lambda _: bucket.get(BUCKET_ELEMENT_ID), range(8)))
+
+        # then
+        self.assertTrue(all(element['id'] == BUCKET_ELEMENT_ID for element in elements))
+
+        # and
+        self.assertEqual(requests_sent, ['GET'])
+
+        # and
+        self.assertEqual(client.single_flight.shared, 7)
+
+    def test_should_not_share_get_started_before_write_of_the_element(self):
+        # given
+        from concurrent.futures import ThreadPoolExecutor
+        from easydb_client import EasydbClient
+        client = EasydbClient()
+        fields = [{'name': 'firstName', 'value': 'John'}]
+        requests_sent = []
+
+        @urlmatch(path='/api/v1/{SPACE_NAME}/{BUCKET_NAME}/{BUCKET_ELEMENT_ID}'.format(
+            SPACE_NAME=SPACE_NAME, BUCKET_NAME=BUCKET_NAME, BUCKET_ELEMENT_ID=BUCKET_ELEMENT_ID))
+        def slow_reads_api_mock(url, request):
+            requests_sent.append(request.method)
+            content = json.dumps({'id': BUCKET_ELEMENT_ID, 'bucketName': BUCKET_NAME, 'fields': list(fields)})
+            if request.method == 'PUT':
+                fields[:] = json.loads(request.body)['fields']
+            else:
+                time.sleep(0.3)
+            return {'status_code': 200, 'content': content}
+
+        with HTTMock(get_space_api_mock, slow_reads_api_mock):
+            bucket = client.get_space(SPACE_NAME).get_bucket(BUCKET_NAME)
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                stale = executor.submit(bucket.get, BUCKET_ELEMENT_ID)
+                while not requests_sent:
+                    time.sleep(0.01)
+
+                # when
+                bucket.update(BUCKET_ELEMENT_ID, {'firstName': 'Johny'})
+                element = bucket.get(BUCKET_ELEMENT_ID)
+
+        # then
+        self.assertEqual(element['fields'], {'firstName': 'Johny'})
+
+        # and
+        self.assertEqual(stale.result()['fields'], {'firstName': 'John'})
+
+        # and
+        self.assertEqual(requests_sent, ['GET', 'PUT', 'GET'])
+        client.close()
@@ -0,0 +1,65 @@
+import pickle
+import sys
+from unittest import TestCase
+
+from easydb_client import query as Q
+from easydb_client.element import Element
+from easydb_client.inmemory import SpaceRepository
+
+
+class ElementTest(TestCase):
+    def test_should_behave_like_element_dict(self):
+        # given
+        element = Element('id1', 'users', [{'name': 'firstName', 'value': 'John'}])
+
+        # then
+        self.assertEqual(element, {'id': 'id1', 'bucketName': 'users', 'fields': {'firstName': 'John'}})
+
+        # and
+        self.assertEqual(dict(element)['fields'], {'firstName': 'John'})
+
+        # and
+        self.assertEqual((element['id'], element.get('bucketName'), element.get('missing')), ('id1', 'users', None))
+
+        # and
+        self.assertEqual(pickle.loads(pickle.dumps(element)), element)
+
+    def test_should_decode_fields_on_first_access(self):
+        # given
+        raw_fields = [{'name': 'firstName', 'value': 'John'}]
+        element = Element('id1', 'users', raw_fields)
+
+        # when
+        fields = element['fields']
+
+        # then
+        self.assertIs(element['fields'], fields)
+
+        # and
+        self.assertEqual(fields, {'firstName': 'John'})
+
+    def test_should_intern_bucket_names_and_take_less_memory_than_dict(self):
+        # given
+        bucket_name = ''.join(['us', 'ers'])
+        element = Element('id1', bucket_name, {})
+        other = Element('id2', ''.join(['use', 'rs']), {})
+
+        # then
+        self.assertIs(element.bucket_name, other.bucket_name)
+
+        # and
+        self.assertLess(sys.getsizeof(element), sys.getsizeof({'id': 'id1', 'bucketName': 'users', 'fields': {}}))
+
+    def test_should_store_compact_elements_in_memory(self):
+        # given
+        bucket = SpaceRepository(compact_elements=True).add().get_bucket('users')
+        john = bucket.add({'firstName': 'John'})
+
+        # when
+        elements = list(bucket.filter(Q.where('firstName').eq('John')))
+
+        # then
+        self.assertIsInstance(john, Element)
+
+        # and
+        self.assertEqual(elements, [{'id': john['id'], 'bucketName': 'users', 'fields': {'firstName': 'John'}}])
@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from easydb_client.hedging import HedgingPolicy
+
+
+class HedgingPolicyTest(TestCase):
+    def test_should_use_initial_delay_until_enough_latencies_were_observed(self):
+        # given
+        policy = HedgingPolicy(initial_delay=0.5, min_samples=10)
+
+        # when
+        for _ in range(9):
+            policy.record(0.01)
+
+        # then
+        self.assertEqual(policy.delay, 0.5)
+
+    def test_should_hedge_after_percentile_of_observed_latencies(self):
+        # given
+        policy = HedgingPolicy(percentile=90, min_samples=10, min_delay=0.001)
+
+        # when
+        for latency in range(1, 101):
+            policy.record(latency / 1000)
+
+        # then
+        self.assertEqual(policy.delay, 0.091)
+
+        # and
+        policy.record(0.05, hedged=True, hedge_won=True)
+        self.assertEqual(policy.info()[:3], (101, 1, 1))
@@ -0,0 +1,348 @@
+from unittest import TestCase
+
+from easydb_client import query as Q
+from easydb_client.inmemory import ElementsRepository
+
+
+class ElementsRepositoryIndexTest(TestCase):
+    def test_should_keep_indexes_up_to_date_with_writes(self):
+        # given
+        repository = ElementsRepository('users')
+        john = repository.add({'firstName': 'John', 'lastName': 'Smith'})
+        mark = repository.add({'firstName': 'Mark', 'lastName': 'Smith'})
+
+        # when
+        smiths = list(repository.filter(Q.where('lastName').eq('Smith')))
+
+        # then
+        self.assertEqual([e['id'] for e in smiths], [john['id'], mark['id']])
+
+        # and
+        self.assertEqual(repository.indexed_fields, {'lastName'})
+
+        # when
+        repository.update(john['id'], {'firstName': 'John', 'lastName': 'Doe'})
+        repository.remove(mark['id'])
+        anna = repository.add({'firstName': 'Anna', 'lastName': 'Smith'})
+
+        # then
+        self.assertEqual([e['id'] for e in repository.filter(Q.where('lastName').eq('Smith'))], [anna['id']])
+
+        # and
+        self.assertEqual([e['id'] for e in repository.filter(Q.where('lastName').eq('Doe'))], [john['id']])
+
+    def test_should_count_and_list_ids_from_indexes(self):
+        # given
+        repository = ElementsRepository('users', auto_index=False)
+        elements = [repository.add({'group': str(i % 10), 'parity': str(i % 2)}) for i in range(100)]
+        repository.create_index('group')
+
+        # when
+        elements_by_index = repository._elements
+        repository._elements = None  # counts from indexes do not look at elements
+
+        # then
+        self.assertEqual(repository.count(Q.where('group').eq('3')), 10)
+
+        # and
+        self.assertEqual(list(repository.ids(Q.where('group').eq('3'))), [e['id'] for e in elements[3::10]])
+
+        # when
+        repository._elements = elements_by_index
+
+        # then
+        self.assertEqual(repository.count(), 100)
+
+        # and
+        self.assertEqual(repository.count(Q.where('group').eq('3') & Q.where('parity').eq('1')), 10)
+
+        # and
+        self.assertEqual(repository.count(Q.where('group').eq('3') & Q.where('parity').eq('0')), 0)
+
+    def test_should_intersect_indexed_and_scan_not_indexed_fields(self):
+        # given
+        repository = ElementsRepository('users', auto_index=False)
+        for i in range(100):
+            repository.add({'group': str(i % 10), 'parity': str(i % 2), 'index': str(i)})
+
+        # and
+        repository.create_index('group')
+        repository.create_index('parity')
+
+        # when
+        q = Q.AndCriteria(Q.where('parity').eq('1') & Q.where('group').eq('3'), Q.where('index').eq('13'))
+        elements = list(repository.filter(q))
+
+        # then
+        self.assertEqual([e['fields']['index'] for e in elements], ['13'])
+
+        # and
+        self.assertEqual(repository.indexed_fields, {'group', 'parity'})
+
+    def test_should_not_keep_reference_to_stored_fields(self):
+        # given
+        repository = ElementsRepository('users')
+        fields = {'firstName': 'John'}
+        repository.add(fields)
+
+        # when
+        fields['firstName'] = 'Mark'
+
+        # then
+        self.assertEqual(len(list(repository.filter(Q.where('firstName').eq('John')))), 1)
+
+    def test_should_update_element_with_fields_modified_in_place(self):
+        # given
+        repository = ElementsRepository('users')
+        john = repository.add({'firstName': 'John'})
+        repository.create_index('firstName')
+        element = repository.get(john['id'])
+
+        # when
+        element['fields']['firstName'] = 'Mark'
+        repository.update(john['id'], element['fields'])
+
+        # then
+        self.assertEqual([e['id'] for e in repository.filter(Q.where('firstName').eq('Mark'))], [john['id']])
+
+        # and
+        self.assertEqual(list(repository.filter(Q.where('firstName').eq('John'))), [])
+
+    def test_should_return_elements_matched_by_indexes_in_log_order(self):
+        # given
+        repository = ElementsRepository('users')
+        first = repository.add({'group': '1'})
+        second = repository.add({'group': '1'})
+        repository.create_index('group')
+
+        # when
+        repository.update(first['id'], {'group': '2'})
+        repository.update(first['id'], {'group': '1'})
+
+        # then
+        self.assertEqual([e['id'] for e in repository.all], [first['id'], second['id']])
+
+        # and
+        self.assertEqual([e['id'] for e in repository.filter(Q.where('group').eq('1'))], [first['id'], second['id']])
+
+        # and
+        self.assertEqual(list(repository.ids(Q.where('group').eq('1'))), [first['id'], second['id']])
+
+
+class ElementsRepositorySnapshotTest(TestCase):
+    def test_should_scan_bucket_as_it_was_when_scan_started(self):
+        # given
+        repository = ElementsRepository('users')
+        john = repository.add({'firstName': 'John'})
+        mark = repository.add({'firstName': 'Mark'})
+
+        # and
+        scan = repository.all
+        self.assertEqual(next(scan)['fields'], {'firstName': 'John'})
+
+        # when
+        repository.update(mark['id'], {'firstName': 'Marco'})
+        repository.remove(john['id'])
+        repository.add({'firstName': 'Anna'})
+
+        # then
+        self.assertEqual([e['fields'] for e in scan], [{'firstName': 'Mark'}])
+
+        # and
+        self.assertEqual([e['fields'] for e in repository.all], [{'firstName': 'Marco'}, {'firstName': 'Anna'}])
+
+    def test_should_keep_place_of_updated_element(self):
+        # given
+        repository = ElementsRepository('users')
+        pks = [repository.add({'group': 'users', 'index': str(i)})['id'] for i in range(3)]
+        repository.create_index('group')
+        scan = repository.all
+
+        # when
+        repository.update(pks[0], {'group': 'users', 'index': 'first'})
+        repository.update(pks[0], {'group': 'users', 'index': 'first again'})
+
+        # then
+        self.assertEqual([e['fields']['index'] for e in repository.all], ['first again', '1', '2'])
+
+        # and
+        self.assertEqual([e['id'] for e in repository.filter(Q.where('group').eq('users'))], pks)
+
+        # and
+        self.assertEqual([e['fields']['index'] for e in scan], ['0', '1', '2'])
+
+    def test_should_compact_log_of_retired_versions_without_breaking_open_scans(self):
+        # given
+        repository = ElementsRepository('users')
+        pks = [repository.add({'index': str(i)})['id'] for i in range(10)]
+        scan = repository.all
+
+        # when
+        for i in range(5000):
+            repository.update(pks[i % 10], {'index': str(i)})
+
+        # then
+        self.assertEqual([e['fields']['index'] for e in scan], [str(i) for i in range(10)])
+
+        # and
+        self.assertLess(sum(len(slot) for slot in repository._log), 2000)
+
+        # and
+        self.assertEqual([e['fields']['index'] for e in repository.all], [str(i) for i in range(4990, 5000)])
+
+
+class ConcurrentInMemoryTest(TestCase):
+    def test_should_allow_scans_while_other_threads_write(self):
+        # given
+        import threading
+        from easydb_client import inmemory
+        bucket = inmemory.create_space().get_bucket('users')
+        errors = []
+
+        def write(worker):
+            try:
+                for i in range(500):
+                    element = bucket.add({'worker': str(worker), 'index': str(i)})
+                    bucket.update(element['id'], {'worker': str(worker), 'index': str(i), 'updated': 'yes'})
+                    if i % 2:
+                        bucket.remove(element['id'])
+            except Exception as e:
+                errors.append(e)
+
+        def scan():
+            try:
+                for _ in range(50):
+                    list(bucket.all())
+                    list(bucket.filter(Q.where('updated').eq('yes')))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)] + \
+            [threading.Thread(target=scan) for _ in range(2)]
+
+        # when
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        self.assertEqual(errors, [])
+
+        # and
+        self.assertEqual(len(list(bucket.filter(Q.where('updated').eq('yes')))), 4 * 250)
+        inmemory.remove_all_spaces()
+
+
+class DurableSpaceRepositoryTest(TestCase):
+    def setUp(self):
+        import tempfile
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.directory)
+
+    def reopen(self, storage):
+        from easydb_client.inmemory import SpaceRepository
+        from easydb_client.inmemory_storage import LogStorage
+        storage.close()
+        repository = SpaceRepository()
+        storage = LogStorage(self.directory)
+        repository.make_durable(storage)
+        return repository, storage
+
+    def test_should_restore_spaces_and_elements_after_restart(self):
+        # given
+        from easydb_client.inmemory import SpaceRepository
+        from easydb_client.inmemory_storage import LogStorage
+        repository, storage = SpaceRepository(), LogStorage(self.directory)
+        repository.make_durable(storage)
+
+        # and
+        users = repository.add().get_bucket('users')
+        john = users.add({'firstName': 'John'})
+        mark = users.add({'firstName': 'Mark'})
+        users.update(john['id'], {'firstName': 'Johny'})
+        users.remove(mark['id'])
+        removed_space = repository.add()
+        repository.remove(removed_space.name)
+
+        # when
+        repository, storage = self.reopen(storage)
+
+        # then
+        self.assertEqual(list(repository.spaces), [users.space.name])
+
+        # and
+        restored_users = repository.get(users.space.name).get_bucket('users')
+        self.assertEqual(list(restored_users.all()), [{'id': john['id'], 'bucketName': 'users', 'fields': {'firstName': 'Johny'}}])
+
+        # when
+        restored_users.add({'firstName': 'Anna'})
+        repository, storage = self.reopen(storage)
+
+        # then
+        self.assertEqual(len(list(repository.get(users.space.name).get_bucket('users').all())), 2)
+        storage.close()
+
+    def test_should_compact_log_into_snapshot(self):
+        # given
+        import os
+        from easydb_client.inmemory import SpaceRepository
+        from easydb_client.inmemory_storage import LogStorage
+        repository, storage = SpaceRepository(), LogStorage(self.directory, max_log_size=10 ** 9)
+        repository.make_durable(storage)
+        bucket = repository.add().get_bucket('counters')
+        counter = bucket.add({'value': '0'})
+        for i in range(1000):
+            bucket.update(counter['id'], {'value': str(i)})
+        size_before_compaction = storage.disk_usage()
+
+        # when
+        storage.compact()
+
+        # then
+        self.assertLess(storage.disk_usage(), size_before_compaction / 100)
+
+        # and
+        self.assertEqual(sorted(os.listdir(self.directory)), ['log-0000000002.jsonl', 'snapshot-0000000002.jsonl'])
+
+        # when
+        bucket.add({'value': 'new'})
+        with open(os.path.join(self.directory, 'log-0000000002.jsonl'), 'a') as log:
+            log.write('["e+","interrupted')
+        repository, storage = self.reopen(storage)
+
+        # then
+        restored = repository.get(bucket.space.name).get_bucket('counters')
+        self.assertEqual(sorted(e['fields']['value'] for e in restored.all()), ['999', 'new'])
+        storage.close()
+
+    def test_should_not_pile_up_logs_across_restarts(self):
+        # given
+        import os
+        from easydb_client.inmemory import SpaceRepository
+        from easydb_client.inmemory_storage import LogStorage
+        repository, storage = SpaceRepository(), LogStorage(self.directory, max_log_size=20000)
+        repository.make_durable(storage)
+        space_name = repository.add().name
+        counter = repository.get(space_name).get_bucket('counters').add({'value': '0'})
+
+        for restart in range(6):
+            # when
+            bucket = repository.get(space_name).get_bucket('counters')
+            for i in range(150):
+                bucket.update(counter['id'], {'value': '{restart}-{i}'.format(restart=restart, i=i)})
+            storage.close()
+            repository, storage = SpaceRepository(), LogStorage(self.directory, max_log_size=20000)
+            repository.make_durable(storage)
+
+            # then
+            self.assertLess(storage.disk_usage(), 20000)
+            self.assertEqual(len(os.listdir(self.directory)), 2)
+
+        # and
+        restored = repository.get(space_name).get_bucket('counters')
+        self.assertEqual([e['fields'] for e in restored.all()], [{'value': '5-149'}])
+        storage.close()
@@ -0,0 +1,84 @@
+import logging
+from unittest import TestCase
+
+import easydb_client
+from easydb_client.metrics import Histogram
+from easydb_client.metrics import HistogramCollector
+from easydb_client.metrics import Measurement
+from easydb_client.metrics import Observers
+from easydb_client.metrics import SlowOperationLog
+from easydb_client.server import StandInServer
+from .helpers import RecordingObserver
+
+
+class HistogramTest(TestCase):
+    def test_should_report_percentiles_within_precision(self):
+        # given
+        histogram = Histogram(precision=0.02)
+
+        # when
+        for i in range(1, 1001):
+            histogram.record(i / 1000)
+
+        # then
+        for p in (50, 90, 99):
+            self.assertAlmostEqual(histogram.percentile(p), p / 100, delta=p / 100 * 0.04)
+
+        # and
+        self.assertEqual(histogram.max, 1.0)
+
+
+class SlowOperationLogTest(TestCase):
+    def test_should_log_only_operations_slower_than_threshold(self):
+        # given
+        slow_log = SlowOperationLog(threshold=0.5)
+        fast, slow = Measurement('get', 'space', 'users'), Measurement('add', 'space', 'users')
+        fast.duration, slow.duration = 0.1, 0.7
+
+        # when
+        with self.assertLogs('easydb_client', logging.WARNING) as logs:
+            slow_log.observe(fast)
+            slow_log.observe(slow)
+
+        # then
+        self.assertEqual(len(logs.output), 1)
+
+        # and
+        self.assertIn('Slow easydb operation add on space/users took 0.700s', logs.output[0])
+
+
+class ObservedClientTest(TestCase):
+    def test_should_measure_every_request(self):
+        # given
+        collector = HistogramCollector()
+        recorder = RecordingObserver()
+        measurements = recorder.measurements
+
+        with StandInServer(page_size=2) as server:
+            client = easydb_client.EasydbClient(url=server.url, observer=Observers(collector, recorder))
+            bucket = client.create_space().get_bucket('users')
+
+            # when
+            for i in range(3):
+                bucket.add({'index': str(i)})
+            list(bucket.all())
+            with self.assertRaises(easydb_client.ElementNotFound):
+                bucket.get('missing')
+            client.close()
+
+        # then
+        self.assertEqual([m.operation for m in measurements],
+                         ['create_space', 'add', 'add', 'add', 'page_fetch', 'page_fetch', 'get'])
+
+        # and
+        add = measurements[1]
+        self.assertEqual((add.space, add.bucket, add.status), (bucket.space.name, 'users', 201))
+        self.assertGreater(add.request_bytes, 0)
+        self.assertGreater(add.response_bytes, 0)
+        self.assertGreater(measurements[0].connect, 0)
+        self.assertTrue(all(m.ttfb <= m.duration and m.decode <= m.duration for m in measurements))
+
+        # and
+        report = collector.report()
+        self.assertEqual((report['add']['count'], report['get']['statuses']), (3, {404: 1}))
+        self.assertEqual(set(report['page_fetch']['timings']['duration']), {'p50', 'p90', 'p99', 'p99.9', 'max'})
@@ -0,0 +1,72 @@
+from unittest import TestCase
+from urllib.parse import parse_qsl
+
+from easydb_client import query as Q
+
+
+class QueryCompilerTest(TestCase):
+    def test_should_flatten_deeply_nested_conjunction(self):
+        # given
+        q = Q.where('field0').eq('0')
+        for i in range(1, 5000):
+            q = q & Q.where(f'field{i}').eq(str(i))
+
+        # when
+        compiled = Q.compile(q)
+
+        # then
+        self.assertEqual(len(compiled.terms), 5000)
+
+        # and
+        self.assertIs(q._validate(), q)
+
+    def test_should_normalize_terms(self):
+        # given
+        first = Q.where('lastName').eq('Smith') & Q.where('firstName').eq('John')
+        second = Q.where('firstName').eq('John') & (Q.where('lastName').eq('Smith') & Q.where('firstName').eq('John'))
+
+        # when
+        compiled = Q.compile(first)
+
+        # then
+        self.assertEqual(compiled.terms, (('firstName', 'John'), ('lastName', 'Smith')))
+
+        # and
+        self.assertIs(Q.compile(second), compiled)
+
+        # and
+        self.assertEqual(len({compiled, Q.compile(second)}), 1)
+
+    def test_should_url_encode_query_string(self):
+        # given
+        q = Q.where('company name').eq('Smith & Sons') & Q.where('rate').eq('100%')
+
+        # when
+        query_string = Q.compile(q).query_string
+
+        # then
+        self.assertEqual(parse_qsl(query_string), [('company name', 'Smith & Sons'), ('rate', '100%')])
+
+    def test_should_match_fields_with_predicate(self):
+        # given
+        compiled = Q.compile(Q.where('firstName').eq('John') & Q.where('lastName').eq('Smith'))
+
+        # then
+        self.assertTrue(compiled.predicate({'firstName': 'John', 'lastName': 'Smith', 'alias': 'J'}))
+
+        # and
+        self.assertFalse(compiled.predicate({'firstName': 'John'}))
+
+        # and
+        self.assertTrue(compiled.matches({'fields': {'firstName': 'John', 'lastName': 'Smith'}}))
+
+    def test_should_be_immutable(self):
+        # given
+        compiled = Q.compile(Q.where('firstName').eq('John'))
+
+        with self.assertRaises(AttributeError):  # then
+            compiled.terms = ()  # when
+
+    def test_should_reject_invalid_terms(self):
+        with self.assertRaises(Q.InvalidQuery):  # then
+            Q.compile(Q.where('firstName').eq('John') & Q.where('lastName').eq(None))  # when
@@ -0,0 +1,166 @@
+import time
+from unittest import TestCase
+
+import easydb_client
+from easydb_client import query as Q
+from easydb_client.replica import BucketReplica
+from easydb_client.server import InProcessTransport
+from easydb_client.server import StandInServer
+from .helpers import FakeClock
+from .helpers import RecordingObserver
+
+
+class BucketReplicaTest(TestCase):
+    def setUp(self):
+        self.server = StandInServer(page_size=3).start()
+        self.observer = RecordingObserver()
+        self.client = easydb_client.EasydbClient(url=self.server.url, observer=self.observer)
+        self.space = self.client.create_space()
+        self.bucket = self.space.get_bucket('countries')
+        # written behind the client's back, like by other client
+        self.remote = self.server.space_repository.get(self.space.name).get_bucket('countries')
+        for code, continent in [('PL', 'Europe'), ('DE', 'Europe'), ('JP', 'Asia'), ('BR', 'America')]:
+            self.bucket.add({'code': code, 'continent': continent})
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_should_serve_reads_locally(self):
+        # given
+        replica = BucketReplica(self.bucket, refresh_interval=None)
+        poland = next(replica.filter(Q.where('code').eq('PL')))
+        del self.observer.measurements[:]
+
+        # when
+        european = list(replica.filter(Q.where('continent').eq('Europe'), fields=['code']))
+
+        # then
+        self.assertEqual([e['fields'] for e in european], [{'code': 'PL'}, {'code': 'DE'}])
+        self.assertEqual(replica.get(poland['id']), poland)
+        self.assertEqual(replica.count(), 4)
+        self.assertEqual(list(replica.ids(Q.where('code').eq('PL'))), [poland['id']])
+        self.assertEqual([e['fields']['code'] for e in replica.all()], ['PL', 'DE', 'JP', 'BR'])
+
+        # and
+        self.assertEqual(self.observer.operations, [])
+
+        # when
+        self.remote.add({'code': 'CN', 'continent': 'Asia'})
+
+        # then
+        self.assertEqual(replica.count(Q.where('continent').eq('Asia')), 1)
+
+        # when
+        replica.refresh()
+
+        # then
+        self.assertEqual(replica.count(Q.where('continent').eq('Asia')), 2)
+        self.assertEqual(replica.info().refreshes, 2)
+
+    def test_should_apply_writes_of_the_same_client_immediately(self):
+        # given
+        replica = BucketReplica(self.bucket, refresh_interval=None)
+        other_bucket = self.space.get_bucket('countries')
+        japan = next(replica.filter(Q.where('code').eq('JP')))
+        brazil = next(replica.filter(Q.where('code').eq('BR')))
+
+        # when
+        france = replica.add({'code': 'FR', 'continent': 'Europe'})
+        other_bucket.update(japan['id'], {'code': 'JP', 'continent': 'Oceania'})
+        other_bucket.remove(brazil['id'])
+
+        # then
+        self.assertEqual(replica.get(france['id'])['fields'], {'code': 'FR', 'continent': 'Europe'})
+        self.assertEqual(replica.get(japan['id'])['fields']['continent'], 'Oceania')
+        with self.assertRaises(easydb_client.ElementNotFound):
+            replica.get(brazil['id'])
+        self.assertEqual(replica.count(Q.where('continent').eq('Asia')), 0)
+
+        # when
+        replica.close()
+        other_bucket.add({'code': 'IT', 'continent': 'Europe'})
+
+        # then
+        self.assertEqual(replica.count(Q.where('continent').eq('Europe')), 3)
+
+    def test_should_reload_replica_after_write_of_unknown_outcome(self):
+        # given
+        class LostUpdateResponses(InProcessTransport):
+            def request(self, method, url, data=None, headers=None, timeout=None, stream=False):
+                response = super().request(method, url, data, headers, timeout, stream)
+                if method == 'put':
+                    raise ConnectionError('Connection lost')
+                return response
+
+        client = easydb_client.EasydbClient(url=self.server.url,
+                                            transport=LostUpdateResponses(self.server.space_repository))
+        replica = BucketReplica(client.get_space(self.space.name).get_bucket('countries'), refresh_interval=None)
+        japan = next(replica.filter(Q.where('code').eq('JP')))
+
+        # when
+        with self.assertRaises(ConnectionError):
+            replica.update(japan['id'], {'code': 'JP', 'continent': 'Oceania'})
+
+        # then
+        self.assertEqual(replica.get(japan['id'])['fields']['continent'], 'Oceania')
+
+        # and
+        self.assertEqual(replica.info().refreshes, 2)
+        replica.close()
+        client.close()
+
+    def test_should_refresh_in_background(self):
+        # given
+        replica = BucketReplica(self.bucket, refresh_interval=0.05)
+        self.assertEqual(replica.count(Q.where('continent').eq('Asia')), 1)
+
+        # when
+        self.remote.add({'code': 'CN', 'continent': 'Asia'})
+        deadline = time.monotonic() + 5
+        while replica.count(Q.where('continent').eq('Asia')) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        replica.close()
+
+        # then
+        self.assertEqual(replica.count(Q.where('continent').eq('Asia')), 2)
+
+        # and
+        self.assertIn('continent', replica._repository.indexed_fields)
+
+    def test_should_reload_replica_older_than_max_staleness_on_read(self):
+        # given
+        clock = FakeClock()
+        replica = BucketReplica(self.bucket, refresh_interval=None, max_staleness=10, clock=clock)
+        self.remote.add({'code': 'CN', 'continent': 'Asia'})
+
+        # when
+        clock.now = 10
+
+        # then
+        self.assertEqual(replica.count(), 4)
+
+        # when
+        clock.now = 10.5
+
+        # then
+        self.assertEqual(replica.count(), 5)
+        self.assertEqual(replica.info().age, 0)
+
+    def test_should_keep_writes_made_while_replica_is_reloaded(self):
+        # given
+        replica = BucketReplica(self.bucket, refresh_interval=None)
+        scan = self.bucket.scan
+
+        def scan_with_write(*args, **kwargs):
+            elements = list(scan(*args, **kwargs))
+            self.bucket.add({'code': 'FR', 'continent': 'Europe'})
+            return elements
+
+        self.bucket.scan = scan_with_write
+
+        # when
+        replica.refresh()
+
+        # then
+        self.assertEqual(replica.count(Q.where('code').eq('FR')), 1)
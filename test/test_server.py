@@ -0,0 +1,156 @@
+import asyncio
+import pickle
+from unittest import TestCase
+from unittest import skipUnless
+
+import easydb_client
+from easydb_client import query as Q
+from easydb_client.server import StandInServer
+from .helpers import RecordingObserver
+
+try:
+    from easydb_client.aio import AsyncEasydbClient
+except ImportError:
+    AsyncEasydbClient = None
+
+
+class StandInServerTest(TestCase):
+    def setUp(self):
+        self.server = StandInServer(page_size=3).start()
+        self.client = easydb_client.EasydbClient(url=self.server.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_should_manage_spaces(self):
+        # given
+        space = self.client.create_space()
+
+        # when
+        self.client.remove_space(space.name)
+
+        # then
+        self.assertFalse(self.client.space_exists(space.name))
+
+        # and
+        with self.assertRaises(easydb_client.SpaceNotFound):
+            self.client.get_space(space.name)
+
+    def test_should_page_and_filter_elements(self):
+        # given
+        bucket = self.client.create_space().get_bucket('users')
+        for i in range(10):
+            bucket.add({'group': str(i % 2), 'index': str(i)})
+
+        # when
+        elements = list(bucket.all())
+
+        # then
+        self.assertEqual([e['fields']['index'] for e in elements], [str(i) for i in range(10)])
+
+        # and
+        self.assertEqual(list(bucket.all(stream=True)), elements)
+
+        # when
+        odd = list(bucket.filter(Q.where('group').eq('1')))
+
+        # then
+        self.assertEqual([e['fields']['index'] for e in odd], ['1', '3', '5', '7', '9'])
+
+    def test_should_add_get_update_and_remove_element(self):
+        # given
+        bucket = self.client.create_space().get_bucket('users')
+        element = bucket.add({'firstName': 'John'})
+
+        # when
+        bucket.update(element['id'], {'firstName': 'Johny'})
+
+        # then
+        self.assertEqual(bucket.get(element['id'])['fields'], {'firstName': 'Johny'})
+
+        # when
+        bucket.remove(element['id'])
+
+        # then
+        with self.assertRaises(easydb_client.ElementNotFound):
+            bucket.get(element['id'])
+
+        # and
+        with self.assertRaises(easydb_client.InvalidElementFormat):
+            bucket.add({'firstName': 1})
+
+    def test_should_scan_pages_in_parallel(self):
+        # given
+        bucket = self.client.create_space().get_bucket('users')
+        list(bucket.add_many({'group': str(i % 3), 'index': str(i)} for i in range(50)))
+        in_group = Q.where('group').eq('1')
+
+        # when
+        scanned = list(bucket.scan(workers=4, page_size=4))
+        scanned_group = list(bucket.scan(in_group, workers=2, page_size=4, fields=['index']))
+
+        # then
+        self.assertEqual(scanned, list(bucket.all()))
+
+        # and
+        self.assertEqual(scanned_group, list(bucket.filter(in_group, fields=['index'])))
+
+    def test_should_not_request_pages_past_the_last_one_while_scanning(self):
+        # given
+        observer = RecordingObserver()
+        client = easydb_client.EasydbClient(url=self.server.url, observer=observer)
+        bucket = client.create_space().get_bucket('users')
+        list(bucket.add_many({'index': str(i)} for i in range(10)))
+        del observer.measurements[:]
+
+        # when
+        scanned = list(bucket.scan(workers=3, page_size=2))
+
+        # then
+        self.assertEqual(len(scanned), 10)
+
+        # and
+        self.assertLessEqual(len(observer.of('page_fetch')), 5 + 2)
+        client.close()
+
+    @skipUnless(AsyncEasydbClient, 'aiohttp is not installed')
+    def test_should_not_request_pages_past_the_last_one_while_scanning_asynchronously(self):
+        # given
+        observer = RecordingObserver()
+        bucket = self.client.create_space().get_bucket('users')
+        list(bucket.add_many({'index': str(i)} for i in range(10)))
+
+        async def scan():
+            async with AsyncEasydbClient(url=self.server.url, observer=observer) as client:
+                space = await client.get_space(bucket.space.name)
+                return [e async for e in space.get_bucket('users').scan(workers=3, page_size=2)]
+
+        # when
+        scanned = asyncio.run(scan())
+
+        # then
+        self.assertEqual(len(scanned), 10)
+
+        # and
+        self.assertLessEqual(len(observer.of('page_fetch')), 5 + 2)
+
+    def test_should_split_bucket_into_partitions(self):
+        # given
+        server = StandInServer(max_page_size=3).start()
+        bucket = easydb_client.EasydbClient(url=server.url).create_space().get_bucket('users')
+        list(bucket.add_many({'index': str(i)} for i in range(20)))
+
+        # when
+        partitions = [pickle.loads(pickle.dumps(p)) for p in bucket.partitions(3, page_size=10)]
+        elements = [list(partition) for partition in partitions]
+
+        # then
+        self.assertEqual(partitions[0].page_size, 3)
+
+        # and
+        self.assertEqual([len(part) for part in elements], [8, 6, 6])
+
+        # and
+        self.assertEqual(sorted(e['id'] for part in elements for e in part), sorted(bucket.ids()))
+        server.stop()
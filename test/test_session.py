@@ -0,0 +1,112 @@
+import time
+from unittest import TestCase
+
+import easydb_client
+import easydb_client.inmemory as inmemory
+from easydb_client.session import WriteSession
+
+
+class RecordingBucket:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.calls = []
+
+    def add(self, element):
+        self.calls.append('add')
+        return self.bucket.add(element)
+
+    def update(self, element_id, element):
+        self.calls.append('update')
+        return self.bucket.update(element_id, element)
+
+    def remove(self, element_id):
+        self.calls.append('remove')
+        self.bucket.remove(element_id)
+
+
+class WriteSessionTest(TestCase):
+    def setUp(self):
+        self.bucket = RecordingBucket(inmemory.create_space().get_bucket('users'))
+
+    def tearDown(self):
+        inmemory.remove_all_spaces()
+
+    def test_should_collapse_redundant_mutations(self):
+        # given
+        existing = self.bucket.bucket.add({'name': 'Existing'})
+        removed = self.bucket.bucket.add({'name': 'Removed'})
+
+        # when
+        with WriteSession() as session:
+            users = session.bucket(self.bucket)
+            john = users.add({'name': 'John'})
+            users.update(john, {'name': 'Johny'})
+            users.update(john, {'name': 'Johnny'})
+            temporary = users.add({'name': 'Temporary'})
+            users.remove(temporary)
+            users.update(existing['id'], {'name': 'First'})
+            users.update(existing['id'], {'name': 'Last'})
+            users.update(removed['id'], {'name': 'Updated'})
+            users.remove(removed['id'])
+
+            # then
+            self.assertEqual(self.bucket.calls, [])
+
+        # then
+        self.assertEqual(sorted(self.bucket.calls), ['add', 'remove', 'update'])
+
+        # and
+        self.assertEqual(self.bucket.bucket.get(john.id)['fields'], {'name': 'Johnny'})
+
+        # and
+        self.assertEqual(self.bucket.bucket.get(existing['id'])['fields'], {'name': 'Last'})
+
+        # and
+        self.assertEqual(len(list(self.bucket.bucket.all())), 2)
+
+        # and
+        self.assertTrue(temporary.discarded)
+
+    def test_should_report_failed_mutations_and_discard_them_on_error(self):
+        # given
+        session = WriteSession()
+        users = session.bucket(self.bucket)
+
+        # when
+        users.remove('missing')
+        results = session.flush()
+
+        # then
+        self.assertIsInstance(results[0].error, easydb_client.ElementNotFound)
+
+        # and
+        self.assertEqual(session.errors, [results[0].error])
+
+        # when
+        with self.assertRaises(RuntimeError):
+            with session:
+                users.add({'name': 'John'})
+                raise RuntimeError()
+
+        # then
+        self.assertEqual(list(self.bucket.bucket.all()), [])
+
+    def test_should_flush_in_background_with_write_behind(self):
+        # given
+        session = WriteSession(flush_interval=0.01)
+
+        # when
+        john = session.bucket(self.bucket).add({'name': 'John'})
+        deadline = time.monotonic() + 5
+        while john.element is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # then
+        self.assertEqual(self.bucket.bucket.get(john.id)['fields'], {'name': 'John'})
+
+        # when
+        session.bucket(self.bucket).update(john, {'name': 'Johny'})
+        session.close()
+
+        # then
+        self.assertEqual(self.bucket.bucket.get(john.id)['fields'], {'name': 'Johny'})
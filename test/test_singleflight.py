@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from easydb_client.singleflight import AsyncSingleFlight
+from easydb_client.singleflight import SingleFlight
+
+
+class SingleFlightTest(TestCase):
+    def test_should_share_single_call_between_concurrent_callers(self):
+        # given
+        single_flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow_call():
+            calls.append(1)
+            release.wait()
+            return 'result'
+
+        # when
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = [executor.submit(single_flight.do, 'key', slow_call) for _ in range(8)]
+            while single_flight.shared < 7:
+                pass
+            release.set()
+
+        # then
+        self.assertEqual([r.result() for r in results], ['result'] * 8)
+
+        # and
+        self.assertEqual(len(calls), 1)
+
+        # and
+        self.assertEqual(single_flight.do('key', lambda: 'next result'), 'next result')
+
+    def test_should_pass_error_to_every_caller(self):
+        # given
+        single_flight = SingleFlight()
+
+        def failing_call():
+            raise ValueError()
+
+        # expect
+        with self.assertRaises(ValueError):
+            single_flight.do('key', failing_call)
+
+        # and
+        self.assertEqual(single_flight.do('key', lambda: 'result'), 'result')
+
+
+    def test_should_not_share_call_ending_before_caller_would_stop_waiting(self):
+        # given
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def slow_call(result):
+            release.wait()
+            return result
+
+        # when
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            limited = executor.submit(single_flight.do, 'key', lambda: slow_call('limited'), time.monotonic() + 5)
+            while single_flight.calls < 1:
+                pass
+            unlimited = executor.submit(single_flight.do, 'key', lambda: slow_call('unlimited'))
+            while single_flight.calls < 2:
+                pass
+            joining = executor.submit(single_flight.do, 'key', lambda: slow_call('joining'), time.monotonic() + 1)
+            while single_flight.shared < 1:
+                pass
+            release.set()
+
+        # then
+        self.assertEqual([limited.result(), unlimited.result(), joining.result()],
+                         ['limited', 'unlimited', 'unlimited'])
+
+    def test_should_not_share_forgotten_call_with_later_callers(self):
+        # given
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def slow_call(result):
+            release.wait()
+            return result
+
+        # when
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(single_flight.do, 'key', lambda: slow_call('first'))
+            while single_flight.calls < 1:
+                pass
+            single_flight.forget('key')
+            second = executor.submit(single_flight.do, 'key', lambda: slow_call('second'))
+            while single_flight.calls < 2:
+                pass
+            release.set()
+
+        # then
+        self.assertEqual([first.result(), second.result()], ['first', 'second'])
+
+        # and
+        self.assertEqual(single_flight.shared, 0)
+
+
+class AsyncSingleFlightTest(TestCase):
+    def test_should_share_single_call_between_concurrent_callers(self):
+        # given
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow_call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        async def run():
+            first = asyncio.ensure_future(single_flight.do('key', slow_call))
+            await asyncio.sleep(0)
+            # caller giving up does not cancel call of others
+            first.cancel()
+            return await asyncio.gather(*(single_flight.do('key', slow_call) for _ in range(8)))
+
+        # when
+        results = asyncio.run(run())
+
+        # then
+        self.assertEqual(results, ['result'] * 8)
+
+        # and
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import easydb_client
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cumulative import time of the package in microseconds, can be raised on slow machines
+IMPORT_BUDGET_US = int(os.environ.get('EASYDB_IMPORT_BUDGET_US', 40000))
+RUNS = 5
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+    return subprocess.run([sys.executable] + list(args), env=env, cwd=PACKAGE_DIR, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def import_time_us():
+    # `import time: self [us] | cumulative | imported package` lines are written to stderr
+    for line in run_python('-X', 'importtime', '-c', 'import easydb_client').stderr.splitlines():
+        _, cumulative, name = line.split(':', 1)[1].split('|')
+        if name.strip() == 'easydb_client':
+            return int(cumulative)
+    raise AssertionError('easydb_client import time was not reported')
+
+
+class StartupTest(TestCase):
+    def test_should_import_package_within_budget(self):
+        # when
+        fastest = min(import_time_us() for _ in range(RUNS))
+
+        # then
+        self.assertLessEqual(fastest, IMPORT_BUDGET_US,
+                             'import easydb_client took {fastest}us'.format(fastest=fastest))
+
+    def test_should_not_load_http_stack_and_submodules_on_import(self):
+        # when
+        loaded = run_python('-c', 'import sys, easydb_client; print(" ".join(sys.modules))').stdout.split()
+
+        # then
+        for module in ['requests', 'urllib3', 'http.client', 'asyncio', 'concurrent.futures', 'logging',
+                       'easydb_client.inmemory', 'easydb_client.transport_requests', 'easydb_client.metrics']:
+            self.assertNotIn(module, loaded)
+
+    def test_should_load_submodules_on_first_access(self):
+        # when
+        loaded = run_python('-c', 'import sys, easydb_client; easydb_client.inmemory.create_space(); '
+                                  'print(" ".join(sys.modules))').stdout.split()
+
+        # then
+        self.assertIn('easydb_client.inmemory', loaded)
+
+        # and
+        with self.assertRaises(AttributeError):
+            easydb_client.missing
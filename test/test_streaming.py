@@ -0,0 +1,75 @@
+import json
+from unittest import TestCase
+
+from easydb_client.streaming import MalformedPage
+from easydb_client.streaming import PageParser
+
+
+def parse_in_chunks(body, chunk_size):
+    parser = PageParser()
+    elements = []
+    for i in range(0, len(body), chunk_size):
+        elements.extend(parser.feed(body[i:i + chunk_size]))
+    elements.extend(parser.close())
+    return parser.next_url, elements
+
+
+class PageParserTest(TestCase):
+    def test_should_parse_page_fed_in_chunks_of_any_size(self):
+        # given
+        page = {
+            'results': [
+                {'id': str(i), 'bucketName': 'users', 'fields': [{'name': 'name', 'value': 'Zażółć gęślą jaźń ' * i}]}
+                for i in range(20)
+            ],
+            'count': 12345,
+            'next': 'http://localhost/api/v1/space/users?limit=20&offset=20'
+        }
+        body = json.dumps(page, indent=2, ensure_ascii=False).encode('utf-8')
+
+        for chunk_size in (1, 2, 7, 100, len(body)):
+            # when
+            next_url, elements = parse_in_chunks(body, chunk_size)
+
+            # then
+            self.assertEqual(next_url, page['next'])
+
+            # and
+            self.assertEqual(elements, page['results'])
+
+    def test_should_return_elements_before_page_is_complete(self):
+        # given
+        parser = PageParser()
+
+        # when
+        elements = parser.feed(b'{"next": null, "results": [{"id": "1"}, {"id": "2"}, {"id"')
+
+        # then
+        self.assertEqual(elements, [{'id': '1'}, {'id': '2'}])
+
+        # and
+        self.assertEqual(parser.feed(b': "3"}]}') + parser.close(), [{'id': '3'}])
+
+    def test_should_reject_truncated_page(self):
+        # given
+        parser = PageParser()
+        parser.feed(b'{"next": null, "results": [{"id": "1"}')
+
+        with self.assertRaises(MalformedPage):  # then
+            parser.close()  # when
+
+    def test_should_join_chunks_of_large_value_only_when_enough_arrived(self):
+        # given
+        body = json.dumps({'next': None, 'results': [{'id': '1', 'value': 'x' * 100000}]}).encode('utf-8')
+        parser = PageParser()
+        parser.feed(body[:1000])
+
+        # when
+        for i in range(1000, 1640, 64):
+            parser.feed(body[i:i + 64])
+
+        # then
+        self.assertEqual(len(parser._pending), 10)
+
+        # and
+        self.assertEqual(parser.feed(body[1640:]) + parser.close(), [{'id': '1', 'value': 'x' * 100000}])
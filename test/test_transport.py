@@ -0,0 +1,266 @@
+import socket
+import threading
+import time
+from unittest import TestCase
+from unittest import skipUnless
+
+import easydb_client
+from easydb_client import query as Q
+from easydb_client.server import InProcessTransport
+from easydb_client.server import StandInServer
+from easydb_client.transport import HTTPClientTransport
+from .helpers import RecordingObserver
+
+try:
+    from easydb_client.server_h2 import H2StandInServer
+    from easydb_client.transport_h2 import H2Transport
+except ImportError:
+    H2Transport = None
+
+
+def exercise_client(test, client):
+    # given
+    space = client.create_space()
+    bucket = space.get_bucket('users')
+    added = [bucket.add({'group': str(i % 2), 'index': str(i)}) for i in range(7)]
+
+    # when
+    bucket.update(added[0]['id'], {'group': '0', 'index': 'first'})
+    bucket.remove(added[1]['id'])
+
+    # then
+    expected = ['first', '2', '3', '4', '5', '6']
+    test.assertEqual(bucket.get(added[0]['id'])['fields'], {'group': '0', 'index': 'first'})
+    test.assertEqual([e['fields']['index'] for e in bucket.all()], expected)
+    test.assertEqual([e['fields']['index'] for e in bucket.all(stream=True)], expected)
+    test.assertEqual([e['fields']['index'] for e in bucket.scan(workers=2, page_size=2)], expected)
+    test.assertEqual([e['fields']['index'] for e in bucket.filter(Q.where('group').eq('1'))], ['3', '5'])
+    test.assertEqual(bucket.count(), 6)
+
+    # and
+    with test.assertRaises(easydb_client.ElementNotFound):
+        bucket.get(added[1]['id'])
+    with test.assertRaises(easydb_client.ElementNotFound):
+        bucket.remove(added[1]['id'])
+    with test.assertRaises(easydb_client.InvalidElementFormat):
+        bucket.add({'index': 1})
+    client.remove_space(space.name)
+    with test.assertRaises(easydb_client.SpaceNotFound):
+        client.get_space(space.name)
+
+
+class TransportTest(TestCase):
+    def test_should_run_client_in_process(self):
+        # given
+        transport = InProcessTransport(page_size=2)
+        observer = RecordingObserver()
+
+        # when
+        with easydb_client.EasydbClient(url='http://easydb', transport=transport, observer=observer) as client:
+            # then
+            exercise_client(self, client)
+
+        # and
+        add = next(m for m in observer.measurements if m.operation == 'add')
+        self.assertEqual(add.status, 201)
+        self.assertGreater(add.request_bytes, 0)
+        self.assertGreater(add.response_bytes, 0)
+        self.assertEqual(add.connect, 0.0)
+
+    def test_should_run_client_over_http_client_connections(self):
+        with StandInServer(page_size=2) as server:
+            # given
+            transport = HTTPClientTransport(pool_maxsize=4)
+
+            with easydb_client.EasydbClient(url=server.url, transport=transport) as client:
+                # when
+                exercise_client(self, client)
+
+                # then
+                idle = sum(len(connections) for connections in transport._idle.values())
+                self.assertGreaterEqual(idle, 1)
+                self.assertLessEqual(idle, 4)
+
+    def test_should_replace_connection_closed_while_idle(self):
+        with StandInServer() as server:
+            # given
+            transport = HTTPClientTransport()
+            client = easydb_client.EasydbClient(url=server.url, transport=transport)
+            space = client.create_space()
+            for connection in [c for connections in transport._idle.values() for c in connections]:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+
+            # when
+            exists = client.space_exists(space.name)
+
+            # then
+            self.assertTrue(exists)
+            client.close()
+
+    def test_should_send_again_only_idempotent_requests_lost_with_reused_connection(self):
+        from http.server import BaseHTTPRequestHandler
+        from http.server import ThreadingHTTPServer
+        received = []
+
+        class DroppingHandler(BaseHTTPRequestHandler):
+            # answers the first request of every connection, closes it after reading the second one
+            protocol_version = 'HTTP/1.1'
+            answered = False
+
+            def do_request(self):
+                received.append(self.command)
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.answered:
+                    self.close_connection = True
+                    return
+                self.answered = True
+                self.send_response(200)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            do_GET = do_POST = do_request
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), DroppingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{port}/'.format(port=server.server_address[1])
+        transport = HTTPClientTransport()
+
+        # given
+        transport.request('get', url)
+
+        # when
+        with self.assertRaises(ConnectionError):
+            transport.request('post', url, data=b'{}')
+
+        # then
+        self.assertEqual(received, ['GET', 'POST'])
+
+        # given
+        transport.request('get', url)
+
+        # when
+        response = transport.request('get', url)
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(received, ['GET', 'POST', 'GET', 'GET', 'GET'])
+        transport.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_should_limit_http_client_request_by_deadline(self):
+        # given
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        accepted = []
+        threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True).start()
+        client = easydb_client.EasydbClient(url='http://127.0.0.1:{port}'.format(port=listener.getsockname()[1]),
+                                            transport=HTTPClientTransport(), coalesce=False)
+
+        # when
+        with self.assertRaises(easydb_client.DeadlineExceeded):
+            client.get_space('someSpace', deadline=0.2)
+
+        # then
+        client.close()
+        listener.close()
+
+
+    def test_should_limit_shared_call_by_deadline_of_caller_which_started_it(self):
+        # given
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        accepted = []
+        threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True).start()
+        client = easydb_client.EasydbClient(url='http://127.0.0.1:{port}'.format(port=listener.getsockname()[1]),
+                                            transport=HTTPClientTransport())
+
+        # when
+        with self.assertRaises(easydb_client.DeadlineExceeded):
+            client.get_space('someSpace', deadline=0.2)
+
+        # then
+        stopped_waiting = time.monotonic()
+        while client.single_flight._in_flight and time.monotonic() - stopped_waiting < 2:
+            time.sleep(0.01)
+        self.assertEqual(client.single_flight._in_flight, {})
+        client.close()
+        listener.close()
+
+@skipUnless(H2Transport, 'h2 is not installed')
+class H2TransportTest(TestCase):
+    def test_should_run_client_over_http2(self):
+        with H2StandInServer(page_size=2) as server:
+            # given
+            transport = H2Transport()
+
+            with easydb_client.EasydbClient(url=server.url, transport=transport) as client:
+                # when
+                exercise_client(self, client)
+
+                # then
+                self.assertEqual(transport.connections(), 1)
+
+    def test_should_multiplex_concurrent_requests_over_few_connections(self):
+        with H2StandInServer(max_concurrent_streams=4) as server:
+            # given
+            transport = H2Transport(max_connections=2)
+            client = easydb_client.EasydbClient(url=server.url, transport=transport, coalesce=False)
+            bucket = client.create_space().get_bucket('users')
+            added = [bucket.add({'index': str(i)}) for i in range(10)]
+            read = []
+
+            def read_all():
+                for element in added:
+                    read.append(bucket.get(element['id'])['fields']['index'])
+
+            # when
+            threads = [threading.Thread(target=read_all) for _ in range(32)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # then
+            self.assertEqual(sorted(read), sorted([str(i) for i in range(10)] * 32))
+            self.assertLessEqual(transport.connections(), 2)
+            self.assertLessEqual(server.connections(), 2)
+            client.close()
+
+    def test_should_reset_stream_of_response_not_read_to_the_end(self):
+        with H2StandInServer(page_size=1000) as server:
+            # given
+            transport = H2Transport(max_connections=1, max_concurrent_streams=1)
+            client = easydb_client.EasydbClient(url=server.url, transport=transport)
+            bucket = client.create_space().get_bucket('users')
+            list(bucket.add_many({'payload': 'x' * 1000} for _ in range(500)))
+
+            # when
+            firsts = [next(bucket.all(stream=True)) for _ in range(5)]
+
+            # then
+            self.assertEqual(len(firsts), 5)
+            self.assertEqual(bucket.count(), 500)
+            client.close()
+
+    def test_should_limit_http2_request_by_deadline(self):
+        # given
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        client = easydb_client.EasydbClient(url='http://127.0.0.1:{port}'.format(port=listener.getsockname()[1]),
+                                            transport=H2Transport(), coalesce=False)
+
+        # when
+        with self.assertRaises(easydb_client.DeadlineExceeded):
+            client.get_space('someSpace', deadline=0.2)
+
+        # then
+        client.close()
+        listener.close()